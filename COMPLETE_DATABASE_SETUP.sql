@@ -52,6 +52,15 @@ BEGIN
         RAISE NOTICE 'Added timezone_geo column to licenses';
     END IF;
 
+    -- Add last_modified column (watermark for the API's local license replica)
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_name='licenses' AND column_name='last_modified'
+    ) THEN
+        ALTER TABLE licenses ADD COLUMN last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+        RAISE NOTICE 'Added last_modified column to licenses';
+    END IF;
+
     -- Ensure status column has default value
     ALTER TABLE licenses ALTER COLUMN status SET DEFAULT 'PENDING';
     RAISE NOTICE 'Set default status to PENDING';
@@ -157,11 +166,17 @@ WHERE category = 'OWNER' AND status != 'BLOCKED';
 -- PART 4: CREATE PERFORMANCE INDICES
 -- ================================================================================
 CREATE INDEX IF NOT EXISTS idx_licenses_device_id ON licenses(device_id);
+-- Auto-login (check_device_sync): WHERE device_id = ... AND status = 'ACTIVE' ORDER BY last_access_date DESC
+CREATE INDEX IF NOT EXISTS idx_licenses_device_status_access ON licenses(device_id, status, last_access_date);
 CREATE INDEX IF NOT EXISTS idx_licenses_status ON licenses(status);
 CREATE INDEX IF NOT EXISTS idx_licenses_category ON licenses(category);
 CREATE INDEX IF NOT EXISTS idx_licenses_activation ON licenses(activation_date);
 CREATE INDEX IF NOT EXISTS idx_licenses_expiry ON licenses(expiry_date);
 CREATE INDEX IF NOT EXISTS idx_licenses_country ON licenses(country);
+-- Auth lookups use WHERE UPPER(key_code) = ... (case-insensitive keys)
+CREATE INDEX IF NOT EXISTS idx_licenses_key_upper ON licenses(UPPER(key_code));
+-- Incremental replica pulls use WHERE last_modified > watermark
+CREATE INDEX IF NOT EXISTS idx_licenses_last_modified ON licenses(last_modified);
 
 CREATE INDEX IF NOT EXISTS idx_sessions_device_id ON user_sessions(device_id);
 CREATE INDEX IF NOT EXISTS idx_sessions_license_key ON user_sessions(license_key);
@@ -170,6 +185,20 @@ CREATE INDEX IF NOT EXISTS idx_sessions_country ON user_sessions(country);
 CREATE INDEX IF NOT EXISTS idx_sessions_city ON user_sessions(city);
 CREATE INDEX IF NOT EXISTS idx_sessions_ip ON user_sessions(ip_address);
 
+-- Bump last_modified whenever an auth field changes (usage counters do not count)
+CREATE OR REPLACE FUNCTION licenses_touch_last_modified() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR (NEW.key_code, NEW.category, NEW.status, NEW.device_id, NEW.expiry_date, NEW.activation_date)
+        IS DISTINCT FROM (OLD.key_code, OLD.category, OLD.status, OLD.device_id, OLD.expiry_date, OLD.activation_date) THEN
+        NEW.last_modified := clock_timestamp();
+    END IF;
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_licenses_last_modified ON licenses;
+CREATE TRIGGER trg_licenses_last_modified BEFORE INSERT OR UPDATE ON licenses
+FOR EACH ROW EXECUTE PROCEDURE licenses_touch_last_modified();
+
 -- PART 5: CREATE MONITORING VIEWS
 -- ================================================================================
 
@@ -5,12 +5,16 @@ Run this script to manage licenses in your database
 
 import os
 import psycopg2
+import requests
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Running backend(s) whose license cache must drop a key after an admin change
+API_URL = os.getenv("QX_API_URL", "http://localhost:5000")
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
 
 def get_connection():
     """Connect to the database"""
@@ -22,6 +26,26 @@ def get_connection():
         print(f"❌ Database connection failed: {e}")
         return None
 
+def notify_license_change(key_code):
+    """Tell the backend to drop its cached copy of this key (otherwise it applies within the cache TTL)"""
+    if not ADMIN_API_TOKEN:
+        print("   ⚠️  ADMIN_API_TOKEN not set: change applies after the server cache TTL (5 min)")
+        return False
+    try:
+        resp = requests.post(
+            f"{API_URL.rstrip('/')}/api/admin/license_cache/invalidate",
+            json={"key": key_code},
+            headers={"X-Admin-Token": ADMIN_API_TOKEN},
+            timeout=5,
+        )
+        if resp.status_code == 200:
+            print("   Server cache invalidated")
+            return True
+        print(f"   ⚠️  Cache invalidation refused ({resp.status_code})")
+    except Exception as e:
+        print(f"   ⚠️  Cache invalidation failed: {e}")
+    return False
+
 def list_all_licenses():
     """Display all licenses with their current status"""
     conn = get_connection()
@@ -116,6 +140,7 @@ def activate_license(key_code):
         if result:
             conn.commit()
             print(f"✅ License activated: {result[0]}")
+            notify_license_change(result[0])
         else:
             print(f"❌ License not found: {key_code}")
     except Exception as e:
@@ -144,6 +169,7 @@ def block_license(key_code):
         if result:
             conn.commit()
             print(f"✅ License blocked: {result[0]}")
+            notify_license_change(result[0])
         else:
             print(f"❌ License not found: {key_code}")
     except Exception as e:
@@ -180,6 +206,7 @@ def reset_license(key_code):
             print(f"✅ License reset to PENDING: {result[0]}")
             print("   Device binding cleared")
             print("   User can activate again")
+            notify_license_change(result[0])
         else:
             print(f"❌ License not found: {key_code}")
     except Exception as e:
@@ -209,6 +236,7 @@ def extend_license(key_code, days=30):
             conn.commit()
             print(f"✅ License extended: {result[0]}")
             print(f"   New expiry: {result[1].strftime('%Y-%m-%d %H:%M')}")
+            notify_license_change(result[0])
         else:
             print(f"❌ License not found: {key_code}")
     except Exception as e:
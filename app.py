@@ -9,53 +9,170 @@ import sqlite3
 import string
 import secrets
 import hashlib
+import hmac
 import time
 import threading
 import os
 import psycopg2
 import psycopg2.pool
-import requests
 from functools import wraps
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
-from collections import defaultdict
 import platform
 import subprocess
 import json
 import queue
 
-# --- ASYNC LOGGING CORE ---
-logging_queue = queue.Queue()
+# --- NAMED QUERIES (compiled once per dialect at import) ---
+# Written in Postgres form; the SQLite form is derived (%s -> ?, CURRENT_TIMESTAMP -> datetime('now'))
+from core.queries import QueryRegistry
+
+queries = QueryRegistry()
+
+queries.register("license_by_key", """
+    SELECT key_code, category, status, device_id, expiry_date FROM licenses WHERE UPPER(key_code)=%s
+""")
+queries.register("license_status_by_key", """
+    SELECT status, device_id, expiry_date, category FROM licenses WHERE UPPER(key_code)=%s
+""")
+queries.register("active_license_by_device", """
+    SELECT key_code, category, expiry_date, status, activation_date, device_id
+    FROM licenses
+    WHERE device_id=%s AND status='ACTIVE'
+    ORDER BY last_access_date DESC LIMIT 1
+""")
+queries.register("activate_license", """
+    UPDATE licenses SET
+        status='ACTIVE',
+        device_id=%s,
+        ip_address=%s,
+        country=%s,
+        city=%s,
+        timezone_geo=%s,
+        activation_date=CURRENT_TIMESTAMP,
+        last_access_date=CURRENT_TIMESTAMP,
+        usage_count=1
+    WHERE UPPER(key_code)=%s AND (device_id IS NULL OR device_id IN ('', 'None'))
+""")
+# Coalesced auth hits (UsageAggregator): one row per key per flush, (hits, last_access, ip, key_code)
+queries.register("add_license_usage", """
+    UPDATE licenses SET
+        usage_count=COALESCE(usage_count, 0) + %s,
+        last_access_date=%s,
+        ip_address=COALESCE(%s, ip_address)
+    WHERE key_code=%s
+""", batched=("""
+    UPDATE licenses AS l SET
+        usage_count=COALESCE(l.usage_count, 0) + v.hits,
+        last_access_date=v.last_access,
+        ip_address=COALESCE(v.ip_address, l.ip_address)
+    FROM (VALUES %s) AS v (hits, last_access, ip_address, key_code)
+    WHERE l.key_code=v.key_code
+""", "(%s::integer, %s::timestamp, %s::text, %s::text)"))
+queries.register("enrich_license_geo", """
+    UPDATE licenses SET ip_address=%s, country=%s, city=%s, timezone_geo=%s
+    WHERE UPPER(key_code)=%s
+""")
+queries.register("log_session", """
+    INSERT INTO user_sessions
+    (license_key, device_id, ip_address, user_agent, timezone, resolution, platform,
+     country, region, city, isp, latitude, longitude, postal_code, organization, login_time)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+""")
+queries.register("log_session_telemetry", """
+    INSERT INTO user_sessions
+    (license_key, device_id, ip_address, user_agent, timezone, resolution, platform, login_time)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+""")
+queries.register("log_activity", """
+    INSERT INTO user_activity (license_key, device_id, mouse_movements, clicks, current_url, timestamp)
+    VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+""")
+queries.register("log_activity_telemetry", """
+    INSERT INTO user_activity
+    (license_key, device_id, mouse_movements, clicks, scrolls, key_presses, session_duration, current_url, page_title, timestamp)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+""")
+queries.register("log_signal", """
+    INSERT INTO win_rate_tracking (signal_id, broker, market, direction, confidence, entry_time)
+    VALUES (%s, %s, %s, %s, %s, %s)
+""")
+queries.register("track_outcome", "UPDATE win_rate_tracking SET outcome = %s WHERE signal_id = %s")
+queries.register("win_rate_stats", """
+    SELECT COUNT(*) as total, SUM(CASE WHEN outcome = 'WIN' THEN 1 ELSE 0 END) as wins
+    FROM win_rate_tracking
+    WHERE outcome IS NOT NULL
+      AND (%s IS NULL OR market = %s)
+      AND (%s IS NULL OR broker = %s)
+""")
+queries.register_upsert(
+    "upsert_system_status", "system_connectivity",
+    ("service_name", "status", "details"), "service_name", now_columns=("last_heartbeat",),
+)
+# Local license replica (core.replica): pulled from Postgres into its own local SQLite table
+# (license_replica), never the fallback licenses table that init_db seeds with the master keys
+queries.register("replica_pull_all", """
+    SELECT key_code, category, status, device_id, expiry_date, activation_date, last_modified
+    FROM licenses
+""")
+queries.register("replica_pull_since", """
+    SELECT key_code, category, status, device_id, expiry_date, activation_date, last_modified
+    FROM licenses WHERE last_modified > %s
+""")
+queries.register_upsert(
+    "replica_upsert_license", "license_replica",
+    ("key_code", "category", "status", "device_id", "expiry_date", "activation_date", "last_modified"), "key_code",
+)
+queries.register("replica_local_keys", "SELECT key_code FROM license_replica")
+queries.register("replica_delete_license", "DELETE FROM license_replica WHERE key_code=%s")
+queries.register("replica_license_by_key", """
+    SELECT key_code, category, status, device_id, expiry_date FROM license_replica WHERE UPPER(key_code)=%s
+""")
+queries.register("replica_license_status_by_key", """
+    SELECT status, device_id, expiry_date, category FROM license_replica WHERE UPPER(key_code)=%s
+""")
+queries.register("replica_active_license_by_device", """
+    SELECT key_code, category, expiry_date, status, activation_date, device_id
+    FROM license_replica
+    WHERE device_id=%s AND status='ACTIVE'
+    ORDER BY activation_date DESC LIMIT 1
+""")
 
-def async_logger_worker():
-    """Background thread to handle non-critical DB logs without delaying signals"""
-    while True:
-        try:
-            task = logging_queue.get(timeout=5)
-            if not task: break
-            
-            # Execute DB Insert
-            from app import get_db_connection, release_db_connection
-            conn, db_type = get_db_connection()
-            if conn:
-                try:
-                    cur = conn.cursor()
-                    if db_type == 'postgres':
-                        cur.execute(task['query'], task['params'])
-                    else:
-                        cur.execute(task['query'].replace('%s', '?'), task['params'])
-                    conn.commit()
-                finally:
-                    release_db_connection(conn, db_type)
-            logging_queue.task_done()
-        except queue.Empty:
-            continue
-        except Exception as e:
-            print(f"[ASYNC-LOG] Error: {e}")
-
-# Start the background logger
-threading.Thread(target=async_logger_worker, daemon=True).start()
+# --- ASYNC LOGGING CORE ---
+# Batched write-behind: signals never wait on the database for tracking inserts
+from core.write_behind import WriteBehindQueue
+import atexit
+
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "200"))
+LOG_BATCH_MS = int(os.getenv("LOG_BATCH_MS", "250"))
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+
+logging_queue = WriteBehindQueue(
+    connect=lambda: get_db_connection(),
+    release=lambda conn, mode: release_db_connection(conn, mode),
+    queries=queries,
+    max_batch=LOG_BATCH_SIZE,
+    max_delay_ms=LOG_BATCH_MS,
+    maxsize=LOG_QUEUE_MAX,
+)
+
+# Start the background logger (flushes what is left on shutdown)
+logging_queue.start()
+atexit.register(logging_queue.close)
+
+# Auth hits bump usage_count / last_access_date in memory; one batched UPDATE every few seconds
+from core.usage import UsageAggregator
+
+LICENSE_USAGE_FLUSH_SECS = float(os.getenv("LICENSE_USAGE_FLUSH_SECS", "5"))
+
+license_usage = UsageAggregator(
+    connect=lambda: get_db_connection(),
+    release=lambda conn, mode: release_db_connection(conn, mode),
+    queries=queries,
+    interval=LICENSE_USAGE_FLUSH_SECS,
+).start()
+atexit.register(license_usage.close)
 
 # --- QUANTUM HWID & GUARDIAN CORE ---
 def generate_quantum_hwid(raw_id):
@@ -65,6 +182,15 @@ def generate_quantum_hwid(raw_id):
     hwid_hash = hashlib.sha256(combined.encode()).hexdigest().upper()
     return f"QX-ID-{hwid_hash[:4]}-{hwid_hash[8:12]}-{hwid_hash[24:28]}"
 
+# --- UPSTREAM HTTP (pooled keep-alive sessions) ---
+# One session for every REST upstream: no TCP+TLS handshake per candle fetch / geo lookup
+from core.http_client import default_client
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))  # Keep-alive connections per broker host
+http_client = default_client()
+http_client.configure("mrbeaxt.site", pool_size=HTTP_POOL_SIZE, timeout=(3.05, 8))
+http_client.configure("www.alphavantage.co", pool_size=2, timeout=(3.05, 10))
+http_client.configure("ip-api.com", pool_size=4, timeout=(3.05, 8), retries=1)
+
 def get_geo_info(ip):
     """
     ENHANCED IP GEOLOCATION TRACKING
@@ -87,9 +213,8 @@ def get_geo_info(ip):
         
         # Use ip-api.com for comprehensive geolocation (free, no API key needed)
         # Returns: country, region, city, timezone, isp, lat, lon, zip, org
-        resp = requests.get(
-            f"http://ip-api.com/json/{ip}?fields=status,message,country,countryCode,region,regionName,city,zip,lat,lon,timezone,isp,org,as,query",
-            timeout=8
+        resp = http_client.get(
+            f"http://ip-api.com/json/{ip}?fields=status,message,country,countryCode,region,regionName,city,zip,lat,lon,timezone,isp,org,as,query"
         )
         
         if resp.status_code == 200:
@@ -151,6 +276,10 @@ except ImportError as e:
     print(f"[CRITICAL] Broker modules missing: {e}. Running in restricted mode.")
 
 # --- ENGINE IMPORT ---
+from brokers.candles import CandleSeries, column, to_epoch
+from core.cache import TTLCache
+from core.prefetch import PrefetchScheduler
+from engine import indicators
 ENHANCED_ENGINE_AVAILABLE = True
 load_dotenv()
 
@@ -177,8 +306,8 @@ def get_engines():
             
     if enhanced_engine is None and ENHANCED_ENGINE_AVAILABLE:
         try:
-            from engine.enhanced import EnhancedEngine
-            enhanced_engine = EnhancedEngine()
+            from engine.enhanced import EnhancedEngine, MAX_MEMO_SIGNALS
+            enhanced_engine = EnhancedEngine(signal_memo=shared_cache(shared_state, maxsize=MAX_MEMO_SIGNALS, name="signals"))
             print("[ENGINE] Pro Engine v3.0 Loaded")
         except:
             enhanced_engine = None
@@ -188,11 +317,50 @@ def get_engines():
 app = Flask(__name__, static_url_path='', static_folder='.')
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-REQUEST_LOG = defaultdict(list)
-LICENSE_CACHE = {} # Cache for verified keys: {key:device: (timestamp, status, category, expiry)}
+# --- SHARED STATE (multi-worker) ---
+# memory (default): per-process caches and limits, right for --workers 1
+# sqlite[:path]: caches, rate limits and invalidations shared by every worker on this host
+from core.shared_state import open_backend, shared_cache
+SHARED_STATE = os.getenv("SHARED_STATE", "memory")
+shared_state = open_backend(SHARED_STATE)
+
 CACHE_TTL = 300   # 5 Minutes cache to handle 1000+ concurrent users efficiently
-RATE_LIMIT_WINDOW = 60
-RATE_LIMIT_MAX = 5000
+LICENSE_NEGATIVE_TTL = 30  # Unknown keys / device mismatches are re-checked sooner
+LICENSE_CACHE_SIZE = int(os.getenv("LICENSE_CACHE_SIZE", "20000"))
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")  # Enables /api/admin/license_cache/invalidate and /api/diagnostics
+# Verified license rows per key: clean_key -> LicenseRecord (expiry pre-parsed to an epoch)
+# status None = key does not exist (negative entry)
+from core.license_record import LicenseRecord
+LICENSE_CACHE = shared_cache(shared_state, maxsize=LICENSE_CACHE_SIZE, ttl=CACHE_TTL, name="licenses")
+# Auto-login index: device_id -> LicenseRecord of its ACTIVE license (None = no active license, negative TTL)
+DEVICE_LICENSE_CACHE = shared_cache(shared_state, maxsize=LICENSE_CACHE_SIZE, ttl=CACHE_TTL, name="device_licenses")
+# Per-route limits: "count/seconds[:burst]" per client (GCRA, one float per client)
+from core.rate_limit import RateLimiter
+RATE_LIMITS = {
+    "predict": RateLimiter.from_spec(os.getenv("RATE_LIMIT_PREDICT", "5000/60"), "5000/60", name="predict", backend=shared_state),            # per key:device
+    "validate_license": RateLimiter.from_spec(os.getenv("RATE_LIMIT_VALIDATE", "30/60:10"), "30/60:10", name="validate_license", backend=shared_state),  # per IP
+    "track_outcome": RateLimiter.from_spec(os.getenv("RATE_LIMIT_TRACK_OUTCOME", "300/60"), "300/60", name="track_outcome", backend=shared_state),      # per IP
+}
+
+def client_ip():
+    return request.headers.get('CF-Connecting-IP') or request.headers.get('X-Forwarded-For', request.remote_addr or '').split(',')[0].strip()
+
+# Set in the WSGI environ by app_async when it already charged the predict limit for this call
+PREDICT_LIMIT_CHECKED = "quantumx.predict_limit_checked"
+
+def rate_limit_payload(retry_after):
+    """(429 body, Retry-After header value)"""
+    return {"error": "Rate limit exceeded", "retry_after": round(retry_after, 1)}, str(max(1, int(retry_after + 0.999)))
+
+def rate_limited(route, client):
+    """429 response when `client` is over the route's limit, else None"""
+    allowed, retry_after = RATE_LIMITS[route].hit(client)
+    if allowed:
+        return None
+    body, retry_header = rate_limit_payload(retry_after)
+    response = jsonify(body)
+    response.headers["Retry-After"] = retry_header
+    return response, 429
 
 @app.route('/')
 def serve_index():
@@ -250,7 +418,98 @@ def is_market_open():
 
 # --- SERVER OPTIMIZATION: CONNECTION POOLING ---
 # Persistent connections for high-speed performance on Render
+from core.db_pool import HealthCheckedPool
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "4"))            # Idle connections kept open (psycopg2 closes the rest on return)
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "20"))
+DB_IDLE_CHECK_SECS = int(os.getenv("DB_IDLE_CHECK_SECS", "30"))  # Ping only connections idle longer than this
+DB_KEEPALIVE_SECS = int(os.getenv("DB_KEEPALIVE_SECS", "60"))
+DB_DIRECT_RETRY_SECS = 30  # After a failed direct connect, stay on the fallback this long
+DB_POOL_WAIT_MS = int(os.getenv("DB_POOL_WAIT_MS", "0"))  # Wait for a free pool slot before falling back (0 = never)
+
+from core.sqlite_store import SQLiteConnectionManager
+sqlite_store = SQLiteConnectionManager(DB_FILE)
+
+# --- GEOLOCATION (off the request path) ---
+# Cached per IP (memory + geo_cache table in the local SQLite file); misses answer from the
+# offline IP-range file and are resolved online in the background, then written to the license row
+from core.geo import GeoLocator
+
+GEO_CACHE_TTL = int(os.getenv("GEO_CACHE_TTL", str(7 * 86400)))
+GEO_IP_RANGES_FILE = os.getenv("GEO_IP_RANGES_FILE", "ip_ranges.csv")  # start,end,country_code[,country,region,city,...]
+
+def _enrich_license_geo(ip, geo, clean_key):
+    if clean_key:
+        # The IP is written with its geo so the row never pairs one address with another's location
+        logging_queue.submit("enrich_license_geo", (
+            ip, geo.get('country', 'Unknown'), geo.get('city', 'Unknown'), geo.get('timezone', 'UTC'), clean_key))
+
+geo_locator = GeoLocator(
+    fetch=lambda ip: get_geo_info(ip),
+    connect=sqlite_store.connection,
+    ranges_path=GEO_IP_RANGES_FILE,
+    ttl=GEO_CACHE_TTL,
+    on_resolved=_enrich_license_geo,
+)
+atexit.register(geo_locator.shutdown)
+
+# --- LOCAL LICENSE REPLICA ---
+# A local SQLite table (license_replica) is kept a full copy of the cloud licenses table (full
+# pull at boot, then incremental on last_modified); auth reads are served locally, Postgres
+# takes the writes. It is separate from the fallback licenses table so the master keys seeded
+# there for SQLite mode never answer while the primary is reachable.
+from core.replica import LicenseReplicator
+
+LICENSE_REPLICA_ENABLED = os.getenv("LICENSE_REPLICA", "1") == "1"
+LICENSE_REPLICA_SYNC_SECS = float(os.getenv("LICENSE_REPLICA_SYNC_SECS", "5"))
+LICENSE_REPLICA_FULL_SECS = int(os.getenv("LICENSE_REPLICA_FULL_SECS", "3600"))
+
+license_replica = LicenseReplicator(
+    source=lambda: get_db_connection(),
+    release=lambda conn, mode: release_db_connection(conn, mode),
+    local=sqlite_store.connection,
+    queries=queries,
+    interval=LICENSE_REPLICA_SYNC_SECS,
+    full_every=LICENSE_REPLICA_FULL_SECS,
+    local_init=lambda: init_license_replica(sqlite_store.connection()),
+    on_change=lambda keys: _on_replica_change(keys),
+)
+
+def init_license_replica(conn):
+    """Local replica table: only ever written by the replicator (pulls + read-your-writes)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS license_replica (
+            key_code TEXT PRIMARY KEY,
+            category TEXT,
+            status TEXT,
+            device_id TEXT,
+            expiry_date TIMESTAMP,
+            activation_date TIMESTAMP,
+            last_modified TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_license_replica_key_upper ON license_replica (UPPER(key_code))")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_license_replica_device_status ON license_replica (device_id, status)")
+    conn.commit()
+
+def read_license(name, params, cur, db_type):
+    """
+    Auth read. Primary reachable: the local replica once in sync, the primary for keys not pulled yet.
+    SQLite fallback: the local licenses table (as before the replica), then the replica.
+    """
+    if db_type == 'postgres':
+        if license_replica.ready:
+            row = license_replica.fetchone("replica_" + name, params)
+            if row is not None:
+                return row
+        return queries.fetchone(cur, db_type, name, params)
+    row = queries.fetchone(cur, db_type, name, params)
+    if row is None and license_replica.ready:
+        row = license_replica.fetchone("replica_" + name, params)
+    return row
+
 pg_pool = None
+DB_MODE_STATE = {"mode": None, "direct_retry_at": 0.0}
 
 def init_db_pool(custom_url=None):
     global pg_pool
@@ -263,18 +522,24 @@ def init_db_pool(custom_url=None):
     
     print(f"[DB-INIT] Establishing Institutional Link via {port_label}...")
     try:
-        pg_pool = psycopg2.pool.ThreadedConnectionPool(
-            1, 20, # Dynamic scaling
+        raw_pool = psycopg2.pool.ThreadedConnectionPool(
+            DB_POOL_MIN, DB_POOL_MAX, # Dynamic scaling
             target_url,
             connect_timeout=10, 
             sslmode='require',
             application_name='QuantumX-Enterprise'
         )
         # Test connection before declaring success
-        conn = pg_pool.getconn()
+        conn = raw_pool.getconn()
         with conn.cursor() as cur:
             cur.execute("SELECT 1")
-        pg_pool.putconn(conn)
+        raw_pool.putconn(conn)
+        pg_pool = HealthCheckedPool(
+            raw_pool,
+            idle_check_after=DB_IDLE_CHECK_SECS,
+            keepalive_interval=DB_KEEPALIVE_SECS,
+            wait_timeout=DB_POOL_WAIT_MS / 1000,
+        )
         print(f"[DB-SUCCESS] Link established on {port_label}.")
     except Exception as e:
         print(f"[DB-RETRY] {port_label} refused connection: {e}")
@@ -287,10 +552,22 @@ def init_db_pool(custom_url=None):
             print("[DB-CRITICAL] All cloud database links failed. System operating on Local Fallback Mode.")
 
 # Deferred pool initialization to prevent boot timeouts
-# init_db_pool() is now called by get_db_connection() on demand
+# init_db_pool() runs in a background thread from setup_on_first_request()
+
+def _note_db_mode(mode):
+    """Remembers the active DB mode; logs only on transitions instead of on every call"""
+    if DB_MODE_STATE["mode"] != mode:
+        print(f"[DB] Mode: {DB_MODE_STATE['mode'] or 'boot'} -> {mode}")
+        if mode == 'sqlite':
+            print("[DB] FALLBACK: Using Local SQLite for service continuity")
+        DB_MODE_STATE["mode"] = mode
 
 def get_db_connection():
-    """Fetches a connection from the high-speed pool and verifies it's alive"""
+    """
+    Fetches a connection from the health-checked pool.
+    Liveness is handled by the pool (idle threshold + keepalive + first-statement retry),
+    so the hot path costs no extra round trip.
+    """
     global pg_pool
     # Initialize these to ensure we always return a tuple
     db_conn = None
@@ -302,39 +579,27 @@ def get_db_connection():
 
         # 2. Try to get connection from Pool
         if pg_pool:
-            for _ in range(2):
-                try:
-                    conn = pg_pool.getconn()
-                    if conn and conn.closed == 0:
-                        try:
-                            with conn.cursor() as cur:
-                                cur.execute("SELECT 1")
-                            return conn, 'postgres'
-                        except:
-                            print("[POOL] Discarding dead connection...")
-                            try: pg_pool.putconn(conn, close=True)
-                            except: pass
-                except Exception as e:
-                    print(f"[POOL] Connection fetch warning: {e}")
-                    break
-
-        # 3. Cloud Fallback (No Pool - Direct) - Very fast attempt only
-        if DATABASE_URL:
+            try:
+                conn = pg_pool.getconn()
+                _note_db_mode('postgres')
+                return conn, 'postgres'
+            except Exception as e:
+                print(f"[POOL] Connection fetch warning: {e}")
+
+        # 3. Cloud Fallback (No Pool - Direct) - Very fast attempt only, skipped while known to be down
+        if DATABASE_URL and time.time() >= DB_MODE_STATE["direct_retry_at"]:
             try:
                 # 1 second ultra-fast direct attempt
                 conn = psycopg2.connect(DATABASE_URL, connect_timeout=1, sslmode='require')
+                _note_db_mode('postgres')
                 return conn, 'postgres'
             except:
-                pass
+                DB_MODE_STATE["direct_retry_at"] = time.time() + DB_DIRECT_RETRY_SECS
 
         # 4. Final Fallback: Local SQLite (Guaranteed to work)
-        print("[DB] FALLBACK: Using Local SQLite for service continuity")
-        # Ensure directory exists if subdirectories are specified
-        db_dir = os.path.dirname(DB_FILE)
-        if db_dir:
-            os.makedirs(db_dir, exist_ok=True)
-        db_conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-        db_conn.row_factory = sqlite3.Row
+        _note_db_mode('sqlite')
+        # Persistent per-thread connection (WAL + statement cache)
+        db_conn = sqlite_store.connection()
         return db_conn, 'sqlite'
         
     except Exception as e:
@@ -360,16 +625,19 @@ def release_db_connection(conn, mode):
                 conn.close()
             except:
                 pass
+    elif mode == 'sqlite':
+        # Persistent thread-local connection: reset, never closed
+        sqlite_store.release(conn)
     else:
-        # SQLite or other fallback
         try:
             conn.close()
         except:
             pass
 
-def init_db():
-    """Ensures the licenses and win_rate_tracking tables exist."""
-    conn, db_type = get_db_connection()
+def init_db(conn=None, db_type=None):
+    """Ensures the licenses and win_rate_tracking tables exist (on the given connection or the active DB)."""
+    if conn is None:
+        conn, db_type = get_db_connection()
     if not conn: return
 
     try:
@@ -393,6 +661,41 @@ def init_db():
                     timezone_geo TEXT
                 )
             """)
+            # 1b. expiry_date must be a real TIMESTAMP (older installs stored text / timestamptz)
+            cur.execute("""
+                SELECT data_type FROM information_schema.columns
+                WHERE table_name='licenses' AND column_name='expiry_date'
+            """)
+            expiry_type = (cur.fetchone() or [None])[0]
+            if expiry_type == 'timestamp with time zone':
+                cur.execute("ALTER TABLE licenses ALTER COLUMN expiry_date TYPE TIMESTAMP USING expiry_date AT TIME ZONE 'UTC'")
+                print("[DB] Migrated licenses.expiry_date to TIMESTAMP (UTC)")
+            elif expiry_type and expiry_type != 'timestamp without time zone':
+                cur.execute("SET LOCAL TIME ZONE 'UTC'")  # Offset-less text is UTC
+                cur.execute("""
+                    ALTER TABLE licenses ALTER COLUMN expiry_date TYPE TIMESTAMP
+                    USING NULLIF(NULLIF(TRIM(expiry_date::text), ''), 'None')::timestamptz AT TIME ZONE 'UTC'
+                """)
+                print(f"[DB] Migrated licenses.expiry_date from {expiry_type} to TIMESTAMP")
+            # 1c. last_modified watermark for the local license replica (bumped only when auth fields change)
+            cur.execute("ALTER TABLE licenses ADD COLUMN IF NOT EXISTS last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
+            cur.execute("""
+                CREATE OR REPLACE FUNCTION licenses_touch_last_modified() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP = 'INSERT' OR (NEW.key_code, NEW.category, NEW.status, NEW.device_id, NEW.expiry_date, NEW.activation_date)
+                        IS DISTINCT FROM (OLD.key_code, OLD.category, OLD.status, OLD.device_id, OLD.expiry_date, OLD.activation_date) THEN
+                        NEW.last_modified := clock_timestamp();
+                    END IF;
+                    RETURN NEW;
+                END $$ LANGUAGE plpgsql
+            """)
+            cur.execute("SELECT 1 FROM pg_trigger WHERE tgname = 'trg_licenses_last_modified'")
+            if not cur.fetchone():
+                cur.execute("""
+                    CREATE TRIGGER trg_licenses_last_modified BEFORE INSERT OR UPDATE ON licenses
+                    FOR EACH ROW EXECUTE PROCEDURE licenses_touch_last_modified()
+                """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_licenses_last_modified ON licenses (last_modified)")
             # 2. Win Rate Tracking
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS win_rate_tracking (
@@ -485,7 +788,8 @@ def init_db():
                     ('country', 'ALTER TABLE licenses ADD COLUMN country TEXT'),
                     ('city', 'ALTER TABLE licenses ADD COLUMN city TEXT'),
                     ('timezone_geo', 'ALTER TABLE licenses ADD COLUMN timezone_geo TEXT'),
-                    ('expiry_date', 'ALTER TABLE licenses ADD COLUMN expiry_date TIMESTAMP')
+                    ('expiry_date', 'ALTER TABLE licenses ADD COLUMN expiry_date TIMESTAMP'),
+                    ('last_modified', 'ALTER TABLE licenses ADD COLUMN last_modified TIMESTAMP')
                 ]
                 for col_name, sql in migrations:
                     if col_name not in cols:
@@ -495,6 +799,15 @@ def init_db():
                         except: pass
             except: pass
 
+            # 2b. Normalize expiry_date text to 'YYYY-MM-DD HH:MM:SS' UTC (ISO 'T', 'Z', offsets, fractions)
+            cur.execute("UPDATE licenses SET expiry_date = NULL WHERE TRIM(expiry_date) IN ('', 'None')")
+            cur.execute("""
+                UPDATE licenses SET expiry_date = strftime('%Y-%m-%d %H:%M:%S', expiry_date)
+                WHERE expiry_date LIKE '____-__-__%'
+                  AND strftime('%Y-%m-%d %H:%M:%S', expiry_date) IS NOT NULL
+                  AND expiry_date != strftime('%Y-%m-%d %H:%M:%S', expiry_date)
+            """)
+
             # 3. User Sessions
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS user_sessions (
@@ -574,6 +887,11 @@ def init_db():
                        ('KTXKTM77', 'PRO', 'ACTIVE'),
                        ('QX-ADMIN-PRO-99', 'OWNER', 'ACTIVE')
             """)
+
+        # Auth lookups match on UPPER(key_code): expression index instead of a sequential scan
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_licenses_key_upper ON licenses (UPPER(key_code))")
+        # Auto-login: WHERE device_id=? AND status='ACTIVE' ORDER BY last_access_date DESC
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_licenses_device_status_access ON licenses (device_id, status, last_access_date)")
         conn.commit()
         cur.close()
         release_db_connection(conn, db_type)
@@ -607,19 +925,7 @@ def update_system_status_to_db():
                     ('BACKEND_HEARTBEAT', 'ONLINE', datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
                 ]
 
-                for name, status, details in stats:
-                    if db_type == 'postgres':
-                        cur.execute("""
-                            INSERT INTO system_connectivity (service_name, status, details, last_heartbeat)
-                            VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
-                            ON CONFLICT (service_name) DO UPDATE 
-                            SET status = EXCLUDED.status, details = EXCLUDED.details, last_heartbeat = CURRENT_TIMESTAMP
-                        """, (name, status, details))
-                    else:
-                        cur.execute("""
-                            INSERT OR REPLACE INTO system_connectivity (service_name, status, details, last_heartbeat)
-                            VALUES (?, ?, ?, datetime('now'))
-                        """, (name, status, details))
+                queries.bulk(cur, db_type, "upsert_system_status", stats)
                 conn.commit()
                 cur.close()
         except Exception as e:
@@ -644,33 +950,43 @@ def setup_on_first_request():
         # Background high-perf tasks
         threading.Thread(target=init_db_pool, daemon=True).start()
         threading.Thread(target=update_system_status_to_db, daemon=True).start()
+        if LICENSE_REPLICA_ENABLED:
+            license_replica.start()
+        shared_state.start()
 
 # --- MARKET DATA FEED (ENHANCED) ---
 class LiveMarketData:
     """
     Pulls live quotes from Alpha Vantage for key real-market pairs.
-    Uses lightweight caching to respect free-tier limits (5 req/min).
+    Caching lives in MarketDataFeed.candle_cache (one fetch per market per candle),
+    which keeps us inside the free-tier limits (5 req/min).
+    Request building and parsing are separate from the HTTP call so the async
+    server (app_async.py) can issue the same requests with aiohttp.
     """
-    def __init__(self, api_key):
+    URL = "https://www.alphavantage.co/query"
+    TIMEOUT = 10
+
+    def __init__(self, api_key, http=None):
         self.api_key = api_key
-        self.cache = {}  # key -> (timestamp, candles)
-        self.cache_ttl = 55  # seconds
-        self.cache_ttl = 55  # seconds
+        self.http = http or http_client
 
-    def _cached(self, key):
-        now = time.time()
-        if key in self.cache:
-            ts, data = self.cache[key]
-            if now - ts < self.cache_ttl:
-                return data
+    def request_for(self, asset):
+        """(query params, parser(json) -> CandleSeries or None) for a supported asset, else None"""
+        key = asset.upper()
+        if key == "EUR/USD":
+            return self._fx_intraday("EUR", "USD")
+        elif key == "GBP/USD":
+            return self._fx_intraday("GBP", "USD")
+        elif key == "USD/JPY":
+            return self._fx_intraday("USD", "JPY")
+        elif key == "XAU/USD":
+            # Spot fallback
+            return self._fx_spot("XAU", "USD")
+        elif key == "BTC/USD":
+            return self._crypto_intraday("BTC", "USD")
         return None
 
-    def _store(self, key, data):
-        self.cache[key] = (time.time(), data)
-        return data
-
-    def _fetch_fx_intraday(self, from_sym, to_sym):
-        url = "https://www.alphavantage.co/query"
+    def _fx_intraday(self, from_sym, to_sym):
         params = {
             "function": "FX_INTRADAY",
             "from_symbol": from_sym,
@@ -679,23 +995,9 @@ class LiveMarketData:
             "outputsize": "compact",
             "apikey": self.api_key,
         }
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        series = data.get("Time Series FX (1min)", {})
-        candles = []
-        for ts, v in list(series.items())[:50]:
-            candles.append({
-                "open": float(v["1. open"]),
-                "high": float(v["2. high"]),
-                "low": float(v["3. low"]),
-                "close": float(v["4. close"]),
-                "ts": ts
-            })
-        return candles[::-1] if candles else None
-
-    def _fetch_crypto_intraday(self, symbol, market="USD"):
-        url = "https://www.alphavantage.co/query"
+        return params, lambda data: self._parse_series(data, "Time Series FX (1min)")
+
+    def _crypto_intraday(self, symbol, market="USD"):
         params = {
             "function": "CRYPTO_INTRADAY",
             "symbol": symbol,
@@ -703,80 +1005,115 @@ class LiveMarketData:
             "interval": "1min",
             "apikey": self.api_key,
         }
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        series = data.get("Time Series Crypto (1min)", {})
-        candles = []
-        for ts, v in list(series.items())[:50]:
-            candles.append({
-                "open": float(v["1. open"]),
-                "high": float(v["2. high"]),
-                "low": float(v["3. low"]),
-                "close": float(v["4. close"]),
-                "ts": ts
-            })
-        return candles[::-1] if candles else None
-
+        return params, lambda data: self._parse_series(data, "Time Series Crypto (1min)")
 
-    def _fetch_fx_spot(self, from_sym, to_sym):
-        """
-        Single quote fallback; builds small synthetic candles around spot.
-        """
-        url = "https://www.alphavantage.co/query"
+    def _fx_spot(self, from_sym, to_sym):
         params = {
             "function": "CURRENCY_EXCHANGE_RATE",
             "from_currency": from_sym,
             "to_currency": to_sym,
             "apikey": self.api_key,
         }
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+        return params, self._parse_spot
+
+    @staticmethod
+    def _parse_series(data, series_key):
+        series = data.get(series_key, {})
+        rows = []
+        for ts, v in list(series.items())[:50]:
+            rows.append((
+                float(v["1. open"]),
+                float(v["2. high"]),
+                float(v["3. low"]),
+                float(v["4. close"]),
+                0.0,
+                to_epoch(ts)
+            ))
+        return CandleSeries.from_rows(reversed(rows)) if rows else None
+
+    @staticmethod
+    def _parse_spot(data):
+        """
+        Single quote fallback; builds small synthetic candles around spot.
+        """
         rate_info = data.get("Realtime Currency Exchange Rate", {})
         price = float(rate_info.get("5. Exchange Rate", 0))
         if not price:
             return None
-        candles = []
+        candles = CandleSeries()
+        now = time.time()
         for i in range(20):
             jitter = (random.random() - 0.5) * price * 0.0002
             close = price + jitter
-            candles.append({
-                "open": close - jitter * 0.5,
-                "high": close + abs(jitter),
-                "low": close - abs(jitter),
-                "close": close,
-                "ts": time.time() - i * 60
-            })
+            candles.append(
+                close - jitter * 0.5,
+                close + abs(jitter),
+                close - abs(jitter),
+                close,
+                ts=now - (19 - i) * 60
+            )
         return candles
 
     def get_candles(self, asset):
-        key = asset.upper()
-        cached = self._cached(key)
-        if cached:
-            return cached
-
+        request_spec = self.request_for(asset)
+        if not request_spec:
+            return None
+        params, parse = request_spec
         try:
-            if key == "EUR/USD":
-                data = self._fetch_fx_intraday("EUR", "USD")
-            elif key == "GBP/USD":
-                data = self._fetch_fx_intraday("GBP", "USD")
-            elif key == "USD/JPY":
-                data = self._fetch_fx_intraday("USD", "JPY")
-            elif key == "XAU/USD":
-                # Spot fallback
-                data = self._fetch_fx_spot("XAU", "USD")
-            elif key == "BTC/USD":
-                data = self._fetch_crypto_intraday("BTC", "USD")
-            else:
-                data = None
+            resp = self.http.get(self.URL, params=params, timeout=(3.05, self.TIMEOUT))
+            resp.raise_for_status()
+            data = parse(resp.json())
         except Exception as e:
             print(f"[LIVE] Alpha Vantage fetch failed for {asset}: {e}")
             data = None
 
-        if data:
-            return self._store(key, data)
-        return None
+        return data if data else None
+
+# --- SHARED CANDLE CACHE ---
+CANDLE_CACHE_SIZE = int(os.getenv("CANDLE_CACHE_SIZE", "512"))  # (market, timeframe) entries
+CANDLE_CLOSE_GRACE = 1.0   # Seconds after the boundary before the broker publishes the closed candle
+SYNTHETIC_CACHE_TTL = 5    # Short negative-style TTL so a recovered upstream is picked up quickly
+
+# --- LIVE CANDLE RINGS ---
+# Streaming adapters (Deriv WS, PyQuotex stream, Pocket Option WS) write candles into
+# fixed-size rings; get_candles reads them before any cache or REST call
+from brokers.candle_ring import default_store, market_key
+CANDLE_RING_CAPACITY = int(os.getenv("CANDLE_RING_CAPACITY", "300"))  # Closed candles per (broker, market, timeframe)
+CANDLE_RING_MAX = int(os.getenv("CANDLE_RING_MAX", "512"))            # Rings kept (LRU); bounds the memory
+CANDLE_RING_MIN_CANDLES = 30   # Streamed history needed before it replaces a REST fetch
+CANDLE_RING_READ = 50          # Candles handed to the engines (same as a broker fetch)
+candle_store = default_store(CANDLE_RING_CAPACITY, CANDLE_RING_MAX)
+
+# --- HOT MARKET PREFETCH ---
+PREFETCH_HOT_MARKETS = int(os.getenv("PREFETCH_HOT_MARKETS", "20"))  # 0 disables the scheduler
+# After each candle close; never inside the publish grace (a pre-publish fetch would be cached all candle)
+PREFETCH_DELAY_MS = max(int(os.getenv("PREFETCH_DELAY_MS", "1000")), int(CANDLE_CLOSE_GRACE * 1000))
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+# Max concurrent fetches per upstream, e.g. "QUOTEX=4,ALPHA_VANTAGE=1,DEFAULT=4"
+UPSTREAM_CONCURRENCY = os.getenv("UPSTREAM_CONCURRENCY", "QUOTEX=4,IQOPTION=2,POCKETOPTION=2,BINOLLA=2,ALPHA_VANTAGE=1,DEFAULT=4")
+
+def parse_upstream_limits(spec):
+    limits = {}
+    for part in (spec or "").split(","):
+        name, _, value = part.partition("=")
+        try:
+            limits[name.strip().upper()] = max(1, int(value))
+        except ValueError:
+            continue
+    limits.setdefault("DEFAULT", 4)
+    return limits
+
+def seconds_until_candle_close(tf_seconds, now=None):
+    """
+    Time left until the current candle of `tf_seconds` closes (plus publish grace).
+    Inside the grace the broker may not have published the closed candle yet: only the rest
+    of the grace, so the next read re-fetches.
+    """
+    now = time.time() if now is None else now
+    since_close = now % tf_seconds
+    if since_close < CANDLE_CLOSE_GRACE:
+        return CANDLE_CLOSE_GRACE - since_close
+    return (int(now // tf_seconds) + 1) * tf_seconds + CANDLE_CLOSE_GRACE - now
 
 class MarketDataFeed:
     def __init__(self):
@@ -784,9 +1121,19 @@ class MarketDataFeed:
         self.active_broker = None
         self.live_data = LiveMarketData(os.getenv("ALPHA_VANTAGE_KEY", "VVGMFL50W479KT8T"))
         self.quotex_ws = QuotexWSAdapter()
-        self.forex_ws = ForexWSAdapter()
+        self.candle_store = candle_store
+        self.forex_ws = ForexWSAdapter(store=candle_store)
         self.ws_started = False
         self._lock = threading.Lock()
+        self.candle_cache = shared_cache(shared_state, maxsize=CANDLE_CACHE_SIZE, name="candles")
+        self.upstream_limits = parse_upstream_limits(UPSTREAM_CONCURRENCY)
+        self._upstream_slots = {}
+        self.prefetcher = PrefetchScheduler(
+            self.refresh_candles,
+            hot_markets=PREFETCH_HOT_MARKETS,
+            delay=PREFETCH_DELAY_MS / 1000,
+            workers=PREFETCH_WORKERS,
+        )
 
     def _ensure_ws(self):
         """Lazy start for WebSockets to save memory at boot"""
@@ -867,22 +1214,85 @@ class MarketDataFeed:
         t.daemon = True
         t.start()
 
+    def market_key(self, asset):
+        """Cache identity of an asset: 'EUR/USD (OTC)' and 'EURUSD_otc' both map to 'EURUSD_OTC'"""
+        return market_key(asset)
+
     def get_candles(self, asset, timeframe_minutes):
+        """
+        Streamed candles from the ring store when an adapter keeps the market live (no fetch at all),
+        else cached access keyed on (market, timeframe).
+        Entries expire when the current candle closes; concurrent misses share ONE upstream fetch.
+        """
+        live = self.ring_candles(asset, timeframe_minutes)
+        if live is not None:
+            return live
+        key = self._candle_key(asset, timeframe_minutes)
+        self.prefetcher.record(key, asset, timeframe_minutes)
+        self.prefetcher.start()
+        candles, _ = self.candle_cache.get_or_load(key, lambda: self._fetch_candles(asset, timeframe_minutes), ttl=self._candle_ttl(key))
+        return candles
+
+    def refresh_candles(self, asset, timeframe_minutes):
+        """Prefetch hook: reloads (market, timeframe) just after a candle close and pre-warms the engine"""
+        key = self._candle_key(asset, timeframe_minutes)
+        candles, synthetic = self.candle_cache.get_or_load(
+            key, lambda: self._fetch_candles(asset, timeframe_minutes), ttl=self._candle_ttl(key), force=True
+        )
+        if not synthetic:
+            _, enh_eng = get_engines()
+            if enh_eng:
+                enh_eng.warm(asset, timeframe_minutes, candles)
+        return candles
+
+    def _candle_key(self, asset, timeframe_minutes):
+        return (self.market_key(asset), max(1, int(timeframe_minutes or 1)) * 60)
+
+    def _candle_ttl(self, key):
+        tf_seconds = key[1]
+
+        def ttl(result):
+            _, synthetic = result
+            return SYNTHETIC_CACHE_TTL if synthetic else seconds_until_candle_close(tf_seconds)
+        return ttl
+
+    def upstream_slot(self, name):
+        """Per-upstream semaphore so prefetch bursts never exceed the broker's concurrency budget"""
+        slot = self._upstream_slots.get(name)
+        if slot is None:
+            with self._lock:
+                slot = self._upstream_slots.get(name)
+                if slot is None:
+                    limit = self.upstream_limits.get(name, self.upstream_limits["DEFAULT"])
+                    slot = self._upstream_slots[name] = threading.BoundedSemaphore(limit)
+        return slot
+
+    def ring_candles(self, asset, timeframe_minutes, count=CANDLE_RING_READ):
+        """
+        Last closed candles from the freshest streaming ring (zero-copy), or None until one holds
+        enough history. Real markets Deriv lists are followed on its stream on first use.
+        """
+        tf_seconds = max(1, int(timeframe_minutes or 1)) * 60
+        if "(OTC)" not in asset and self.forex_ws.connected:
+            self.forex_ws.subscribe(self.forex_ws.symbol_for(asset))
+        return self.candle_store.last(asset, tf_seconds, count, min_count=CANDLE_RING_MIN_CANDLES)
+
+    def _fetch_candles(self, asset, timeframe_minutes):
         """
         Fetches candles. Tries real brokers first, then simulation fallback.
+        Returns (candles, is_synthetic).
         """
-        # 0. Live market data for non-OTC majors (Alpha Vantage or Binary.com WS)
+        # 0. Streamed candles (Deriv WS / broker streams) already in the ring store
+        live = self.ring_candles(asset, timeframe_minutes)
+        if live is not None:
+            return live, False
+
+        # Live market data for non-OTC majors (Alpha Vantage)
         if "(OTC)" not in asset:
-            # Try Binary.com WS first for real-time forex
-            if self.forex_ws.connected:
-                price = self.forex_ws.get_price(asset)
-                if price:
-                    # Create a synthetic recent candle from the tick
-                    return [{"close": price, "open": price, "high": price, "low": price, "ts": time.time()}]
-            
-            live = self.live_data.get_candles(asset)
+            with self.upstream_slot("ALPHA_VANTAGE"):
+                live = self.live_data.get_candles(asset)
             if live:
-                return live
+                return live, False
 
         tf_seconds = timeframe_minutes * 60
         # Preferred active broker then others defined in config
@@ -900,9 +1310,10 @@ class MarketDataFeed:
             if not getter:
                 continue
             try:
-                live = getter(asset, tf_seconds, 50)
+                with self.upstream_slot(name):
+                    live = getter(asset, tf_seconds, 50)
                 if live:
-                    return live
+                    return live, False
             except Exception as e:
                 # Silent failure to proceed to next adapter or simulation
                 pass
@@ -915,23 +1326,24 @@ class MarketDataFeed:
         if "OTC" in asset: last_price = random.uniform(0.5, 1.5)
         elif "USD" in asset: last_price = random.uniform(1.0, 1.3)
         
-        candles = []
+        candles = CandleSeries()
+        now = time.time()
         for i in range(50):
             noise = (random.random() - 0.5) * 0.0001
-            candles.append({
-                "open": last_price,
-                "high": last_price + abs(noise),
-                "low": last_price - abs(noise),
-                "close": last_price + noise,
-                "ts": time.time() - (i * tf_seconds)
-            })
+            candles.append(
+                last_price,
+                last_price + abs(noise),
+                last_price - abs(noise),
+                last_price + noise,
+                ts=now - ((49 - i) * tf_seconds)  # Oldest -> Newest for technical analysis
+            )
             last_price = last_price + noise
-        return candles[::-1] # Ensure Oldest -> Newest for technical analysis
+        return candles, True
 
     def generate_stochastic_candles(self, asset, timeframe_minutes):
         """Generates a high-fidelity, synchronized candle stream with stochastic noise."""
         now_ts = int(time.time() / 60) * 60
-        candles = []
+        rows = []
         
         # Consistent seed per asset/hour for global synchronization
         hour_ts = int(time.time() / 3600) * 3600
@@ -955,16 +1367,10 @@ class MarketDataFeed:
             high = max(c_open, c_close) + ( (c_seed % 100) / 100000.0 )
             low = min(c_open, c_close) - ( ((c_seed >> 4) % 100) / 100000.0 )
             
-            candles.append({
-                "open": c_open,
-                "high": high,
-                "low": low,
-                "close": c_close,
-                "ts": ts
-            })
+            rows.append((c_open, high, low, c_close, 0.0, ts))
             base_price = c_close # Next candle opens where this one closed
             
-        return candles[::-1]
+        return CandleSeries.from_rows(reversed(rows))
 
 # Global accessors removed top-level initialization
 # data_feed = MarketDataFeed()
@@ -977,37 +1383,21 @@ class InstitutionalSignalEngine:
         pass
 
     def calculate_rsi(self, prices, period=14):
+        # Not a textbook RSI: the last `period` gains and the last `period` losses of the whole
+        # series are averaged separately (the strategy thresholds were tuned on this)
         if not prices: return 50
-        deltas = [prices[i+1] - prices[i] for i in range(len(prices)-1)]
-        gains = [d for d in deltas if d > 0]
-        losses = [-d for d in deltas if d < 0]
-        avg_gain = sum(gains[-period:]) / period if len(gains) >= period else (sum(gains) / period if gains else 0)
-        avg_loss = sum(losses[-period:]) / period if len(losses) >= period else (sum(losses) / period if losses else 0)
-        if avg_loss == 0: return 100
-        rs = avg_gain / avg_loss
-        return 100 - (100 / (1 + rs))
+        return indicators.rsi_last_moves(prices, period)
 
     def calculate_sma(self, prices, period):
-        if len(prices) < period:
-            return sum(prices) / len(prices) if prices else 0
-        return sum(prices[-period:]) / period
+        if not prices:
+            return 0
+        return indicators.last(indicators.sma(prices, min(period, len(prices))), 0)
 
     def calculate_atr(self, candles, period=14):
         if not candles or len(candles) < 2:
             return 0
-        trs = []
-        for i in range(1, len(candles)):
-            prev = candles[i-1]
-            cur = candles[i]
-            tr = max(
-                cur["high"] - cur["low"],
-                abs(cur["high"] - prev["close"]),
-                abs(cur["low"] - prev["close"]),
-            )
-            trs.append(tr)
-        if len(trs) < period:
-            return sum(trs) / len(trs) if trs else 0
-        return sum(trs[-period:]) / period
+        highs, lows, closes = column(candles, "high"), column(candles, "low"), column(candles, "close")
+        return indicators.last(indicators.atr(highs, lows, closes, min(period, len(candles) - 1), method="sma"), 0)
 
     def score_trend(self, prices):
         if len(prices) < 5:
@@ -1051,7 +1441,7 @@ class InstitutionalSignalEngine:
         # 1. Get Data (Real or provided)
         if candles is None:
             candles = df.get_candles(marker, timeframe)
-        closes = [c['close'] for c in candles] if candles else []
+        closes = column(candles, 'close') if candles else []
         
         # 2. Reversal Engine Analysis
         rev_dir, rev_conf, rev_strategy = "NEUTRAL", 0, None
@@ -1119,6 +1509,9 @@ engine = InstitutionalSignalEngine()
 
 @app.route('/api/validate_license', methods=['POST'])
 def validate_license():
+    limited = rate_limited("validate_license", client_ip())
+    if limited:
+        return limited
     data = request.json
     key = data.get('key')
     device_id = data.get('device_id')
@@ -1139,37 +1532,24 @@ def validate_license():
         # Check Key (Case-Insensitive and Stripped)
         clean_key = key.strip().upper()
         
-        query = "SELECT key_code, category, status, device_id, expiry_date FROM licenses WHERE UPPER(key_code)=%s" if db_type == 'postgres' else "SELECT key_code, category, status, device_id, expiry_date FROM licenses WHERE UPPER(key_code)=?"
-        cur.execute(query, (clean_key,))
-        row = cur.fetchone()
+        row = read_license("license_by_key", (clean_key,), cur, db_type)
         
         if not row:
             print(f"[AUTH] ❌ INVALID ACCESS: Token '{clean_key}' not found.")
             return jsonify({"valid": False, "message": "Invalid Authorization Token. Contact System Admin."}), 200
             
         original_key, category, status, locked_device, expiry_date = row
-        
+        record = LicenseRecord(original_key, status, locked_device, category, expiry_date)
         
         # 1. Blocked Check
         if status == 'BLOCKED':
             print(f"[AUTH] ❌ BLOCKED ACCESS: Token '{clean_key}' is disabled.")
             return jsonify({"valid": False, "message": "This license has been suspended for security reasons."}), 200
 
-        # 2. Expiry Check
-        if expiry_date:
-            try:
-                now_utc = datetime.datetime.utcnow().replace(tzinfo=None)
-                if isinstance(expiry_date, str):
-                    try: exp = datetime.datetime.strptime(expiry_date, "%Y-%m-%d %H:%M:%S")
-                    except: exp = datetime.datetime.fromisoformat(expiry_date.replace('Z', '+00:00')).replace(tzinfo=None)
-                else:
-                    exp = expiry_date.replace(tzinfo=None) if hasattr(expiry_date, 'replace') else expiry_date
-                
-                if now_utc > exp:
-                    print(f"[AUTH] Key Expired: {clean_key} (Expiry: {exp})")
-                    return jsonify({"valid": False, "message": "This License Key has reached its expiration date."}), 200
-            except Exception as e:
-                print(f"[AUTH] Expiry Parse Warning: {e}")
+        # 2. Expiry Check (epoch parsed once when the record was built)
+        if record.expired():
+            print(f"[AUTH] Key Expired: {clean_key} (Expiry: {expiry_date})")
+            return jsonify({"valid": False, "message": "This License Key has reached its expiration date."}), 200
 
         # 3. STRICT DEVICE LOCK LOGIC
         # If license already has a device, check if it matches EXACTLY (case-sensitive)
@@ -1180,97 +1560,45 @@ def validate_license():
                     print(f"[AUTH] SECURITY BREACH: Key {clean_key} locked to {locked_device}, attempt from {device_id}")
                     return jsonify({"valid": False, "message": "SECURITY LOCK: This license is already registered to a different hardware signature. Transfer denied."}), 403
         
-        # 4. Get IP and Geolocation
+        # 4. Get IP and Geolocation (cached / offline; never waits on the geo provider)
         ip_addr = request.headers.get('CF-Connecting-IP') or request.headers.get('X-Forwarded-For', request.remote_addr).split(',')[0]
-        geo = get_geo_info(ip_addr)
+        geo = geo_locator.lookup(ip_addr, context=clean_key)
         
         # 5. ACTIVATE LICENSE (Like previous system)
         # If no device_id, this is first activation
         if not locked_device or locked_device == "None":
             print(f"[AUTH] Activating New Key on Device: {clean_key}")
-            if db_type == 'postgres':
-                cur.execute("""
-                    UPDATE licenses SET 
-                        status='ACTIVE', 
-                        device_id=%s, 
-                        ip_address=%s,
-                        country=%s,
-                        city=%s,
-                        timezone_geo=%s,
-                        activation_date=CURRENT_TIMESTAMP,
-                        last_access_date=CURRENT_TIMESTAMP,
-                        usage_count=1
-                    WHERE UPPER(key_code)=%s
-                """, (device_id, ip_addr, geo.get('country', 'Unknown'), geo.get('city', 'Unknown'), 
-                      geo.get('timezone', 'UTC'), clean_key))
-            else:
-                cur.execute("""
-                    UPDATE licenses SET 
-                        status='ACTIVE', 
-                        device_id=?, 
-                        ip_address=?,
-                        country=?,
-                        city=?,
-                        timezone_geo=?,
-                        activation_date=datetime('now'),
-                        last_access_date=datetime('now'),
-                        usage_count=1
-                    WHERE UPPER(key_code)=?
-                """, (device_id, ip_addr, geo.get('country', 'Unknown'), geo.get('city', 'Unknown'),
-                      geo.get('timezone', 'UTC'), clean_key))
+            activated = queries.execute(cur, db_type, "activate_license", (
+                device_id, ip_addr, geo.get('country', 'Unknown'), geo.get('city', 'Unknown'),
+                geo.get('timezone', 'UTC'), clean_key)).rowcount
+            if not activated:
+                # The device check read the replica (can lag); another device claimed the key first
+                conn.rollback()
+                print(f"[AUTH] SECURITY BREACH: Key {clean_key} was activated on another device first (DEVICE_MISMATCH)")
+                invalidate_license(clean_key)
+                return jsonify({"valid": False, "message": "SECURITY LOCK: This license is already registered to a different hardware signature. Transfer denied."}), 403
         else:
-            # Already activated, just update last access
-            if db_type == 'postgres':
-                cur.execute("""
-                    UPDATE licenses SET 
-                        last_access_date=CURRENT_TIMESTAMP,
-                        usage_count=COALESCE(usage_count, 0) + 1,
-                        ip_address=%s
-                    WHERE UPPER(key_code)=%s
-                """, (ip_addr, clean_key))
+            # Already activated, just count the access (flushed in the background)
+            license_usage.record(original_key, ip_addr)
         
         conn.commit()
+        if not locked_device or locked_device == "None":
+            if db_type == 'postgres':
+                # Read-your-writes: the local replica sees the activation before the next pull
+                license_replica.apply(original_key, category, 'ACTIVE', device_id, expiry_date,
+                                      datetime.datetime.utcnow())
+            invalidate_license(clean_key)  # PENDING -> ACTIVE must not wait for the cache TTL
         try:
             timezone_str = data.get('timezone', 'Unknown')
             screen_str = data.get('screen', '0x0')
             platform_str = request.headers.get('Sec-Ch-Ua-Platform', 'Unknown').strip('"')
             
-            if db_type == 'postgres':
-                cur.execute("""
-                    INSERT INTO user_sessions 
-                    (license_key, device_id, ip_address, user_agent, timezone, resolution, platform, 
-                     country, region, city, isp, latitude, longitude, postal_code, organization, login_time) 
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                """, (original_key, device_id, ip_addr, request.headers.get('User-Agent', 'Unknown'), 
-                      timezone_str, screen_str, platform_str,
-                      geo.get('country', 'Unknown'), geo.get('region', 'Unknown'), geo.get('city', 'Unknown'),
-                      geo.get('isp', 'Unknown'), geo.get('lat', 0.0), geo.get('lon', 0.0),
-                      geo.get('zip', 'Unknown'), geo.get('org', 'Unknown')))
-                
-                # MIRROR TO LOCAL SQLITE: Save this license for offline access
-                try:
-                    local_conn = sqlite3.connect(DB_FILE, timeout=5)
-                    local_cur = local_conn.cursor()
-                    local_cur.execute("""
-                        INSERT OR REPLACE INTO licenses 
-                        (key_code, category, status, device_id, ip_address, activation_date, expiry_date, last_access_date)
-                        VALUES (?, ?, ?, ?, ?, datetime('now'), ?, datetime('now'))
-                    """, (clean_key, category, status, device_id, ip_addr, str(expiry_date) if expiry_date else None))
-                    local_conn.commit()
-                    local_conn.close()
-                except Exception as ex:
-                    print(f"[MIRROR] License Cache fail: {ex}")
-            else:
-                cur.execute("""
-                    INSERT INTO user_sessions 
-                    (license_key, device_id, ip_address, user_agent, timezone, resolution, platform,
-                     country, region, city, isp, latitude, longitude, postal_code, organization, login_time) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
-                """, (original_key, device_id, ip_addr, request.headers.get('User-Agent', 'Unknown'),
-                      timezone_str, screen_str, platform_str,
-                      geo.get('country', 'Unknown'), geo.get('region', 'Unknown'), geo.get('city', 'Unknown'),
-                      geo.get('isp', 'Unknown'), geo.get('lat', 0.0), geo.get('lon', 0.0),
-                      geo.get('zip', 'Unknown'), geo.get('org', 'Unknown')))
+            queries.execute(cur, db_type, "log_session", (
+                original_key, device_id, ip_addr, request.headers.get('User-Agent', 'Unknown'),
+                timezone_str, screen_str, platform_str,
+                geo.get('country', 'Unknown'), geo.get('region', 'Unknown'), geo.get('city', 'Unknown'),
+                geo.get('isp', 'Unknown'), geo.get('lat', 0.0), geo.get('lon', 0.0),
+                geo.get('zip', 'Unknown'), geo.get('org', 'Unknown')))
         except Exception as e:
             print(f"[DB-LOG] Session log warning: {e}")
             
@@ -1306,13 +1634,6 @@ def check_device_sync():
             print("[AUTH-SYNC] ❌ Invalid device_id provided")
             return jsonify({"valid": False, "message": "Invalid device signature"}), 200
         
-        conn, db_type = get_db_connection()
-        if not conn: 
-            print("[AUTH-SYNC] ❌ Database connection failed")
-            return jsonify({"valid": False, "message": "Database unavailable"}), 500
-        
-        cur = conn.cursor()
-        
         # CRITICAL SECURITY: Only allow auto-login if:
         # 1. License key EXISTS in database
         # 2. License status is ACTIVE (not PENDING or BLOCKED)
@@ -1320,30 +1641,20 @@ def check_device_sync():
         # 4. License has not expired
         # 5. For non-OWNER accounts, status MUST be ACTIVE (PENDING requires manual activation)
         
-        if db_type == 'postgres':
-            cur.execute("""
-                SELECT key_code, category, expiry_date, status, activation_date, device_id 
-                FROM licenses 
-                WHERE device_id=%s
-                AND status='ACTIVE'
-                ORDER BY last_access_date DESC LIMIT 1
-            """, (device_id,))
-        else:
-            cur.execute("""
-                SELECT key_code, category, expiry_date, status, activation_date, device_id 
-                FROM licenses 
-                WHERE device_id=? 
-                AND status='ACTIVE'
-                ORDER BY last_access_date DESC LIMIT 1
-            """, (device_id,))
-            
-        row = cur.fetchone()
+        # device_id -> license index (steady state never touches the database)
+        try:
+            record = DEVICE_LICENSE_CACHE.get_or_load(
+                device_id, lambda: _load_device_license(device_id), ttl=_device_license_ttl, cache_none=True)
+        except LicenseLookupError:
+            print("[AUTH-SYNC] ❌ Database connection failed")
+            return jsonify({"valid": False, "message": "Database unavailable"}), 500
         
-        if not row:
+        if not record:
             print(f"[AUTH-SYNC] ❌ No ACTIVE license found for device: {device_id[:20]}...")
             return jsonify({"valid": False, "message": "No active license found for this device"}), 200
             
-        key, category, expiry_date, status, activation_date, reg_device = row
+        key, category, expiry_date, status = record.key_code, record.category, record.expiry, record.status
+        activation_date, reg_device = record.activation_date, record.device_id
         
         # Double check device match (extra security layer)
         if reg_device != device_id:
@@ -1353,81 +1664,25 @@ def check_device_sync():
         # CRITICAL: Double-check status (defense in depth)
         if status != 'ACTIVE':
             print(f"[AUTH-SYNC] ❌ License {key} is not ACTIVE (status: {status})")
-            cur.close()
-            release_db_connection(conn, db_type)
             return jsonify({"valid": False, "message": "License not activated"}), 200
         
         # CRITICAL: Ensure license was actually activated (not just pending)
         if category != 'OWNER' and not activation_date:
             print(f"[AUTH-SYNC] ❌ License {key} has no activation date")
-            cur.close()
-            release_db_connection(conn, db_type)
             return jsonify({"valid": False, "message": "License requires activation"}), 200
         
-        # Expiry check logic
-        is_valid = True
-        if expiry_date:
-            try:
-                now_utc = datetime.datetime.utcnow().replace(tzinfo=None)
-                if isinstance(expiry_date, str):
-                    try: exp = datetime.datetime.strptime(expiry_date, "%Y-%m-%d %H:%M:%S")
-                    except: exp = datetime.datetime.fromisoformat(expiry_date.replace('Z', '+00:00')).replace(tzinfo=None)
-                else:
-                    exp = expiry_date.replace(tzinfo=None) if hasattr(expiry_date, 'replace') else expiry_date
-                
-                if now_utc > exp:
-                    is_valid = False
-                    print(f"[AUTH-SYNC] ❌ License {key} expired on {exp}")
-            except Exception as e:
-                print(f"[AUTH-SYNC] ⚠️ Expiry check error: {e}")
-                pass
-        
-        if not is_valid:
-            cur.close()
-            release_db_connection(conn, db_type)
+        # Expiry check logic (integer compare against the parsed epoch)
+        if record.expired():
+            print(f"[AUTH-SYNC] ❌ License {key} expired on {expiry_date}")
             return jsonify({"valid": False, "message": "License Expired"}), 200
 
         # Get IP and update tracking with full metadata
         ip_addr = request.headers.get('CF-Connecting-IP') or request.headers.get('X-Forwarded-For', request.remote_addr).split(',')[0]
         
-        # Auto-update tracking with IP address
-        if db_type == 'postgres':
-            update_q = """
-                UPDATE licenses SET 
-                    last_access_date=CURRENT_TIMESTAMP, 
-                    usage_count = COALESCE(usage_count, 0) + 1,
-                    ip_address=%s
-                WHERE key_code=%s
-            """
-            cur.execute(update_q, (ip_addr, key))
-        else:
-            update_q = """
-                UPDATE licenses SET 
-                    last_access_date=datetime('now'), 
-                    usage_count = COALESCE(usage_count, 0) + 1,
-                    ip_address=?
-                WHERE key_code=?
-            """
-            cur.execute(update_q, (ip_addr, key))
-        
-        conn.commit()
+        # Auto-update tracking with IP address (coalesced, flushed in the background)
+        license_usage.record(key, ip_addr)
         
         print(f"[AUTH-SYNC] ✅ Auto-Login Verified: {key} | Device: {device_id[:20]}... | IP: {ip_addr}")
-        if status == 'ACTIVE' and db_type == 'postgres':
-            try:
-                # Institutional Sync: Mirror key to local SQLite so it survives outages
-                local_conn = sqlite3.connect(DB_FILE, timeout=5)
-                local_cur = local_conn.cursor()
-                local_cur.execute("""
-                    INSERT OR REPLACE INTO licenses 
-                    (key_code, category, status, device_id, expiry_date, activation_date)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (key, category, status, reg_device or device_id, str(expiry_date) if expiry_date else None, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-                local_conn.commit()
-                local_cur.close()
-                local_conn.close()
-            except Exception as ex:
-                print(f"[AUTH-SYNC] Mirror to SQLite failed: {ex}")
 
         return jsonify({
             "valid": True,
@@ -1440,86 +1695,152 @@ def check_device_sync():
     except Exception as e:
         print(f"[AUTH] Device Sync Error: {e}")
         return jsonify({"valid": False}), 500
+
+class LicenseLookupError(Exception):
+    """Database unreachable while loading a license (never cached)"""
+
+def _load_license(clean_key):
+    """Single DB read behind LICENSE_CACHE (one per key, concurrent misses coalesce)"""
+    conn, db_type = get_db_connection()
+    if not conn:
+        raise LicenseLookupError("no database connection")
+    try:
+        cur = conn.cursor()
+        row = read_license("license_status_by_key", (clean_key,), cur, db_type)
+        cur.close()
     finally:
-        try:
-            if 'cur' in locals() and cur: cur.close()
-        except: pass
-        try:
-            if 'conn' in locals() and conn: release_db_connection(conn, db_type)
-        except: pass
+        release_db_connection(conn, db_type)
+
+    if not row:
+        return LicenseRecord.missing(clean_key)
+    status, locked_device, expiry_date, category = row
+    return LicenseRecord(clean_key, status, locked_device, category, expiry_date)
+
+def _license_ttl(record):
+    return CACHE_TTL if record.exists else LICENSE_NEGATIVE_TTL
+
+def _license_decision(record, device_id):
+    status, category = record.status, record.category
+    if status is None: return False, "INVALID_KEY"
+    if status == 'BLOCKED': return False, "LICENSE_BLOCKED"
+    if status == 'PENDING' and category != 'OWNER': return False, "LICENSE_NOT_ACTIVATED"
+    if record.expired(): return False, "LICENSE_EXPIRED"
+
+    locked_device = record.bound_device()
+    if locked_device and locked_device != device_id and category != "OWNER":
+        return False, "DEVICE_MISMATCH"
+    return True, None
+
+def _load_device_license(device_id):
+    """Single DB read behind DEVICE_LICENSE_CACHE -> LicenseRecord of the device's ACTIVE license or None"""
+    conn, db_type = get_db_connection()
+    if not conn:
+        raise LicenseLookupError("no database connection")
+    try:
+        cur = conn.cursor()
+        row = read_license("active_license_by_device", (device_id,), cur, db_type)
+        cur.close()
+    finally:
+        release_db_connection(conn, db_type)
+
+    if not row:
+        return None
+    key, category, expiry_date, status, activation_date, reg_device = row
+    return LicenseRecord(key, status, reg_device, category, expiry_date, activation_date)
+
+def _device_license_ttl(record):
+    return CACHE_TTL if record is not None else LICENSE_NEGATIVE_TTL
+
+def invalidate_license(key=None, broadcast=True):
+    """
+    Drops one key (or everything) from the license caches so admin changes apply immediately.
+    The device index loses the key's device and every negative entry (a reset/bind may have
+    moved the key to a device we cached as unlicensed).
+    `broadcast` repeats it in the other gunicorn workers (shared state backend).
+    """
+    if key is None:
+        LICENSE_CACHE.clear()
+        DEVICE_LICENSE_CACHE.clear()
+    else:
+        clean_key = key.strip().upper()
+        LICENSE_CACHE.invalidate(clean_key)
+        DEVICE_LICENSE_CACHE.invalidate_where(
+            lambda device_id, record: record is None or record.key_code.upper() == clean_key, values=True)
+    if broadcast:
+        shared_state.publish("licenses", "*" if key is None else clean_key)
+
+shared_state.subscribe("licenses", lambda key: invalidate_license(None if key == "*" else key, broadcast=False))
+
+def _on_replica_change(keys):
+    """Pulled rows changed on the primary (None = full pull): keep both caches coherent"""
+    # Every worker runs its own replicator, so there is nothing to broadcast
+    if keys is None:
+        invalidate_license(broadcast=False)
+        return
+    for key in keys:
+        invalidate_license(key, broadcast=False)
 
 def verify_access(key, device_id):
     """
     Returns (bool, error_message or None)
     Uses high-speed in-memory caching to support 1000+ concurrent users.
+    One cached row per key (LRU + TTL); the device/expiry rules are evaluated on every call.
     """
     if not key or not device_id:
         return False, "MISSING_CREDENTIALS"
 
     clean_key = key.strip().upper()
-    cache_id = f"{clean_key}:{device_id}"
-    now = time.time()
-
-    # 1. High-Performance Cache Lookup
-    if cache_id in LICENSE_CACHE:
-        ts, status, cached_device, expiry, category = LICENSE_CACHE[cache_id]
-        if now - ts < CACHE_TTL:
-            if status == 'BLOCKED': return False, "LICENSE_BLOCKED"
-            if status == 'PENDING' and category != 'OWNER': return False, "LICENSE_NOT_ACTIVATED"
-            # Expiry check (cached)
-            if expiry:
-               try:
-                   now_utc = datetime.datetime.utcnow().replace(tzinfo=None)
-                   if now_utc > expiry: return False, "LICENSE_EXPIRED"
-               except: pass
-            return True, None
-
-    # 2. Database Fallback (Only every 5 minutes per user)
-    conn, db_type = get_db_connection()
-    if not conn: 
-        return False, "DATABASE_ERROR"
-    
-    try:
-        cur = conn.cursor()
-        query = "SELECT status, device_id, expiry_date, category FROM licenses WHERE UPPER(key_code)=%s" if db_type == 'postgres' else "SELECT status, device_id, expiry_date, category FROM licenses WHERE UPPER(key_code)=?"
-        cur.execute(query, (clean_key,))
-        row = cur.fetchone()
-        cur.close()
-        release_db_connection(conn, db_type)
-        
-        if not row: return False, "INVALID_KEY"
-            
-        status, locked_device, expiry_date, category = row
+    loader = lambda: _load_license(clean_key)
 
-        # Parse Expiry for Cache
-        parsed_exp = None
-        if expiry_date:
-            try:
-                if isinstance(expiry_date, str):
-                    try: parsed_exp = datetime.datetime.strptime(expiry_date, "%Y-%m-%d %H:%M:%S")
-                    except: parsed_exp = datetime.datetime.fromisoformat(expiry_date.replace('Z', '+00:00')).replace(tzinfo=None)
-                else:
-                    parsed_exp = expiry_date.replace(tzinfo=None)
-            except: pass
-
-        # Update Cache
-        LICENSE_CACHE[cache_id] = (now, status, locked_device, parsed_exp, category)
-
-        # 3. Enforcement
-        if status == 'BLOCKED': return False, "LICENSE_BLOCKED"
-        if status == 'PENDING' and category != 'OWNER': return False, "LICENSE_NOT_ACTIVATED"
-        if parsed_exp and datetime.datetime.utcnow().replace(tzinfo=None) > parsed_exp:
-            return False, "LICENSE_EXPIRED"
-            
-        if locked_device and locked_device.strip() and locked_device != "None":
-            if locked_device != device_id and category != "OWNER":
-                return False, "DEVICE_MISMATCH"
-            
-        return True, None
+    try:
+        entry = LICENSE_CACHE.get_or_load(clean_key, loader, ttl=_license_ttl)
+        granted, code = _license_decision(entry, device_id)
+
+        # A mismatch may be a device reset we have not seen yet: trust it only for the negative TTL
+        if code == "DEVICE_MISMATCH" and time.time() - entry.loaded_at > LICENSE_NEGATIVE_TTL:
+            entry = LICENSE_CACHE.get_or_load(clean_key, loader, ttl=_license_ttl, force=True)
+            granted, code = _license_decision(entry, device_id)
+        return granted, code
+    except LicenseLookupError:
+        return False, "DATABASE_ERROR"
     except Exception as e:
         print(f"[AUTH] verify_access error: {e}")
         return False, "VALIDATION_EXCEPTION"
 
+def is_admin_request():
+    """X-Admin-Token matches ADMIN_API_TOKEN (admin routes stay closed while it is unset)"""
+    token = request.headers.get('X-Admin-Token')
+    return bool(ADMIN_API_TOKEN and token and hmac.compare_digest(token, ADMIN_API_TOKEN))
+
+@app.route('/api/admin/license_cache/invalidate', methods=['POST'])
+def admin_invalidate_license():
+    """Push invalidation from the admin tools (block / reset / extend)"""
+    if not is_admin_request():
+        return jsonify({"error": "FORBIDDEN"}), 403
+    if license_replica.ready:
+        try:
+            license_replica.sync(full=False)  # Pull the admin change before the cache reloads from the replica
+        except Exception as e:
+            print(f"[REPLICA] Sync on invalidate failed: {e}")
+    data = request.json or {}
+    if data.get('all'):
+        invalidate_license()
+        return jsonify({"invalidated": "ALL"})
+    key = data.get('key')
+    if not key:
+        return jsonify({"error": "Missing key"}), 400
+    invalidate_license(key)
+    return jsonify({"invalidated": key.strip().upper()})
+
+def parse_timeframe(timeframe_str):
+    """'M1' / 'M5' / '15' / 5 -> minutes (defaults to 1)"""
+    if isinstance(timeframe_str, str):
+        if timeframe_str.upper() == 'M1': return 1
+        elif timeframe_str.upper() == 'M5': return 5
+        digits = timeframe_str.replace('M', '').replace('m', '')
+        return int(digits) if digits.isdigit() else 1
+    return int(timeframe_str) if timeframe_str else 1
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
@@ -1533,12 +1854,7 @@ def predict():
         timezone_name = data.get('timezone', 'UTC')
         timeframe_str = data.get('timeframe', 'M1')
         
-        # timeframe handling...
-        if isinstance(timeframe_str, str):
-            if timeframe_str.upper() == 'M1': timeframe = 1
-            elif timeframe_str.upper() == 'M5': timeframe = 5
-            else: timeframe = int(timeframe_str.replace('M', '').replace('m', '')) if timeframe_str.replace('M', '').replace('m', '').isdigit() else 1
-        else: timeframe = int(timeframe_str) if timeframe_str else 1
+        timeframe = parse_timeframe(timeframe_str)
 
         if not key or not device_id or not market:
             return jsonify({"error": "Missing required fields"}), 400
@@ -1551,13 +1867,11 @@ def predict():
                 "message": "Real Forex market is currently closed. Signals only available for OTC assets on weekends."
             }), 403
 
-        # simple rate limit per key+device
-        now = time.time()
-        bucket = f"{key}:{device_id}"
-        REQUEST_LOG[bucket] = [t for t in REQUEST_LOG[bucket] if now - t < RATE_LIMIT_WINDOW]
-        if len(REQUEST_LOG[bucket]) >= RATE_LIMIT_MAX:
-            return jsonify({"error": "Rate limit exceeded"}), 429
-        REQUEST_LOG[bucket].append(now)
+        # rate limit per key+device (the async server charges it before its candle warm-up)
+        if not request.environ.get(PREDICT_LIMIT_CHECKED):
+            limited = rate_limited("predict", f"{key}:{device_id}")
+            if limited:
+                return limited
 
         # Verification with detailed error reporting
         access_granted, error_code = verify_access(key, device_id)
@@ -1645,12 +1959,8 @@ def predict():
         signal_id = f"{broker}_{market}_{int(time.time())}"
 
         # 4. ASYNC TRACKING: Queue the log entry (Non-blocking)
-        log_query = """
-            INSERT INTO win_rate_tracking (signal_id, broker, market, direction, confidence, entry_time)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
         log_params = (signal_id, broker, market, direction, confidence, entry_time_calculated)
-        logging_queue.put({'query': log_query, 'params': log_params})
+        logging_queue.submit("log_signal", log_params)
         
         # Determine data source quality
         data_quality = "REAL" if candles else "SIMULATED"
@@ -1706,20 +2016,8 @@ def get_win_rate():
         
         cur = conn.cursor()
         
-        # Build query
-        query = "SELECT COUNT(*) as total, SUM(CASE WHEN outcome = 'WIN' THEN 1 ELSE 0 END) as wins FROM win_rate_tracking WHERE outcome IS NOT NULL"
-        params = []
-        
-        if market:
-            query += " AND market = ?" if db_type == 'sqlite' else " AND market = %s"
-            params.append(market)
-        
-        if broker:
-            query += " AND broker = ?" if db_type == 'sqlite' else " AND broker = %s"
-            params.append(broker)
-        
-        cur.execute(query, params)
-        result = cur.fetchone()
+        # Optional filters: NULL matches everything
+        result = queries.fetchone(cur, db_type, "win_rate_stats", (market or None, market or None, broker or None, broker or None))
         
         total = result[0] if result else 0
         wins = result[1] if result and result[1] else 0
@@ -1740,9 +2038,37 @@ def get_win_rate():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/diagnostics', methods=['GET'])
+def diagnostics():
+    """Runtime counters for the in-process caches (admin only: pool, cache and limiter internals)"""
+    if not is_admin_request():
+        return jsonify({"error": "FORBIDDEN"}), 403
+    return jsonify({
+        "candle_cache": data_feed.candle_cache.stats() if data_feed else None,
+        "prefetch": data_feed.prefetcher.stats() if data_feed else None,
+        "candle_rings": candle_store.stats(),
+        "forex_ws": data_feed.forex_ws.stats() if data_feed else None,
+        "signal_memo": enhanced_engine.signal_memo.stats() if enhanced_engine else None,
+        "write_behind": logging_queue.stats(),
+        "license_usage": license_usage.stats(),
+        "license_replica": license_replica.stats(),
+        "db_mode": DB_MODE_STATE["mode"],
+        "db_pool": pg_pool.stats() if pg_pool else None,
+        "sqlite": sqlite_store.stats(),
+        "license_cache": LICENSE_CACHE.stats(),
+        "device_license_cache": DEVICE_LICENSE_CACHE.stats(),
+        "geo": geo_locator.stats(),
+        "rate_limits": {route: limiter.stats() for route, limiter in RATE_LIMITS.items()},
+        "shared_state": shared_state.stats(),
+        "http": http_client.stats(),
+    })
+
 @app.route('/api/track_outcome', methods=['POST'])
 def track_outcome():
     """Update signal outcome (WIN/LOSS) for win rate tracking"""
+    limited = rate_limited("track_outcome", client_ip())
+    if limited:
+        return limited
     try:
         data = request.json
         signal_id = data.get('signal_id')
@@ -1756,10 +2082,7 @@ def track_outcome():
             return jsonify({"error": "Database unavailable"}), 500
         
         cur = conn.cursor()
-        if db_type == 'postgres':
-            cur.execute("UPDATE win_rate_tracking SET outcome = %s WHERE signal_id = %s", (outcome, signal_id))
-        else:
-            cur.execute("UPDATE win_rate_tracking SET outcome = ? WHERE signal_id = ?", (outcome, signal_id))
+        queries.execute(cur, db_type, "track_outcome", (outcome, signal_id))
         
         conn.commit()
         cur.close()
@@ -1784,16 +2107,7 @@ def track_activity():
         if conn:
             try:
                 cur = conn.cursor()
-                if db_type == 'postgres':
-                    cur.execute("""
-                        INSERT INTO user_activity (license_key, device_id, mouse_movements, clicks, current_url, timestamp)
-                        VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                    """, (key, device, mouse, clicks, cur_url))
-                else:
-                    cur.execute("""
-                        INSERT INTO user_activity (license_key, device_id, mouse_movements, clicks, current_url, timestamp)
-                        VALUES (?, ?, ?, ?, ?, datetime('now'))
-                    """, (key, device, mouse, clicks, cur_url))
+                queries.execute(cur, db_type, "log_activity", (key, device, mouse, clicks, cur_url))
                 conn.commit()
                 cur.close()
             finally:
@@ -1859,18 +2173,8 @@ def collect_telemetry():
                 resolution_str = f"{browser.get('screenWidth', 0)}x{browser.get('screenHeight', 0)}"
                 platform_str = fingerprint.get('platform', 'Unknown')
                 
-                if db_type == 'postgres':
-                    cur.execute("""
-                        INSERT INTO user_sessions 
-                        (license_key, device_id, ip_address, user_agent, timezone, resolution, platform, login_time)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                    """, (license_key, device_id, ip_addr, user_agent_str, timezone_str, resolution_str, platform_str))
-                else:
-                    cur.execute("""
-                        INSERT INTO user_sessions 
-                        (license_key, device_id, ip_address, user_agent, timezone, resolution, platform, login_time)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))
-                    """, (license_key, device_id, ip_addr, user_agent_str, timezone_str, resolution_str, platform_str))
+                queries.execute(cur, db_type, "log_session_telemetry", (
+                    license_key, device_id, ip_addr, user_agent_str, timezone_str, resolution_str, platform_str))
                 
                 print(f"[TELEMETRY] ✅ Session logged: {license_key} from {geo.get('city', 'Unknown')}, {geo.get('country', 'Unknown')}")
             except Exception as e:
@@ -1881,18 +2185,8 @@ def collect_telemetry():
                 page_title = f"Telemetry: {browser.get('browserName')} on {browser.get('osName')}"
                 activity_url = f"Network: {network.get('effectiveType')} | Location: {geo.get('city')}, {geo.get('country')} | ISP: {geo.get('isp')}"
                 
-                if db_type == 'postgres':
-                    cur.execute("""
-                        INSERT INTO user_activity 
-                        (license_key, device_id, mouse_movements, clicks, scrolls, key_presses, session_duration, current_url, page_title, timestamp)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                    """, (license_key, device_id, 0, 0, 0, 0, 0, activity_url, page_title))
-                else:
-                    cur.execute("""
-                        INSERT INTO user_activity 
-                        (license_key, device_id, mouse_movements, clicks, scrolls, key_presses, session_duration, current_url, page_title, timestamp)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
-                    """, (license_key, device_id, 0, 0, 0, 0, 0, activity_url, page_title))
+                queries.execute(cur, db_type, "log_activity_telemetry", (
+                    license_key, device_id, 0, 0, 0, 0, 0, activity_url, page_title))
                 
                 print(f"[TELEMETRY] ✅ Activity tracked: {device_id[:16]}... | IP: {ip_addr}")
             except Exception as e:
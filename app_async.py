@@ -0,0 +1,206 @@
+"""
+QUANTUM X PRO - Async API Server (aiohttp)
+Serves the latency-critical routes of app.py from ONE event loop, so a slow upstream
+(Alpha Vantage, broker APIs, the database) no longer blocks every other user.
+- /predict: licence check first, then candles are fetched without holding a thread
+  (Alpha Vantage over aiohttp, broker adapters on a bounded upstream executor),
+  then the shared engine answers from the warm caches
+- /api/validate_license, /api/check_device_sync, /api/win_rate, /api/track_outcome:
+  the app.py handlers run on a bounded database executor
+- Same caches, rate limits, write-behind queues and responses as app.py
+
+Run:  gunicorn app_async:app --worker-class aiohttp.GunicornWebWorker --bind 0.0.0.0:$PORT
+ or:  python app_async.py
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from aiohttp import web
+
+import app as qx
+
+ASYNC_DB_WORKERS = int(os.getenv("ASYNC_DB_WORKERS", str(qx.DB_POOL_MAX)))     # Never more than the pool can serve
+ASYNC_UPSTREAM_WORKERS = int(os.getenv("ASYNC_UPSTREAM_WORKERS", "32"))        # Blocking broker adapters
+ASYNC_HTTP_LIMIT = int(os.getenv("ASYNC_HTTP_LIMIT", "100"))                   # aiohttp connection pool
+
+db_executor = ThreadPoolExecutor(max_workers=ASYNC_DB_WORKERS, thread_name_prefix="async-db")
+upstream_executor = ThreadPoolExecutor(max_workers=ASYNC_UPSTREAM_WORKERS, thread_name_prefix="async-upstream")
+
+
+# --- Executors ---
+async def run_db(fn, *args):
+    """Database-bound work on the bounded DB executor (callers beyond the bound wait as coroutines)"""
+    return await asyncio.get_running_loop().run_in_executor(db_executor, fn, *args)
+
+
+async def run_upstream(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(upstream_executor, fn, *args)
+
+
+# --- Flask handler bridge ---
+def _call_flask(view, method, path, body, headers, remote, query_string=None, environ=None):
+    """Runs an app.py view in a request context and returns (status, headers, body bytes)"""
+    environ_base = {"REMOTE_ADDR": remote or "", **(environ or {})}
+    with qx.app.test_request_context(path, method=method, json=body, headers=headers,
+                                     query_string=query_string, environ_base=environ_base):
+        response = qx.app.make_response(view())
+        return response.status_code, dict(response.headers), response.get_data()
+
+
+async def flask_route(request, view, body=None, environ=None):
+    if body is None and request.method == "POST":
+        body = await _json_body(request)
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in ("content-length", "content-type")}
+    status, resp_headers, payload = await run_db(
+        _call_flask, view, request.method, request.path, body, headers, request.remote, request.query_string, environ)
+    keep = {k: v for k, v in resp_headers.items() if k.lower() in ("content-type", "retry-after")}
+    return web.Response(body=payload, status=status, headers=keep)
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except Exception:
+        return {}
+
+
+# --- Async candle loading (warms MarketDataFeed.candle_cache) ---
+class AsyncCandleLoader:
+    def __init__(self, session):
+        self.session = session
+        self._inflight = {}  # candle key -> Future (one upstream fetch per market per candle)
+        self._slots = {}     # upstream name -> asyncio.Semaphore
+
+    def _slot(self, feed, name):
+        slot = self._slots.get(name)
+        if slot is None:
+            limit = feed.upstream_limits.get(name, feed.upstream_limits["DEFAULT"])
+            slot = self._slots[name] = asyncio.Semaphore(limit)
+        return slot
+
+    async def ensure(self, feed, market, timeframe):
+        """Makes sure (market, timeframe) is cached; concurrent callers share one fetch"""
+        key = feed._candle_key(market, timeframe)
+        if key in feed.candle_cache or feed.ring_candles(market, timeframe) is not None:
+            return
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = self._inflight[key] = asyncio.ensure_future(self._load(feed, key, market, timeframe))
+            flight.add_done_callback(lambda _: self._inflight.pop(key, None))
+        await asyncio.shield(flight)
+
+    async def _load(self, feed, key, market, timeframe):
+        live_request = None
+        if "(OTC)" not in market:
+            live_request = feed.live_data.request_for(market)
+        if live_request:
+            candles = await self._fetch_alpha_vantage(feed, market, *live_request)
+            if candles:
+                result = (candles, False)
+                feed.candle_cache.set(key, result, ttl=feed._candle_ttl(key)(result))
+                return
+        # Broker adapters are blocking clients: bounded thread pool, the loop stays free
+        await run_upstream(feed.get_candles, market, timeframe)
+
+    async def _fetch_alpha_vantage(self, feed, market, params, parse):
+        try:
+            async with self._slot(feed, "ALPHA_VANTAGE"):
+                async with self.session.get(feed.live_data.URL, params=params,
+                                            timeout=aiohttp.ClientTimeout(total=feed.live_data.TIMEOUT)) as resp:
+                    resp.raise_for_status()
+                    data = await resp.json(content_type=None)
+            return parse(data)
+        except Exception as e:
+            print(f"[LIVE] Alpha Vantage fetch failed for {market}: {e}")
+            return None
+
+
+# --- Routes ---
+async def predict(request):
+    body = await _json_body(request)
+    key, device_id, market = body.get('license_key'), body.get('device_id'), body.get('market')
+    environ = None
+    if key and device_id and market and ("(OTC)" in market or qx.is_market_open()):
+        # Rate limit first (throttled callers never reach upstream), the app.py view skips its own charge
+        allowed, retry_after = await run_db(qx.RATE_LIMITS["predict"].hit, f"{key}:{device_id}")
+        if not allowed:
+            payload, retry_header = qx.rate_limit_payload(retry_after)
+            return web.json_response(payload, status=429, headers={"Retry-After": retry_header})
+        environ = {qx.PREDICT_LIMIT_CHECKED: True}
+        # Licence next (cached; DB only on a miss) so anonymous callers never trigger upstream fetches
+        granted, _ = await run_db(qx.verify_access, key, device_id)
+        if granted:
+            try:
+                feed = qx.get_data_feed()
+                await request.app["candles"].ensure(feed, market, qx.parse_timeframe(body.get('timeframe', 'M1')))
+            except Exception as e:
+                print(f"[ASYNC] Candle prefetch failed for {market}: {e}")
+    # Validation and the engine run exactly as in app.py, from warm caches
+    return await flask_route(request, qx.predict, body, environ)
+
+
+async def validate_license(request):
+    return await flask_route(request, qx.validate_license)
+
+
+async def check_device_sync(request):
+    return await flask_route(request, qx.check_device_sync)
+
+
+async def win_rate(request):
+    return await flask_route(request, qx.get_win_rate)
+
+
+async def track_outcome(request):
+    return await flask_route(request, qx.track_outcome)
+
+
+# --- Application ---
+@web.middleware
+async def cors(request, handler):
+    if request.method == "OPTIONS":
+        response = web.Response()
+    else:
+        response = await handler(request)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type, X-Admin-Token"
+    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+    return response
+
+
+async def _on_startup(aio_app):
+    # Same one-time startup as the Flask app (schema, pool, heartbeat, replica)
+    await run_db(qx.setup_on_first_request)
+    aio_app["http"] = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=ASYNC_HTTP_LIMIT))
+    aio_app["candles"] = AsyncCandleLoader(aio_app["http"])
+
+
+async def _on_cleanup(aio_app):
+    await aio_app["http"].close()
+    db_executor.shutdown(wait=False)
+    upstream_executor.shutdown(wait=False)
+
+
+def create_app():
+    aio_app = web.Application(middlewares=[cors])
+    aio_app.router.add_post("/predict", predict)
+    aio_app.router.add_post("/api/validate_license", validate_license)
+    aio_app.router.add_post("/api/check_device_sync", check_device_sync)
+    aio_app.router.add_get("/api/win_rate", win_rate)
+    aio_app.router.add_post("/api/track_outcome", track_outcome)
+    aio_app.on_startup.append(_on_startup)
+    aio_app.on_cleanup.append(_on_cleanup)
+    return aio_app
+
+
+app = create_app()
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5000))
+    print("=" * 60)
+    print(" QUANTUM X PRO - ASYNC API SERVER ")
+    print(f" Listening on Port {port}...")
+    print("=" * 60)
+    web.run_app(app, host='0.0.0.0', port=port)
@@ -71,10 +71,23 @@ def verify_all_assets():
             failed += 1
 
     print("-" * 75)
+
+    # 3. Live candle sweep: every asset fetched concurrently over the pooled bridge client
+    print("\n[STEP 3] Fetching live candles for every asset...")
+    live = 0
+    started = time.time()
+    for asset, candles in ws.get_candles_many(OTC_ASSETS, count=2):
+        if candles:
+            live += 1
+        else:
+            print(f"{asset:<30} | ⚠️ NO LIVE DATA")
+    print(f"Live data for {live}/{len(OTC_ASSETS)} assets in {time.time() - started:.1f}s")
+
     print(f"\n[SUMMARY]")
     print(f"Total OTC Assets: {len(OTC_ASSETS)}")
     print(f"Validated Mapping: {passed}")
     print(f"Failed Mapping:    {failed}")
+    print(f"Live Data:         {live}")
     print(f"WS Connectivity:   {'ONLINE' if ws_connected else 'OFFLINE'}")
     
     if passed == len(OTC_ASSETS) and ws_connected:
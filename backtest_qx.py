@@ -41,11 +41,8 @@ def perform_backtest():
     print(f"{'ASSET':20} | {'SIGNALS':8} | {'WINS':6} | {'LOSSES':6} | {'ACCURACY':8}")
     print("-" * 65)
 
-    for asset in assets:
-        # Fetch 100 historical candles
-        # Note: We replace the name to match the API expectation in the adapter
-        candles = adapter.get_candles(asset, count=100)
-        
+    # Fetch 100 historical candles for every asset concurrently; each is analysed as soon as it arrives
+    for asset, candles in adapter.get_candles_many(assets, count=100):
         if not candles or len(candles) < 30:
             print(f"{asset:20} | NO DATA")
             continue
@@ -93,9 +90,6 @@ def perform_backtest():
         
         total_wins += wins
         total_signals += signals_count
-        
-        # Small delay to avoid API rate limiting
-        time.sleep(0.05)
 
     if total_signals > 0:
         overall_accuracy = (total_wins / total_signals) * 100
@@ -0,0 +1,60 @@
+"""
+QUANTUM X PRO - LICENSE EXPIRY MICRO-BENCHMARK
+Per-request cost of the expiry check:
+  OLD: strptime / fromisoformat + utcnow() + try/except on every request
+  NEW: LicenseRecord parses once at load, each request is an integer compare
+Usage: python bench_license_expiry.py [iterations]
+"""
+import sys
+import os
+import time
+import timeit
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.license_record import LicenseRecord
+
+SAMPLES = {
+    "sqlite text": "2027-03-01 12:00:00",
+    "iso text": "2027-03-01T12:00:00Z",
+    "postgres datetime": datetime.datetime(2027, 3, 1, 12, 0, 0),
+}
+
+
+def old_check(expiry_date):
+    """Expiry logic as it ran inline in validate_license / check_device_sync / verify_access"""
+    if expiry_date:
+        try:
+            now_utc = datetime.datetime.utcnow().replace(tzinfo=None)
+            if isinstance(expiry_date, str):
+                try: exp = datetime.datetime.strptime(expiry_date, "%Y-%m-%d %H:%M:%S")
+                except: exp = datetime.datetime.fromisoformat(expiry_date.replace('Z', '+00:00')).replace(tzinfo=None)
+            else:
+                exp = expiry_date.replace(tzinfo=None) if hasattr(expiry_date, 'replace') else expiry_date
+            return now_utc > exp
+        except Exception:
+            return False
+    return False
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f"{'Expiry format':<20} {'old (us/req)':>13} {'new (us/req)':>13} {'speedup':>9}")
+    print("-" * 58)
+    for label, value in SAMPLES.items():
+        record = LicenseRecord("QX-BENCH", "ACTIVE", "device", "VIP", value)
+        assert old_check(value) == record.expired()
+
+        old = timeit.timeit(lambda: old_check(value), number=iterations) / iterations * 1e6
+        new = timeit.timeit(record.expired, number=iterations) / iterations * 1e6
+        print(f"{label:<20} {old:>13.3f} {new:>13.3f} {old / new:>8.1f}x")
+
+    load = timeit.timeit(lambda: LicenseRecord("QX-BENCH", "ACTIVE", "device", "VIP", SAMPLES["sqlite text"]),
+                         number=iterations // 10) / (iterations // 10) * 1e6
+    print(f"\nOne-time parse at load (LicenseRecord build): {load:.3f} us")
+    print(f"Timestamp: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+
+if __name__ == "__main__":
+    main()
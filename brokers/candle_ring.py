@@ -0,0 +1,286 @@
+"""
+QUANTUM X PRO - Live Candle Ring Store
+One preallocated, fixed-capacity ring of candles per (broker, asset, timeframe), written
+by the streaming adapters and read by MarketDataFeed before any REST call.
+- O(1) tick / upsert of the forming candle, O(1) close
+- Every slot is written twice (i and i + capacity), so the last N closed candles are
+  always contiguous: last(n) is a zero-copy CandleSeries window over the ring buffers
+- A window stays valid for the next (capacity - n - 1) candle closes; .copy() it to keep it longer
+- Bounded memory: rings are allocated once and LRU-evicted past `max_rings`
+- A ring whose stream stopped (newest closed candle older than STALE_AFTER intervals) is not served
+"""
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from brokers.candles import FIELDS, CandleSeries
+
+DEFAULT_CAPACITY = 300   # Closed candles per ring (reads are capped at capacity - 1)
+DEFAULT_MAX_RINGS = 512  # ~14 MB at the default capacity
+STALE_AFTER = 2          # Intervals since the newest closed candle opened before a ring is not served
+
+
+def market_key(asset):
+    """Cache identity of an asset: 'EUR/USD (OTC)' and 'EURUSD_otc' both map to 'EURUSD_OTC'"""
+    clean = asset.strip().upper().replace("/", "").replace(" ", "")
+    is_otc = "OTC" in clean
+    for tag in ("(OTC)", "-OTC", "_OTC"):
+        clean = clean.replace(tag, "")
+    return f"{clean}_OTC" if is_otc else clean
+
+
+class CandleRing:
+    __slots__ = ("timeframe", "capacity", "_cols", "count", "forming", "forming_ts")
+
+    def __init__(self, timeframe, capacity=DEFAULT_CAPACITY):
+        self.timeframe = int(timeframe)
+        self.capacity = capacity
+        self._cols = tuple(array("d", bytes(16 * capacity)) for _ in FIELDS)  # 2 x capacity float64
+        self.count = 0            # Candles closed since creation (absolute index of the forming one)
+        self.forming = False
+        self.forming_ts = None
+
+    @property
+    def nbytes(self):
+        return len(FIELDS) * 16 * self.capacity
+
+    def _bucket(self, ts):
+        ts = int(ts)
+        return ts - ts % self.timeframe
+
+    def _write(self, index, open, high, low, close, volume, ts):
+        i = index % self.capacity
+        j = i + self.capacity
+        for col, value in zip(self._cols, (open, high, low, close, volume, ts)):
+            col[i] = value
+            col[j] = value
+
+    def _set(self, index, field, value):
+        i = index % self.capacity
+        col = self._cols[field]
+        col[i] = value
+        col[i + self.capacity] = value
+
+    def _get(self, index, field):
+        return self._cols[field][index % self.capacity]
+
+    def last_closed_ts(self):
+        return self._get(self.count - 1, 5) if self.count else None
+
+    # --- Writes ---
+    def _close(self):
+        self.count += 1
+        self.forming = False
+        self.forming_ts = None
+
+    def roll(self, now):
+        """Closes the forming candle once its interval is over (also when no update arrived since)"""
+        if self.forming and now >= self.forming_ts + self.timeframe:
+            self._close()
+
+    def tick(self, price, ts, volume=0.0):
+        """
+        Folds one trade/quote into the forming candle. A late tick for the candle that was just
+        closed (roll() on read, network latency) extends it; older ticks are dropped.
+        """
+        bucket = self._bucket(ts)
+        latest = self.forming_ts if self.forming else self.last_closed_ts()
+        if latest is None or bucket > latest:
+            self.upsert(price, price, price, price, bucket, volume)
+            return
+        if self.forming and bucket == self.forming_ts:
+            n = self.count
+        elif self.count and bucket == self.last_closed_ts():
+            n = self.count - 1
+        else:
+            return
+        if price > self._get(n, 1): self._set(n, 1, price)
+        if price < self._get(n, 2): self._set(n, 2, price)
+        self._set(n, 3, price)
+        if volume:
+            self._set(n, 4, self._get(n, 4) + volume)
+
+    def upsert(self, open, high, low, close, ts, volume=0.0):
+        """Broker-supplied candle: replaces the forming (or last closed) one with the same open time"""
+        bucket = self._bucket(ts)
+        if self.forming:
+            if bucket < self.forming_ts:
+                if bucket == self.last_closed_ts():
+                    self._write(self.count - 1, open, high, low, close, volume, bucket)
+                return
+            if bucket > self.forming_ts:
+                self._close()
+        elif self.count and bucket <= self.last_closed_ts():
+            if bucket == self.last_closed_ts():
+                self._write(self.count - 1, open, high, low, close, volume, bucket)
+            return
+        self._write(self.count, open, high, low, close, volume, bucket)
+        self.forming = True
+        self.forming_ts = bucket
+
+    def seed(self, rows, now):
+        """
+        History (open, high, low, close, ts[, volume]) oldest -> newest. Closed rows replace what we
+        had, candles built after the history are kept, a row for the current interval merges
+        into the forming candle.
+        """
+        current = self._bucket(now)
+        rows = [(r[0], r[1], r[2], r[3], self._bucket(r[4]), r[5] if len(r) > 5 else 0.0) for r in rows]
+        history = [r for r in rows if r[4] < current][-(self.capacity - 1):]
+        newest = history[-1][4] if history else None
+        built = [r for r in self._closed_rows() if newest is None or r[4] > newest]
+        forming = self._row(self.count) if self.forming else None
+
+        self.count = 0
+        self.forming = False
+        self.forming_ts = None
+        for o, h, l, c, ts, v in (history + built)[-(self.capacity - 1):]:
+            self._write(self.count, o, h, l, c, v, ts)
+            self.count += 1
+
+        live = [r for r in rows if r[4] == current]
+        if live:
+            o, h, l, c, ts, v = live[-1]
+            if forming and forming[4] == ts:
+                forming = (o, max(h, forming[1]), min(l, forming[2]), forming[3], ts, max(v, forming[5]))
+            elif forming is None:
+                forming = (o, h, l, c, ts, v)
+        if forming and (not self.count or forming[4] > self.last_closed_ts()):
+            self.upsert(*forming[:5], volume=forming[5])
+
+    def _row(self, index):
+        """(open, high, low, close, ts, volume) of one absolute index"""
+        o, h, l, c, v, t = (self._get(index, f) for f in range(len(FIELDS)))
+        return (o, h, l, c, t, v)
+
+    def _closed_rows(self):
+        start = max(0, self.count - (self.capacity - 1))
+        return [self._row(i) for i in range(start, self.count)]
+
+    # --- Reads ---
+    def last(self, n):
+        """Zero-copy window of the last `n` CLOSED candles (oldest -> newest), or None"""
+        n = min(int(n), self.count, self.capacity - 1)
+        if n <= 0:
+            return None
+        end = (self.count - 1) % self.capacity + self.capacity + 1
+        return CandleSeries(self._cols, end - n, end)
+
+    def __len__(self):
+        return min(self.count, self.capacity - 1)
+
+
+class CandleRingStore:
+    def __init__(self, capacity=DEFAULT_CAPACITY, max_rings=DEFAULT_MAX_RINGS, name="candle-rings"):
+        self.capacity = capacity
+        self.max_rings = max_rings
+        self.name = name
+        self._rings = OrderedDict()   # (broker, market_key, timeframe) -> CandleRing
+        self._by_market = {}          # (market_key, timeframe) -> {broker: CandleRing}
+        self._lock = threading.Lock()
+
+        self.ticks = 0
+        self.upserts = 0
+        self.seeds = 0
+        self.reads = 0
+        self.hits = 0
+        self.stale = 0
+        self.evictions = 0
+
+    # --- Rings ---
+    def _ring(self, broker, asset, timeframe, create=True):
+        """Caller holds the lock"""
+        market = market_key(asset)
+        key = (broker, market, int(timeframe))
+        ring = self._rings.get(key)
+        if ring is not None:
+            self._rings.move_to_end(key)
+            return ring
+        if not create:
+            return None
+        ring = self._rings[key] = CandleRing(timeframe, self.capacity)
+        self._by_market.setdefault((market, int(timeframe)), {})[broker] = ring
+        while len(self._rings) > self.max_rings:
+            (old_broker, old_market, old_tf), _ = self._rings.popitem(last=False)
+            brokers = self._by_market.get((old_market, old_tf), {})
+            brokers.pop(old_broker, None)
+            if not brokers:
+                self._by_market.pop((old_market, old_tf), None)
+            self.evictions += 1
+        return ring
+
+    def tick(self, broker, asset, timeframe, price, ts, volume=0.0):
+        with self._lock:
+            self._ring(broker, asset, timeframe).tick(price, ts, volume)
+            self.ticks += 1
+
+    def upsert(self, broker, asset, timeframe, open, high, low, close, ts, volume=0.0):
+        with self._lock:
+            self._ring(broker, asset, timeframe).upsert(open, high, low, close, ts, volume)
+            self.upserts += 1
+
+    def seed(self, broker, asset, timeframe, rows, now=None):
+        with self._lock:
+            self._ring(broker, asset, timeframe).seed(rows, time.time() if now is None else now)
+            self.seeds += 1
+
+    # --- Reads ---
+    def last(self, asset, timeframe, n, broker=None, min_count=1, now=None):
+        """
+        Last `n` closed candles of `asset` from the freshest ring (any broker unless given),
+        or None when no ring holds at least `min_count` of them or the freshest one stopped
+        streaming (newest closed candle older than STALE_AFTER intervals: socket down,
+        market closed, symbol no longer quoted).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self.reads += 1
+            rings = self._by_market.get((market_key(asset), int(timeframe)), {})
+            best = None
+            for name, ring in rings.items():
+                if broker and name != broker:
+                    continue
+                ring.roll(now)
+                if len(ring) >= min_count and (best is None or ring.last_closed_ts() > best.last_closed_ts()):
+                    best = ring
+            if best is None:
+                return None
+            if now - best.last_closed_ts() > STALE_AFTER * best.timeframe:
+                self.stale += 1
+                return None
+            self.hits += 1
+            return best.last(n)
+
+    # --- Diagnostics ---
+    def stats(self):
+        with self._lock:
+            ring_bytes = len(FIELDS) * 16 * self.capacity
+            return {
+                "rings": len(self._rings),
+                "capacity": self.capacity,
+                "max_rings": self.max_rings,
+                "bytes": ring_bytes * len(self._rings),
+                "max_bytes": ring_bytes * self.max_rings,
+                "ticks": self.ticks,
+                "upserts": self.upserts,
+                "seeds": self.seeds,
+                "reads": self.reads,
+                "hits": self.hits,
+                "stale": self.stale,
+                "evictions": self.evictions,
+            }
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_store(capacity=None, max_rings=None):
+    """Process-wide store shared by the streaming adapters and MarketDataFeed (sized on first call)"""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = CandleRingStore(capacity or DEFAULT_CAPACITY, max_rings or DEFAULT_MAX_RINGS)
+    return _default
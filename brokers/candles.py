@@ -0,0 +1,224 @@
+"""
+QUANTUM X PRO - Columnar Candle Container
+Array-backed OHLC storage shared by every broker adapter and engine.
+- One array('d') per column instead of one dict per candle (48 bytes/candle vs 400+)
+- O(1) column access and zero-copy slicing windows (memoryview over the same buffers)
+- Dict-compatible per-candle view for legacy callers: series[-1]['close'], c.get('time')
+"""
+import datetime
+from array import array
+
+FIELDS = ("open", "high", "low", "close", "volume", "ts")
+FIELD_INDEX = {name: i for i, name in enumerate(FIELDS)}
+
+# Legacy / broker-specific keys accepted on read
+ALIASES = {"time": "ts", "from": "ts", "max": "high", "min": "low"}
+
+# Where each column is found in raw broker dicts (first hit wins)
+SOURCE_KEYS = {
+    "open": ("open",),
+    "high": ("max", "high"),
+    "low": ("min", "low"),
+    "close": ("close",),
+    "volume": ("volume",),
+    "ts": ("from", "ts", "time"),
+}
+
+
+def to_epoch(value, default=0.0):
+    """Normalizes broker timestamps (epoch, ISO string, 'YYYY-mm-dd HH:MM:SS' UTC) to float epoch"""
+    if value is None:
+        return float(default)
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        dt = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=datetime.timezone.utc)
+        return dt.timestamp()
+    except ValueError:
+        return float(default)
+
+
+class CandleView:
+    """Read-only dict-like view of one candle inside a CandleSeries"""
+    __slots__ = ("_cols", "_i")
+
+    def __init__(self, cols, i):
+        self._cols = cols
+        self._i = i
+
+    def __getitem__(self, key):
+        idx = FIELD_INDEX.get(ALIASES.get(key, key))
+        if idx is None:
+            raise KeyError(key)
+        return self._cols[idx][self._i]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return ALIASES.get(key, key) in FIELD_INDEX
+
+    def keys(self):
+        return FIELDS
+
+    def values(self):
+        return [col[self._i] for col in self._cols]
+
+    def items(self):
+        return list(zip(FIELDS, self.values()))
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"CandleView({self.to_dict()})"
+
+
+class CandleSeries:
+    """
+    Oldest -> newest candle columns.
+    A root series owns its arrays and can be appended to while it is being built;
+    slices are windows over the same buffers and never copy.
+    """
+    __slots__ = ("_cols", "_start", "_stop")
+
+    def __init__(self, cols=None, start=0, stop=None):
+        self._cols = cols if cols is not None else tuple(array("d") for _ in FIELDS)
+        self._start = start
+        self._stop = stop  # None = root series, grows with append()
+
+    # --- Construction ---
+    @classmethod
+    def from_rows(cls, rows):
+        """Rows of (open, high, low, close, volume, ts)"""
+        series = cls()
+        for row in rows:
+            series.append(*row[:4], volume=row[4], ts=row[5])
+        return series
+
+    @classmethod
+    def from_dicts(cls, candles, default_ts=0.0):
+        """Normalizes a broker's list of dicts; malformed rows are skipped"""
+        series = cls()
+        for c in candles or []:
+            try:
+                vals = {}
+                for name, keys in SOURCE_KEYS.items():
+                    raw = None
+                    for k in keys:
+                        raw = c.get(k)
+                        if raw is not None:
+                            break
+                    vals[name] = raw
+                series.append(
+                    float(vals["open"] or 0), float(vals["high"] or 0),
+                    float(vals["low"] or 0), float(vals["close"] or 0),
+                    volume=float(vals["volume"] or 0), ts=to_epoch(vals["ts"], default_ts),
+                )
+            except (ValueError, TypeError, AttributeError):
+                continue
+        return series
+
+    def append(self, open, high, low, close, ts=0.0, volume=0.0):
+        if self._stop is not None or self._start:
+            raise ValueError("CandleSeries windows are read-only")
+        o, h, l, c, v, t = self._cols
+        o.append(open)
+        h.append(high)
+        l.append(low)
+        c.append(close)
+        v.append(volume)
+        t.append(ts)
+
+    # --- Sequence protocol ---
+    def __len__(self):
+        stop = len(self._cols[0]) if self._stop is None else self._stop
+        return stop - self._start
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, key):
+        n = len(self)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(n)
+            if step == 1:
+                return CandleSeries(self._cols, self._start + start, self._start + max(start, stop))
+            return CandleSeries.from_rows(self._row(i) for i in range(start, stop, step))
+        if key < 0:
+            key += n
+        if not 0 <= key < n:
+            raise IndexError("candle index out of range")
+        return CandleView(self._cols, self._start + key)
+
+    def __iter__(self):
+        cols = self._cols
+        for i in range(self._start, self._start + len(self)):
+            yield CandleView(cols, i)
+
+    def _row(self, i):
+        j = self._start + i
+        return tuple(col[j] for col in self._cols)
+
+    # --- Columns ---
+    def column(self, name):
+        """Zero-copy column window (memoryview of float64)"""
+        idx = FIELD_INDEX[ALIASES.get(name, name)]
+        return memoryview(self._cols[idx])[self._start:self._start + len(self)]
+
+    @property
+    def open(self):
+        return self.column("open")
+
+    @property
+    def high(self):
+        return self.column("high")
+
+    @property
+    def low(self):
+        return self.column("low")
+
+    @property
+    def close(self):
+        return self.column("close")
+
+    @property
+    def volume(self):
+        return self.column("volume")
+
+    @property
+    def ts(self):
+        return self.column("ts")
+
+    # --- Utilities ---
+    def copy(self):
+        """Compact copy of this window (releases the parent buffers for caching)"""
+        return CandleSeries(tuple(array("d", self.column(name).tobytes()) for name in FIELDS))
+
+    def to_dicts(self):
+        return [c.to_dict() for c in self]
+
+    @property
+    def nbytes(self):
+        return len(self) * len(FIELDS) * 8
+
+    def __repr__(self):
+        return f"CandleSeries(len={len(self)})"
+
+
+def column(candles, name):
+    """Column of a CandleSeries (zero-copy) or of a legacy list of candle dicts"""
+    if isinstance(candles, CandleSeries):
+        return candles.column(name)
+    return [c[name] for c in candles]
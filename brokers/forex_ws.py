@@ -1,20 +1,67 @@
+import asyncio
+import itertools
 import json
 import time
 import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
 import websocket
 
+from brokers.candle_ring import default_store
+from brokers.candles import CandleSeries
+
+CANDLE_TIMEFRAMES = (60, 300, 900)   # M1 / M5 / M15 built from the tick stream
+HISTORY_SEED_COUNT = 300             # Candles requested per timeframe when a symbol is first followed
+BROKER_NAME = "DERIV"                # Ring store identity of this feed
+REQUEST_TIMEOUT = 10.0               # Seconds to wait for a req_id-tagged response
+SUBSCRIBE_RETRY_SECS = 300           # A symbol whose subscription failed is not retried before this
+DEFAULT_SYMBOLS = ("frxEURUSD", "frxGBPUSD", "frxUSDJPY")
+# Deriv forex / metals symbols; replaced by the live active_symbols list once connected
+DERIV_SYMBOLS = frozenset(f"frx{pair}" for pair in (
+    "AUDCAD", "AUDCHF", "AUDJPY", "AUDNZD", "AUDUSD", "EURAUD", "EURCAD", "EURCHF", "EURGBP",
+    "EURJPY", "EURNZD", "EURUSD", "GBPAUD", "GBPCAD", "GBPCHF", "GBPJPY", "GBPNOK", "GBPNZD",
+    "GBPUSD", "NZDJPY", "NZDUSD", "USDCAD", "USDCHF", "USDJPY", "USDMXN", "USDNOK", "USDPLN",
+    "USDSEK", "XAGUSD", "XAUUSD", "XPDUSD", "XPTUSD",
+))
+
+
+class DerivAPIError(Exception):
+    """Error response to one of our requests"""
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
 class ForexWSAdapter:
     """
     Connects to Binary.com / Deriv API for real-time Forex and Market data.
     WS: wss://ws.binaryws.com/websockets/v3?app_id=1089
+    Every subscribed symbol keeps M1/M5/M15 candles in the shared CandleRingStore (tick
+    aggregation, seeded once from ticks_history), so get_candles() never needs a REST call.
+    Requests are multiplexed on the one socket: each carries a req_id and its response
+    resolves the matching future (request() blocks, request_async() awaits).
     """
-    def __init__(self, app_id="1089"):
+    def __init__(self, app_id="1089", timeframes=CANDLE_TIMEFRAMES, store=None):
         self.url = f"wss://ws.binaryws.com/websockets/v3?app_id={app_id}"
         self.ws = None
         self.connected = False
         self.last_price = {}
         self.lock = threading.Lock()
         self.thread = None
+        self.timeframes = tuple(timeframes)
+        self.store = store or default_store()
+        self.symbols = set()      # Subscribed symbols (re-subscribed after a reconnect); guarded by self.lock
+        self.listed = DERIV_SYMBOLS   # Symbols Deriv quotes (frozenset, swapped whole)
+        self._rejected = {}       # symbol -> time its subscription failed
+        self._req_ids = itertools.count(1)
+        self._pending = {}        # req_id -> Future (first response wins; stream updates go to the handlers)
+        self._pending_lock = threading.Lock()
+
+        self.requests_sent = 0
+        self.requests_failed = 0
+        self.request_timeouts = 0
+        self.unlisted_skipped = 0
+        self.subscriptions_rejected = 0
 
     def on_message(self, ws, message):
         try:
@@ -22,6 +69,10 @@ class ForexWSAdapter:
             if not data:
                 return
                 
+            req_id = data.get("req_id")
+            if req_id is not None:
+                self._resolve(req_id, data)
+
             msg_type = data.get("msg_type")
             if msg_type == "tick":
                 tick = data.get("tick")
@@ -30,13 +81,15 @@ class ForexWSAdapter:
                     quote = tick.get("quote")
                     if symbol and quote is not None:
                         self.last_price[symbol] = quote
+                        self._on_tick(symbol, float(quote), tick.get("epoch") or time.time())
             elif msg_type == "ohlc":
                 ohlc = data.get("ohlc")
-                # Handle real-time OHLC stream if needed
-            elif msg_type == "history":
-                # Handle historical data response
-                history = data.get("history")
-                # This will be handled by the request-response pattern in get_historical_candles
+                if ohlc:
+                    self._on_ohlc(ohlc)
+            elif msg_type == "candles":
+                # ticks_history style=candles: seeds the matching (symbol, granularity) buffer
+                echo = data.get("echo_req") or {}
+                self._on_history(echo.get("ticks_history"), echo.get("granularity"), data.get("candles") or [])
             elif msg_type == "error":
                 err = data.get("error")
                 if err:
@@ -47,51 +100,246 @@ class ForexWSAdapter:
     def on_error(self, ws, error):
         print(f"[FOREX-WS] Error: {error}")
         self.connected = False
+        self._fail_pending(ConnectionError(f"Deriv WS error: {error}"))
 
     def on_close(self, ws, close_status_code, close_msg):
         print(f"[FOREX-WS] Connection Closed: {close_msg}")
         self.connected = False
+        self._fail_pending(ConnectionError("Deriv WS connection closed"))
+
+    # --- Request multiplexer (req_id -> future) ---
+    def send_request(self, payload):
+        """Sends `payload` tagged with a fresh req_id; returns a Future for its first response"""
+        future = Future()
+        req_id = next(self._req_ids)
+        future.req_id = req_id
+        with self._pending_lock:
+            self._pending[req_id] = future
+        try:
+            if not self.connected or self.ws is None:
+                raise ConnectionError("Deriv WS not connected")
+            self.ws.send(json.dumps(dict(payload, req_id=req_id)))
+            self.requests_sent += 1
+        except Exception as e:
+            self._discard(req_id)
+            self.requests_failed += 1
+            future.set_exception(e if isinstance(e, ConnectionError) else ConnectionError(str(e)))
+        return future
+
+    def request(self, payload, timeout=REQUEST_TIMEOUT):
+        """Blocking request/response; raises TimeoutError, ConnectionError or DerivAPIError"""
+        future = self.send_request(payload)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            self._discard(future.req_id)
+            self.request_timeouts += 1
+            raise TimeoutError(f"No response to req_id {future.req_id} within {timeout}s")
+
+    async def request_async(self, payload, timeout=REQUEST_TIMEOUT):
+        """Awaitable request/response for the async server (the socket thread resolves it)"""
+        future = self.send_request(payload)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self._discard(future.req_id)
+            self.request_timeouts += 1
+            raise TimeoutError(f"No response to req_id {future.req_id} within {timeout}s")
+
+    def _discard(self, req_id):
+        with self._pending_lock:
+            return self._pending.pop(req_id, None)
+
+    def _resolve(self, req_id, data):
+        future = self._discard(req_id)
+        if future is None or future.done():
+            return  # Stream update of a subscription, or a request that already timed out
+        err = data.get("error")
+        if err:
+            future.set_exception(DerivAPIError(err.get("message", "Unknown error"), err.get("code")))
+        else:
+            future.set_result(data)
+
+    def _fail_pending(self, error):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
 
     def on_open(self, ws):
         print("[FOREX-WS] ✅ Connected to Binary.com WS")
         self.connected = True
-        # Subscribe to some default majors
-        self.subscribe("frxEURUSD")
-        self.subscribe("frxGBPUSD")
-        self.subscribe("frxUSDJPY")
+        self.send_request({"active_symbols": "brief"}).add_done_callback(self._on_active_symbols)
+        # Subscribe to some default majors (plus everything followed before a reconnect)
+        with self.lock:
+            symbols = set(DEFAULT_SYMBOLS) | self.symbols
+        for symbol in symbols:
+            self.subscribe(symbol, resend=True)
 
-    def subscribe(self, symbol):
-        if self.connected:
-            req = {"ticks": symbol}
-            self.ws.send(json.dumps(req))
+    def _on_active_symbols(self, future):
+        try:
+            listed = frozenset(s["symbol"] for s in future.result().get("active_symbols") or []
+                               if s.get("market") == "forex" or s.get("symbol", "").startswith("frx"))
+        except Exception as e:
+            print(f"[FOREX-WS] active_symbols unavailable, keeping the built-in list: {e}")
+            return
+        if listed:
+            self.listed = listed
 
-    def get_historical_candles(self, symbol, count=1000, granularity=60):
+    def subscribe(self, symbol, resend=False):
         """
-        Fetches historical candles for backtesting.
+        Tick stream + one history seed per timeframe for `symbol` (once per connection).
+        Symbols Deriv does not list (crypto, stocks, OTC names) are never sent; a symbol whose
+        subscription errors is dropped and not retried for SUBSCRIBE_RETRY_SECS.
         """
-        if not self.connected:
-            if not self.connect():
-                return None
-        
-        # Binary.com ticks_history call
-        req = {
-            "ticks_history": symbol if symbol.startswith("frx") else f"frx{symbol.replace('/', '')}",
+        if symbol not in self.listed:
+            self.unlisted_skipped += 1
+            return False
+        with self.lock:
+            if symbol in self.symbols and not resend:
+                return True
+            if time.time() - self._rejected.get(symbol, 0) < SUBSCRIBE_RETRY_SECS:
+                return False
+            self.symbols.add(symbol)
+        if self.connected:
+            self.send_request({"ticks": symbol, "subscribe": 1}).add_done_callback(
+                lambda future: self._on_subscribed(symbol, future))
+            for tf in self.timeframes:
+                self.send_request(self._history_request(symbol, HISTORY_SEED_COUNT, tf))
+        return True
+
+    def _on_subscribed(self, symbol, future):
+        error = future.exception()
+        if not isinstance(error, DerivAPIError):
+            return  # Subscribed, or the socket dropped (on_open re-subscribes)
+        with self.lock:
+            self.symbols.discard(symbol)
+            self._rejected[symbol] = time.time()
+        self.subscriptions_rejected += 1
+        if error.code == "InvalidSymbol":
+            self.listed = self.listed - {symbol}
+        print(f"[FOREX-WS] Subscription to {symbol} rejected ({error.code}): {error}")
+
+    # --- Tick -> candle aggregation ---
+    @staticmethod
+    def symbol_for(asset):
+        """'EUR/USD' / 'EURUSD' -> Deriv 'frxEURUSD'"""
+        return asset if asset.startswith("frx") else f"frx{asset.replace('/', '').replace(' ', '').upper()}"
+
+    @staticmethod
+    def market_for(symbol):
+        """Deriv 'frxEURUSD' -> 'EURUSD' (the name MarketDataFeed reads the ring store with)"""
+        return symbol[3:] if symbol.startswith("frx") else symbol
+
+    def _on_tick(self, symbol, price, epoch):
+        if symbol not in self.symbols:
+            return
+        market = self.market_for(symbol)
+        for tf in self.timeframes:
+            self.store.tick(BROKER_NAME, market, tf, price, epoch)
+
+    def _on_ohlc(self, ohlc):
+        try:
+            symbol, granularity = ohlc.get("symbol"), int(ohlc.get("granularity") or 0)
+            if symbol not in self.symbols or granularity not in self.timeframes:
+                return
+            self.store.upsert(BROKER_NAME, self.market_for(symbol), granularity, float(ohlc["open"]),
+                              float(ohlc["high"]), float(ohlc["low"]), float(ohlc["close"]), ohlc["open_time"])
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[FOREX-WS] Bad ohlc update ignored: {e}")
+
+    @staticmethod
+    def _history_request(symbol, count, granularity):
+        return {
+            "ticks_history": symbol,
             "adjust_start_time": 1,
             "count": count,
             "end": "latest",
             "granularity": granularity,
-            "style": "candles"
+            "style": "candles",
+        }
+
+    @staticmethod
+    def _history_rows(candles, timeframe):
+        """ticks_history candles -> [(open, high, low, close, bucket_ts)] oldest -> newest"""
+        rows = []
+        for c in candles:
+            try:
+                epoch = int(c["epoch"])
+                rows.append((float(c["open"]), float(c["high"]), float(c["low"]), float(c["close"]),
+                             epoch - epoch % timeframe))
+            except (KeyError, TypeError, ValueError):
+                continue
+        rows.sort(key=lambda r: r[4])
+        return rows
+
+    def _on_history(self, symbol, granularity, candles):
+        granularity = int(granularity or 0)
+        if symbol not in self.symbols or granularity not in self.timeframes:
+            return
+        rows = self._history_rows(candles, granularity)
+        self.store.seed(BROKER_NAME, self.market_for(symbol), granularity, rows)
+        print(f"[FOREX-WS] Seeded {len(rows)} {granularity // 60}m candles for {symbol}")
+
+    def get_candles(self, asset, timeframe_seconds=60, count=100):
+        """
+        Last `count` CLOSED candles as a zero-copy ring window (oldest -> newest), or None when
+        the symbol is not followed yet (it is subscribed now) or the timeframe is not aggregated.
+        """
+        symbol = self.symbol_for(asset)
+        if int(timeframe_seconds) not in self.timeframes:
+            return None
+        if symbol not in self.symbols:
+            self.subscribe(symbol)
+            return None
+        return self.store.last(self.market_for(symbol), timeframe_seconds, count, broker=BROKER_NAME)
+
+    def get_historical_candles(self, symbol, count=1000, granularity=60, timeout=REQUEST_TIMEOUT):
+        """
+        Fetches historical candles for backtesting (blocking; shares the live socket).
+        Returns a CandleSeries oldest -> newest, or None on failure.
+        """
+        if not self.connected:
+            if not self.connect():
+                return None
+        try:
+            data = self.request(self._history_request(self.symbol_for(symbol), count, granularity), timeout)
+        except Exception as e:
+            print(f"[FOREX-WS] History request failed for {symbol}: {e}")
+            return None
+        return self._history_series(data, granularity)
+
+    async def get_historical_candles_async(self, symbol, count=1000, granularity=60, timeout=REQUEST_TIMEOUT):
+        """Async twin of get_historical_candles (the socket must already be connected)"""
+        try:
+            data = await self.request_async(self._history_request(self.symbol_for(symbol), count, granularity), timeout)
+        except Exception as e:
+            print(f"[FOREX-WS] History request failed for {symbol}: {e}")
+            return None
+        return self._history_series(data, granularity)
+
+    def _history_series(self, data, granularity):
+        rows = self._history_rows(data.get("candles") or [], granularity)
+        if not rows:
+            return None
+        series = CandleSeries()
+        for o, h, l, c, ts in rows:
+            series.append(o, h, l, c, ts=ts)
+        return series
+
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "symbols": len(self.symbols),
+            "listed_symbols": len(self.listed),
+            "unlisted_skipped": self.unlisted_skipped,
+            "subscriptions_rejected": self.subscriptions_rejected,
+            "pending_requests": len(self._pending),
+            "requests_sent": self.requests_sent,
+            "requests_failed": self.requests_failed,
+            "request_timeouts": self.request_timeouts,
         }
-        
-        # We need a way to receive the specific response. 
-        # For a simple backtest, we'll use a synchronous-like wait or a separate dedicated connection.
-        # But here we'll just implement the request.
-        self.ws.send(json.dumps(req))
-        
-        # In a real implementation, we'd wait for the 'candles' key in a response with matching req_id
-        # For this task, I'll assume we can collect it. 
-        # I will update the on_message to store these.
-        return None  # Will be returned via stream or specific handler
 
     def connect(self):
         with self.lock:
@@ -125,7 +373,7 @@ class ForexWSAdapter:
 
     def get_price(self, symbol):
         # Deriv symbols usually have frx prefix for forex
-        key = symbol if symbol.startswith("frx") else f"frx{symbol.replace('/', '')}"
+        key = self.symbol_for(symbol)
         if key not in self.last_price:
             self.subscribe(key)
         return self.last_price.get(key)
@@ -2,6 +2,8 @@ import time
 import threading
 from functools import wraps
 
+from brokers.candles import CandleSeries
+
 try:
     from iqoptionapi.api import IQOptionAPI as IQ_Option
     LIB_AVAILABLE = True
@@ -102,7 +104,7 @@ class IQOptionAdapter:
     def get_candles(self, asset, timeframe_seconds=60, count=20):
         """
         Enhanced candle fetching with retry logic.
-        Returns list of candles or None if unavailable.
+        Returns a CandleSeries or None if unavailable.
         """
         # Health check
         if not self._check_health():
@@ -128,20 +130,7 @@ class IQOptionAdapter:
                 if not candles:
                     return None
                 
-                norm = []
-                for c in candles:
-                    try:
-                        norm.append({
-                            "open": float(c.get("open", 0)),
-                            "high": float(c.get("max", c.get("high", 0))),
-                            "low": float(c.get("min", c.get("low", 0))),
-                            "close": float(c.get("close", 0)),
-                            "ts": int(c.get("from", c.get("ts", time.time())))
-                        })
-                    except (ValueError, TypeError) as e:
-                        print(f"[IQ] Error parsing candle: {e}")
-                        continue
-                
+                norm = CandleSeries.from_dicts(candles, default_ts=time.time())
                 return norm if norm else None
                 
             except Exception as e:
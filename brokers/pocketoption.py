@@ -1,7 +1,10 @@
+import json
 import threading
 import time
 from functools import wraps
 
+from brokers.candle_ring import default_store
+
 try:
     import websocket
     LIB_AVAILABLE = True
@@ -25,9 +28,13 @@ def retry_on_failure(max_retries=3, delay=2):
         return wrapper
     return decorator
 
+STREAM_TIMEFRAMES = (60, 300, 900)  # Candles built from the updateStream ticks
+BROKER_NAME = "POCKETOPTION"
+
 class PocketOptionAdapter:
-    def __init__(self, config):
+    def __init__(self, config, store=None):
         self.config = config
+        self.store = store or default_store()
         self.ws = None
         self.connected = False
         self.mode = "SIMULATION"
@@ -48,6 +55,25 @@ class PocketOptionAdapter:
         except Exception as e:
             print(f"[POCKET] Auth error: {e}")
 
+    def on_message(self, ws, message):
+        """socket.io frames: updateStream ticks ([[asset, ts, price], ...]) go into the candle rings"""
+        try:
+            if isinstance(message, bytes):
+                message = message.decode("utf-8", "ignore")
+            payload = message.lstrip("0123456789-\x04")  # socket.io packet type / binary marker
+            if not payload.startswith("["):
+                return
+            data = json.loads(payload)
+            if data and data[0] == "updateStream":
+                data = data[1] if len(data) > 1 else []
+            for tick in data:
+                if isinstance(tick, list) and len(tick) >= 3 and isinstance(tick[0], str):
+                    asset, ts, price = tick[0], float(tick[1]), float(tick[2])
+                    for tf in STREAM_TIMEFRAMES:
+                        self.store.tick(BROKER_NAME, asset, tf, price, ts)
+        except (ValueError, TypeError, IndexError):
+            pass  # Not a stream frame
+
     def on_error(self, ws, error):
         """WebSocket error handler"""
         print(f"[POCKET] WebSocket error: {error}")
@@ -84,6 +110,7 @@ class PocketOptionAdapter:
                                 self.ws = websocket.WebSocketApp(
                                     self.config.get("platform_url", "wss://api-fin.pocketoption.com/socket.io/?EIO=3&transport=websocket"),
                                     on_open=self.on_open,
+                                    on_message=self.on_message,
                                     on_error=self.on_error,
                                     on_close=self.on_close
                                 )
@@ -118,17 +145,14 @@ class PocketOptionAdapter:
     def get_candles(self, asset, timeframe_seconds=60, count=20):
         """
         Enhanced candle fetching.
-        Note: PocketOption uses WebSocket streams, so this is a placeholder.
-        Real implementation would require WebSocket message handling.
+        PocketOption only streams ticks: candles come from the ring the stream writes into
+        (None until it has any, which triggers the fallback).
         """
         if not self.connected:
             return None
 
         if self.mode == "REAL" and self.ws:
-            # WebSocket-based data fetching would go here
-            # This requires implementing WebSocket message handlers
-            # For now, return None to trigger fallback
-            return None
+            return self.store.last(asset, timeframe_seconds, count, broker=BROKER_NAME)
 
         return None
 
@@ -2,6 +2,8 @@ import time
 import threading
 from functools import wraps
 
+from brokers.candles import CandleSeries
+
 try:
     from pyquotex.stable_api import Quotex
     LIB_AVAILABLE = True
@@ -115,7 +117,7 @@ class QuotexAdapter:
     def get_candles(self, asset, timeframe_seconds=60, count=20):
         """
         Enhanced candle fetching with retry logic and error handling.
-        Returns list of dicts with open/high/low/close.
+        Returns a CandleSeries (dict-compatible rows with open/high/low/close/ts).
         """
         # Health check before fetching
         if not self._check_health():
@@ -174,20 +176,8 @@ class QuotexAdapter:
             if not candle_list:
                 return None
             
-            # Normalize candle data
-            norm = []
-            for c in candle_list:
-                try:
-                    norm.append({
-                        "open": float(c.get("open", 0)),
-                        "high": float(c.get("max", c.get("high", 0))),
-                        "low": float(c.get("min", c.get("low", 0))),
-                        "close": float(c.get("close", 0)),
-                        "ts": int(c.get("from", c.get("ts", end_ts)))
-                    })
-                except (ValueError, TypeError, AttributeError):
-                    continue
-            
+            # Normalize candle data into columnar storage
+            norm = CandleSeries.from_dicts(candle_list, default_ts=end_ts)
             return norm if norm else None
             
         except Exception as e:
@@ -9,6 +9,9 @@ from datetime import datetime
 from typing import Optional, Dict, List
 import logging
 
+from brokers.candle_ring import default_store
+from brokers.candles import CandleSeries
+
 try:
     from pyquotex import Quotex
     PYQUOTEX_AVAILABLE = True
@@ -26,8 +29,9 @@ class QuotexPyQuotexAdapter:
     - Automatic reconnection
     """
     
-    def __init__(self, config=None):
+    def __init__(self, config=None, store=None):
         self.config = config or {}
+        self.store = store or default_store()
         self.email = self.config.get('email') or os.getenv('QUOTEX_EMAIL')
         self.password = self.config.get('password') or os.getenv('QUOTEX_PASSWORD')
         
@@ -164,7 +168,9 @@ class QuotexPyQuotexAdapter:
             # Wait for data
             for _ in range(10):  # 2 second timeout
                 if self.client.realtime_candles.get(asset):
-                    return self.client.realtime_candles[asset]
+                    data = self.client.realtime_candles[asset]
+                    self._store_stream(asset, period, data)
+                    return data
                 await asyncio.sleep(0.2)
             
             return None
@@ -172,6 +178,18 @@ class QuotexPyQuotexAdapter:
             self.logger.error(f"[QUOTEX] Get candles error: {e}")
             return None
     
+    def _store_stream(self, asset: str, period: int, data):
+        """Streamed candles ({ts: candle}, [candle, ...] or one candle) -> the shared candle rings"""
+        try:
+            if isinstance(data, dict):
+                data = list(data.values()) if all(isinstance(v, dict) for v in data.values()) else [data]
+            candles = CandleSeries.from_dicts(data)
+            for c in sorted(candles, key=lambda c: c['ts']):
+                self.store.upsert("QUOTEX", asset, period, c['open'], c['high'], c['low'], c['close'],
+                                  c['ts'], c['volume'])
+        except Exception as e:
+            self.logger.debug(f"[QUOTEX] Stream candles not stored: {e}")
+
     async def get_realtime_price(self, asset: str) -> Optional[float]:
         """
         Get real-time price for asset
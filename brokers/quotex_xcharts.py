@@ -3,12 +3,19 @@ QUANTUM X PRO - Quotex MrBeast API Adapter
 Uses mrbeaxt.site API for Official Quotex broker data.
 High-speed, direct access, no Cloudflare blocking.
 """
-import requests
 import time
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Iterator, Optional, List, Dict, Tuple
+
+from brokers.candles import CandleSeries
+from core.http_client import default_client
+from core.rate_limit import RateLimiter
+
+BULK_WORKERS = 8          # Concurrent bridge requests in get_candles_many (<= the host's HTTP pool)
+BULK_RATE_PER_SEC = 20    # Request starts per second across the whole sweep
 
 class QuotexMrBeastAdapter:
     """
@@ -16,10 +23,12 @@ class QuotexMrBeastAdapter:
     - High-precision broker data
     - Direct API access
     - 100% OTC & Real Market support
+    - Pooled keep-alive HTTP client (pass `http` to share one; defaults to the process-wide client)
     """
     
-    def __init__(self, config=None):
+    def __init__(self, config=None, http=None):
         self.base_url = "https://mrbeaxt.site/Qx/Qx.php"
+        self.http = http or default_client()
         self.connected = True
         self.sid = "MRBEAST-PRO-API"
         
@@ -56,7 +65,7 @@ class QuotexMrBeastAdapter:
         """
         try:
             test_url = f"{self.base_url}?pair=EURUSD_otc&count=1"
-            response = requests.get(test_url, timeout=5)
+            response = self.http.get(test_url, timeout=(3.05, 5))
             if response.status_code == 200:
                 self.connected = True
                 return True
@@ -65,9 +74,10 @@ class QuotexMrBeastAdapter:
             self.connected = False
             return False
     
-    def get_candles(self, asset: str, timeframe_seconds: int = 60, count: int = 100, end_ts: int = None) -> Optional[List[Dict]]:
+    def get_candles(self, asset: str, timeframe_seconds: int = 60, count: int = 100, end_ts: int = None) -> Optional[CandleSeries]:
         """
         Fetches official broker candles from mrbeaxt.site
+        Returns a CandleSeries (rows still answer c['time'] / c['close'] like the old dicts).
         """
         try:
             # Normalize asset name to match API format
@@ -86,7 +96,7 @@ class QuotexMrBeastAdapter:
             # API URL
             url = f"{self.base_url}?pair={api_pair}&count={count}"
             
-            response = requests.get(url, timeout=8)
+            response = self.http.get(url)
             if response.status_code == 200:
                 raw_data = response.json()
                 
@@ -98,8 +108,7 @@ class QuotexMrBeastAdapter:
                     candle_list = raw_data["data"]
                 
                 if candle_list and len(candle_list) > 0:
-                    formatted_candles = []
-                    now_ts = time.time()
+                    rows = []
                     
                     for c in candle_list:
                         raw_time = c.get("time")
@@ -115,26 +124,26 @@ class QuotexMrBeastAdapter:
                             except:
                                 c_ts = time.time() # Fallback
                         
-                        formatted_candles.append({
-                            "time": c_ts,
-                            "open": float(c.get("open", 0)),
-                            "high": float(c.get("high", 0)),
-                            "low": float(c.get("low", 0)),
-                            "close": float(c.get("close", 0)),
-                            "volume": float(c.get("volume", 0)) if "volume" in c else 0
-                        })
+                        rows.append((
+                            float(c.get("open", 0)),
+                            float(c.get("high", 0)),
+                            float(c.get("low", 0)),
+                            float(c.get("close", 0)),
+                            float(c.get("volume", 0)) if "volume" in c else 0.0,
+                            float(c_ts),
+                        ))
                     
-                    if not formatted_candles: return None
+                    if not rows: return None
                     
                     # Ensure Oldest -> Newest
-                    formatted_candles.sort(key=lambda x: x['time'])
+                    rows.sort(key=lambda r: r[5])
                     
                     # STRICT: "Closed Candle Only" Enforcement
                     # We always discard the very last candle because it is the one currently "running" on the broker.
                     # This ensures technical indicators (RSI, etc.) are calculated on FIXED data.
-                    if len(formatted_candles) > 30:
-                        return formatted_candles[:-1]
-                    return formatted_candles
+                    if len(rows) > 30:
+                        rows = rows[:-1]
+                    return CandleSeries.from_rows(rows)
             
             print(f"[QUOTEX-API] ⚠️ No valid data for {asset} (Status: {response.status_code})")
             return None
@@ -143,6 +152,40 @@ class QuotexMrBeastAdapter:
             # print(f"[QUOTEX-API] ❌ Fetch Error: {e}")
             return None
     
+    def get_candles_many(self, pairs: List[str], timeframe_seconds: int = 60, count: int = 100,
+                         workers: int = BULK_WORKERS, rate: float = BULK_RATE_PER_SEC
+                         ) -> Iterator[Tuple[str, Optional[CandleSeries]]]:
+        """
+        Fetches many pairs concurrently and yields (pair, candles or None) as each one completes.
+        Requests run on a bounded thread pool over the pooled keep-alive client, and their
+        starts are paced to `rate` per second so a full sweep never bursts the bridge.
+        """
+        pairs = list(dict.fromkeys(pairs))  # Unique, order kept
+        if not pairs:
+            return
+        pacer = RateLimiter(max(1, int(rate)), 1.0, burst=max(1, workers), sweep_interval=0, name="mrbeast-bulk")
+
+        def fetch(pair):
+            while True:
+                allowed, wait = pacer.hit("bridge")
+                if allowed:
+                    break
+                time.sleep(wait)
+            return self.get_candles(pair, timeframe_seconds, count)
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(pairs))), thread_name_prefix="mrbeast-bulk")
+        try:
+            futures = {pool.submit(fetch, pair): pair for pair in pairs}
+            for future in as_completed(futures):
+                try:
+                    candles = future.result()
+                except Exception:
+                    candles = None
+                yield futures[future], candles
+        finally:
+            # Stopping early (break in the caller) drops the requests not started yet
+            pool.shutdown(wait=False, cancel_futures=True)
+
     def get_latest_price(self, asset: str) -> Optional[float]:
         candles = self.get_candles(asset, 60, 1)
         if candles and len(candles) > 0:
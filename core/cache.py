@@ -0,0 +1,165 @@
+"""
+QUANTUM X PRO - Shared In-Process Cache
+Thread-safe LRU cache with per-entry expiry and single-flight loading.
+- Bounded: least-recently-used entries are evicted past `maxsize`
+- Per-entry TTL (seconds, absolute deadline, or computed from the loaded value)
+- Concurrent misses on the same key collapse into ONE loader call
+- Hit / miss / coalesced / upstream-load / eviction counters for diagnostics
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """One in-progress load that other threads can wait on"""
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    def __init__(self, maxsize=256, ttl=60, name="cache"):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}         # key -> _Flight
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.load_errors = 0
+
+    # --- Basic operations ---
+    def _lookup(self, key, now):
+        """Caller holds the lock. Returns (found, value)."""
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._data[key]
+            self.expirations += 1
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def get(self, key, default=None):
+        with self._lock:
+            found, value = self._lookup(key, time.time())
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        if expires_at is None:
+            expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def invalidate_where(self, predicate, values=False):
+        """Drops every entry matching `predicate(key)` (`predicate(key, value)` with values=True); returns the count"""
+        with self._lock:
+            if values:
+                doomed = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+            else:
+                doomed = [k for k in self._data if predicate(k)]
+            for k in doomed:
+                del self._data[k]
+            return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._lookup(key, time.time())[0]
+
+    # --- Single-flight ---
+    def get_or_load(self, key, loader, ttl=None, cache_none=False, force=False):
+        """
+        Returns the cached value or runs `loader()` exactly once for all concurrent callers.
+        `ttl` may be seconds or a callable(value) -> seconds (None / <= 0 means do not cache).
+        `force=True` skips the lookup and reloads (still joining an in-flight load).
+        Loader exceptions are re-raised in every waiting thread and never cached.
+        """
+        with self._lock:
+            if not force:
+                found, value = self._lookup(key, time.time())
+                if found:
+                    self.hits += 1
+                    return value
+                self.misses += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.loads += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = loader()
+            flight.value = value
+            if value is not None or cache_none:
+                seconds = ttl(value) if callable(ttl) else (self.ttl if ttl is None else ttl)
+                if seconds and seconds > 0:
+                    self.set(key, value, ttl=seconds)
+            return value
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.load_errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    # --- Diagnostics ---
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "load_errors": self.load_errors,
+                "in_flight": len(self._inflight),
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            }
@@ -0,0 +1,258 @@
+"""
+QUANTUM X PRO - Health-Checked Postgres Pool
+Wraps psycopg2's ThreadedConnectionPool without a SELECT 1 on every checkout.
+- Connections idle longer than `idle_check_after` are pinged before being handed out
+- A keepalive sweeper pings idle connections in the background so most checkouts skip the ping
+- The first statement on an unchecked connection is retried once on a fresh connection
+  if the server dropped it (the transparent-retry window)
+- On exhaustion getconn() raises at once (or after `wait_timeout`, when set) so the caller's
+  direct / SQLite fallback answers instead of the request stalling
+"""
+import threading
+import time
+
+try:
+    import psycopg2
+    from psycopg2.pool import PoolError
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    psycopg2 = None
+    PoolError = RuntimeError
+    PSYCOPG2_AVAILABLE = False
+
+_DISCONNECT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError) if PSYCOPG2_AVAILABLE else ()
+
+
+class _RetryCursor:
+    """Cursor proxy: the first execute of a checkout is replayed on a fresh connection if ours died"""
+
+    def __init__(self, owner, args, kwargs):
+        self._owner = owner
+        self._args = args
+        self._kwargs = kwargs
+        self._cur = owner._raw.cursor(*args, **kwargs)
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            result = getattr(self._cur, method)(*args, **kwargs)
+        except _DISCONNECT_ERRORS:
+            owner = self._owner
+            if not owner._fresh or not owner._raw.closed:
+                raise
+            owner._reconnect()
+            self._cur = owner._raw.cursor(*self._args, **self._kwargs)
+            result = getattr(self._cur, method)(*args, **kwargs)
+        self._owner._fresh = False
+        return result
+
+    def execute(self, *args, **kwargs):
+        return self._call("execute", *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._call("executemany", *args, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cur.close()
+        return False
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class PooledConnection:
+    """Connection checked out from a HealthCheckedPool (behaves like the psycopg2 connection)"""
+
+    def __init__(self, pool, raw, validated):
+        self._pool = pool
+        self._raw = raw
+        self._fresh = not validated  # Unchecked until the first statement succeeds
+
+    def cursor(self, *args, **kwargs):
+        return _RetryCursor(self, args, kwargs)
+
+    def _reconnect(self):
+        self._pool.retries += 1
+        self._pool._discard(self._raw)
+        self._raw = self._pool._checkout_raw(force_check=True)[0]
+        self._fresh = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self._raw.commit()
+        else:
+            self._raw.rollback()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class HealthCheckedPool:
+    def __init__(self, pool, idle_check_after=30, keepalive_interval=60, wait_timeout=0.0, name="postgres"):
+        self.pool = pool
+        self.name = name
+        self.maxconn = pool.maxconn
+        self.idle_check_after = idle_check_after
+        self.keepalive_interval = keepalive_interval
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(pool.maxconn)
+        self._last_used = {}  # id(raw conn) -> time it went idle
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self.checkouts = 0
+        self.in_use = 0
+        self.waits = 0
+        self.wait_timeouts = 0
+        self.validations = 0
+        self.validation_failures = 0
+        self.retries = 0
+        self.discarded = 0
+        self.keepalive_pings = 0
+
+        if keepalive_interval:
+            threading.Thread(target=self._keepalive, daemon=True, name=f"{name}-keepalive").start()
+
+    # --- Checkout / return ---
+    def getconn(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.waits += 1
+            if self.wait_timeout <= 0 or not self._slots.acquire(timeout=self.wait_timeout):
+                with self._lock:
+                    self.wait_timeouts += 1
+                raise PoolError("connection pool exhausted")
+        try:
+            raw, validated = self._checkout_raw()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+        return PooledConnection(self, raw, validated)
+
+    def _checkout_raw(self, force_check=False):
+        """Caller owns a slot. Returns (raw connection, validated)."""
+        for _ in range(3):
+            raw = self.pool.getconn()
+            if raw.closed:
+                self._discard(raw)
+                continue
+            idle_since = self._last_used.get(id(raw))
+            if not force_check and (idle_since is None or time.time() - idle_since < self.idle_check_after):
+                return raw, idle_since is None  # Brand-new connections are known-good
+            if self._ping(raw):
+                return raw, True
+            self._discard(raw)
+        raise PoolError("no healthy connection available")
+
+    def putconn(self, conn, close=False):
+        if not isinstance(conn, PooledConnection):
+            # Direct (non-pooled) fallback connection
+            try: conn.close()
+            except Exception: pass
+            return
+        raw = conn._raw
+        close = close or raw.closed != 0
+        try:
+            self.pool.putconn(raw, close=close)
+        finally:
+            if raw.closed:
+                self._last_used.pop(id(raw), None)
+            else:
+                self._last_used[id(raw)] = time.time()
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def _discard(self, raw):
+        self._last_used.pop(id(raw), None)
+        with self._lock:
+            self.discarded += 1
+        try:
+            self.pool.putconn(raw, close=True)
+        except Exception:
+            try: raw.close()
+            except Exception: pass
+
+    def _ping(self, raw):
+        with self._lock:
+            self.validations += 1
+        try:
+            with raw.cursor() as cur:
+                cur.execute("SELECT 1")
+            raw.rollback()
+            return True
+        except Exception:
+            with self._lock:
+                self.validation_failures += 1
+            return False
+
+    # --- Background keepalive ---
+    def _keepalive(self):
+        while not self._stop.wait(self.keepalive_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[POOL] Keepalive sweep warning: {e}")
+
+    def sweep(self):
+        """Pings idle connections that are close to the idle threshold so checkouts can skip it"""
+        lock = getattr(self.pool, "_lock", None)
+        idle = getattr(self.pool, "_pool", None)
+        if lock is None or idle is None:
+            return
+        cutoff = time.time() - self.idle_check_after / 2
+        while self._slots.acquire(blocking=False):
+            with lock:
+                stale = next((c for c in idle if self._last_used.get(id(c), 0) <= cutoff), None)
+                if stale is not None:
+                    idle.remove(stale)
+            if stale is None:
+                self._slots.release()
+                return
+            self.keepalive_pings += 1
+            if self._ping(stale):
+                self._last_used[id(stale)] = time.time()
+                with lock:
+                    idle.append(stale)
+            else:
+                self._last_used.pop(id(stale), None)
+                with self._lock:
+                    self.discarded += 1
+                try: stale.close()
+                except Exception: pass
+            self._slots.release()
+
+    def closeall(self):
+        self._stop.set()
+        self.pool.closeall()
+
+    # --- Diagnostics ---
+    def stats(self):
+        idle = getattr(self.pool, "_pool", None)
+        with self._lock:
+            return {
+                "name": self.name,
+                "maxconn": self.maxconn,
+                "in_use": self.in_use,
+                "idle": len(idle) if idle is not None else None,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_timeouts": self.wait_timeouts,
+                "validations": self.validations,
+                "validation_failures": self.validation_failures,
+                "retries": self.retries,
+                "discarded": self.discarded,
+                "keepalive_pings": self.keepalive_pings,
+            }
@@ -0,0 +1,233 @@
+"""
+QUANTUM X PRO - Non-Blocking IP Geolocation
+Geo lookups never wait on the network inside a request.
+- In-process LRU/TTL cache keyed by IP, persisted to SQLite so restarts start warm
+- Misses are answered from a local IP-range file (offline fallback), then resolved
+  by the online provider on a background worker; `on_resolved` enriches stored rows
+- One background fetch per IP at a time; the backlog is bounded
+"""
+import bisect
+import csv
+import ipaddress
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.cache import TTLCache
+
+LOCAL_IPS = ("127.0.0.1", "localhost", "::1")
+LOCAL_GEO = {
+    "city": "Local",
+    "country": "Local",
+    "region": "Local",
+    "timezone": "UTC",
+    "isp": "Internal",
+    "lat": 0.0,
+    "lon": 0.0,
+    "zip": "00000",
+    "org": "Local Network"
+}
+UNKNOWN_GEO = {"city": "Unknown", "country": "Unknown", "isp": "Unknown"}
+
+
+def is_resolved(geo):
+    return bool(geo) and geo.get("country") not in (None, "", "Unknown")
+
+
+def _ip_int(value):
+    value = str(value).strip()
+    return int(value) if value.isdigit() else int(ipaddress.ip_address(value))
+
+
+class IPRangeDatabase:
+    """
+    Offline lookups from a CSV of IP ranges (DB-IP / IP2Location "lite" layouts):
+    start, end, country_code[, country, region, city, lat, lon, zip, timezone]
+    Start/end may be dotted addresses or integers; lookups are a binary search.
+    """
+    FIELDS = ("country_code", "country", "region", "city", "lat", "lon", "zip", "timezone")
+
+    def __init__(self, path):
+        self.path = path
+        self._starts = []
+        self._rows = []  # (end, geo dict)
+        with open(path, newline="", encoding="utf-8") as f:
+            ranges = []
+            for line in csv.reader(f):
+                if len(line) < 3 or line[0].startswith("#"):
+                    continue
+                try:
+                    start, end = _ip_int(line[0]), _ip_int(line[1])
+                except ValueError:
+                    continue  # Header row or malformed line
+                geo = {k: v for k, v in zip(self.FIELDS, line[2:]) if v not in ("", "-")}
+                for coord in ("lat", "lon"):
+                    if coord in geo:
+                        try: geo[coord] = float(geo[coord])
+                        except ValueError: del geo[coord]
+                geo.setdefault("country", geo.get("country_code", "Unknown"))
+                ranges.append((start, end, geo))
+        ranges.sort(key=lambda r: r[0])
+        self._starts = [r[0] for r in ranges]
+        self._rows = [(r[1], r[2]) for r in ranges]
+
+    def __len__(self):
+        return len(self._starts)
+
+    def lookup(self, ip):
+        try:
+            value = _ip_int(ip)
+        except ValueError:
+            return None
+        i = bisect.bisect_right(self._starts, value) - 1
+        if i < 0 or value > self._rows[i][0]:
+            return None
+        return dict(self._rows[i][1], ip=ip, source="offline")
+
+
+class GeoLocator:
+    def __init__(self, fetch, connect=None, ranges_path=None, ttl=7 * 86400, retry_after=600,
+                 maxsize=50000, workers=2, max_pending=1000, on_resolved=None):
+        """
+        `fetch(ip)` -> geo dict from the online provider (blocking, runs off the request path)
+        `connect()` -> sqlite3 connection for the persistent cache (None = memory only)
+        """
+        self.fetch = fetch
+        self.connect = connect
+        self.ttl = ttl
+        self.retry_after = retry_after  # Unresolved IPs are retried online after this long
+        self.max_pending = max_pending
+        self.on_resolved = on_resolved
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl, name="geo")
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geo")
+
+        self.offline_hits = 0
+        self.store_hits = 0
+        self.fetched = 0
+        self.fetch_failures = 0
+        self.skipped = 0
+
+        self.ranges = None
+        if ranges_path and os.path.exists(ranges_path):
+            try:
+                self.ranges = IPRangeDatabase(ranges_path)
+                print(f"[GEO] Offline IP ranges loaded: {len(self.ranges)} from {ranges_path}")
+            except Exception as e:
+                print(f"[GEO] Offline IP ranges unavailable ({ranges_path}): {e}")
+        if connect:
+            self._init_store()
+
+    # --- Persistent store (SQLite) ---
+    def _init_store(self):
+        try:
+            conn = self.connect()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS geo_cache (
+                    ip TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("DELETE FROM geo_cache WHERE expires_at < ?", (time.time(),))
+            conn.commit()
+        except Exception as e:
+            print(f"[GEO] Persistent cache disabled: {e}")
+            self.connect = None
+
+    def _load_stored(self, ip):
+        if not self.connect:
+            return None
+        try:
+            row = self.connect().execute(
+                "SELECT data, expires_at FROM geo_cache WHERE ip=?", (ip,)).fetchone()
+        except Exception as e:
+            print(f"[GEO] Cache read warning: {e}")
+            return None
+        if not row or row[1] <= time.time():
+            return None
+        self.store_hits += 1
+        self.cache.set(ip, json.loads(row[0]), expires_at=row[1])
+        return json.loads(row[0])
+
+    def _store(self, ip, geo, expires_at):
+        if not self.connect:
+            return
+        try:
+            conn = self.connect()
+            conn.execute(
+                "INSERT INTO geo_cache (ip, data, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (ip) DO UPDATE SET data = EXCLUDED.data, expires_at = EXCLUDED.expires_at",
+                (ip, json.dumps(geo), expires_at))
+            conn.commit()
+        except Exception as e:
+            print(f"[GEO] Cache write warning: {e}")
+
+    # --- Lookup ---
+    def lookup(self, ip, context=None):
+        """
+        Never blocks on the network. Returns the best geo known right now; when it is not
+        an online result yet, a background fetch is queued and `on_resolved(ip, geo, context)`
+        fires once it lands.
+        """
+        if not ip or ip in LOCAL_IPS:
+            return dict(LOCAL_GEO)
+        geo = self.cache.get(ip)
+        if geo is None:
+            geo = self._load_stored(ip)
+        if geo is not None:
+            return dict(geo)
+
+        geo = self.ranges.lookup(ip) if self.ranges else None
+        if geo:
+            self.offline_hits += 1
+        self.cache.set(ip, geo or dict(UNKNOWN_GEO), ttl=self.retry_after)
+        self.resolve_async(ip, context)
+        return dict(geo or UNKNOWN_GEO)
+
+    def resolve_async(self, ip, context=None):
+        with self._lock:
+            if ip in self._pending or len(self._pending) >= self.max_pending:
+                self.skipped += 1
+                return False
+            self._pending.add(ip)
+        self._pool.submit(self._resolve, ip, context)
+        return True
+
+    def _resolve(self, ip, context):
+        try:
+            geo = self.fetch(ip)
+            if not is_resolved(geo):
+                self.fetch_failures += 1
+                return
+            self.fetched += 1
+            expires_at = time.time() + self.ttl
+            self.cache.set(ip, geo, expires_at=expires_at)
+            self._store(ip, geo, expires_at)
+            if self.on_resolved:
+                self.on_resolved(ip, geo, context)
+        except Exception as e:
+            self.fetch_failures += 1
+            print(f"[GEO] Background lookup failed for {ip}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(ip)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+    # --- Diagnostics ---
+    def stats(self):
+        return {
+            "cache": self.cache.stats(),
+            "pending": len(self._pending),
+            "fetched": self.fetched,
+            "fetch_failures": self.fetch_failures,
+            "store_hits": self.store_hits,
+            "offline_hits": self.offline_hits,
+            "offline_ranges": len(self.ranges) if self.ranges else 0,
+            "skipped": self.skipped,
+        }
@@ -0,0 +1,161 @@
+"""
+QUANTUM X PRO - Pooled HTTP Client (REST market data, geolocation)
+One requests.Session shared by every REST adapter instead of a fresh TCP+TLS
+connection per call (module-level requests.get).
+- Keep-alive connection pool per host (HTTPAdapter mounted per host, sized per host)
+- gzip/deflate responses
+- Bounded retries on connect errors / 429 / 5xx with jittered exponential backoff
+  (idempotent GETs only, Retry-After honoured); a read timeout is never re-sent, so a
+  dead upstream costs one read timeout, not (retries + 1) of them
+- Per-host (connect, read) timeouts
+- Per-host latency, error, retry and connection-reuse counters for diagnostics
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (3.05, 8)     # (connect, read) seconds
+DEFAULT_POOL_SIZE = 10          # Keep-alive connections kept per host
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.2           # 0.2s, 0.4s, ... plus jitter
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _retry_policy(retries, backoff, jitter):
+    kwargs = dict(total=retries, connect=retries, read=False, status=retries,
+                  backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                  allowed_methods=frozenset({"GET", "HEAD"}), respect_retry_after_header=True,
+                  raise_on_status=False)
+    try:
+        return Retry(backoff_jitter=jitter, **kwargs)
+    except TypeError:  # urllib3 < 2: no jitter support
+        return Retry(**kwargs)
+
+
+class _HostStats:
+    __slots__ = ("requests", "errors", "server_errors", "retries", "total_ms", "max_ms", "last_ms", "base_url")
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.requests = 0
+        self.errors = 0          # No response at all (timeouts, refused, retries exhausted)
+        self.server_errors = 0   # 5xx responses
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+
+class HttpClient:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, jitter=None, name="http"):
+        self.name = name
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.jitter = backoff if jitter is None else jitter
+        self.session = requests.Session()
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+        self.session.mount("https://", self._adapter(pool_size, retries))
+        self.session.mount("http://", self._adapter(pool_size, retries))
+        self._timeouts = {}   # host -> (connect, read)
+        self._hosts = {}      # host -> _HostStats
+        self._lock = threading.Lock()
+
+    def _adapter(self, pool_size, retries):
+        return HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False,
+                           max_retries=_retry_policy(retries, self.backoff, self.jitter))
+
+    def configure(self, host, pool_size=None, timeout=None, retries=None):
+        """Per-host pool size / timeout / retries (applies to http and https)"""
+        adapter = self._adapter(pool_size or self.pool_size, self.retries if retries is None else retries)
+        for scheme in ("https://", "http://"):
+            self.session.mount(f"{scheme}{host}/", adapter)
+        if timeout is not None:
+            self._timeouts[host] = timeout
+        return self
+
+    # --- Requests ---
+    def request(self, method, url, timeout=None, **kwargs):
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        if timeout is None:
+            timeout = self._timeouts.get(host, self.timeout)
+        stats = self._hosts.get(host)
+        if stats is None:
+            with self._lock:
+                stats = self._hosts.setdefault(host, _HostStats(f"{parts.scheme}://{parts.netloc}"))
+
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                stats.requests += 1
+                stats.errors += 1
+            raise
+        elapsed = (time.perf_counter() - started) * 1000
+        retries = getattr(getattr(response.raw, "retries", None), "history", ()) or ()
+        with self._lock:
+            stats.requests += 1
+            stats.retries += len(retries)
+            stats.total_ms += elapsed
+            stats.last_ms = elapsed
+            stats.max_ms = max(stats.max_ms, elapsed)
+            if response.status_code >= 500:
+                stats.server_errors += 1
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    # --- Diagnostics ---
+    def _pool_counters(self, base_url):
+        """(new connections, requests) as counted by urllib3's pool for this host"""
+        try:
+            pool = self.session.get_adapter(base_url + "/").poolmanager.connection_from_url(base_url)
+            return pool.num_connections, pool.num_requests
+        except Exception:
+            return None, None
+
+    def stats(self):
+        with self._lock:
+            hosts = list(self._hosts.items())
+        report = {}
+        for host, s in hosts:
+            opened, sent = self._pool_counters(s.base_url)
+            answered = s.requests - s.errors
+            report[host] = {
+                "requests": s.requests,
+                "errors": s.errors,
+                "server_errors": s.server_errors,
+                "retries": s.retries,
+                "avg_ms": round(s.total_ms / answered, 1) if answered > 0 else None,
+                "max_ms": round(s.max_ms, 1),
+                "last_ms": round(s.last_ms, 1),
+                "connections_opened": opened,
+                "connection_reuse": round(1 - opened / sent, 3) if sent else None,
+            }
+        return {"name": self.name, "hosts": report}
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_client():
+    """Process-wide client shared by adapters that are not handed one explicitly"""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = HttpClient(name="default")
+    return _default
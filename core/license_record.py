@@ -0,0 +1,80 @@
+"""
+QUANTUM X PRO - License Record
+One immutable record per license row with the expiry parsed ONCE at load time
+into an integer UTC epoch, so every expiry check afterwards is an integer compare.
+- Accepts what either database hands back: datetime (Postgres), text (SQLite), epoch numbers
+- Naive timestamps are UTC (that is how activation/extension write them)
+"""
+import calendar
+import datetime
+import time
+
+_EXPIRY_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d")
+
+
+def expiry_epoch(value):
+    """expiry_date as stored -> int UTC epoch seconds, or None (no expiry / unparseable)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            return int(value.timestamp())
+        return calendar.timegm(value.timetuple())
+    if isinstance(value, datetime.date):
+        return calendar.timegm(value.timetuple())
+    text = str(value).strip()
+    if not text or text.lower() == "none":
+        return None
+    for fmt in _EXPIRY_FORMATS:
+        try:
+            return calendar.timegm(datetime.datetime.strptime(text, fmt).timetuple())
+        except ValueError:
+            continue
+    try:
+        return expiry_epoch(datetime.datetime.fromisoformat(text.replace("Z", "+00:00")))
+    except ValueError:
+        print(f"[AUTH] Unparseable expiry_date ignored: {text!r}")
+        return None
+
+
+class LicenseRecord:
+    __slots__ = ("key_code", "status", "device_id", "category", "expiry", "expiry_at",
+                 "activation_date", "loaded_at")
+
+    def __init__(self, key_code, status, device_id=None, category=None, expiry=None,
+                 activation_date=None, loaded_at=None):
+        self.key_code = key_code
+        self.status = status
+        self.device_id = device_id
+        self.category = category
+        self.expiry = expiry                  # As stored (echoed back to clients unchanged)
+        self.expiry_at = expiry_epoch(expiry)  # int UTC epoch or None = lifetime
+        self.activation_date = activation_date
+        self.loaded_at = time.time() if loaded_at is None else loaded_at
+
+    @classmethod
+    def missing(cls, key_code):
+        """Negative entry: the key does not exist"""
+        return cls(key_code, None)
+
+    @property
+    def exists(self):
+        return self.status is not None
+
+    def expired(self, now=None):
+        return self.expiry_at is not None and int(time.time() if now is None else now) > self.expiry_at
+
+    def bound_device(self):
+        """Device the key is locked to, or None while it is unbound"""
+        device = self.device_id
+        if device and device.strip() and device.lower() != "none":
+            return device
+        return None
+
+    def expiry_text(self):
+        return str(self.expiry) if self.expiry else "Lifetime"
+
+    def __repr__(self):
+        return f"LicenseRecord({self.key_code!r}, {self.status!r}, expiry_at={self.expiry_at})"
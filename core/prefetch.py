@@ -0,0 +1,115 @@
+"""
+QUANTUM X PRO - Candle-Boundary Prefetch Scheduler
+Signals are requested right after every candle close, so we refresh the hottest
+markets ourselves a few hundred milliseconds after each boundary.
+- Tracks demand per (market, timeframe) with exponential decay per cycle
+- Keeps the top-N markets hot; M5 keys only refresh on 5-minute boundaries, etc.
+- Refreshes run on a small worker pool (upstream limits are enforced by the caller)
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEMAND_DECAY = 0.5      # Demand halves every cycle so yesterday's hot pair cools down
+MIN_DEMAND = 0.05       # Below this a market is forgotten
+
+
+class PrefetchScheduler:
+    def __init__(self, refresh, hot_markets=20, delay=0.3, workers=4, name="prefetch"):
+        """`refresh(asset, timeframe_minutes)` reloads one market; exceptions are counted, not raised"""
+        self.refresh = refresh
+        self.hot_markets = hot_markets
+        self.delay = delay
+        self.name = name
+        self._demand = {}  # key -> [score, asset, timeframe_minutes]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pool = None
+        self._workers = workers
+
+        self.cycles = 0
+        self.prefetched = 0
+        self.errors = 0
+        self.last_cycle_ms = 0.0
+
+    # --- Demand tracking ---
+    def record(self, key, asset, timeframe_minutes):
+        with self._lock:
+            entry = self._demand.get(key)
+            if entry is None:
+                self._demand[key] = [1.0, asset, timeframe_minutes]
+            else:
+                entry[0] += 1
+                entry[1] = asset
+
+    def hot(self):
+        """Top-N keys by demand -> [(key, asset, timeframe_minutes)]"""
+        with self._lock:
+            ranked = sorted(self._demand.items(), key=lambda kv: kv[1][0], reverse=True)
+            return [(k, v[1], v[2]) for k, v in ranked[:self.hot_markets]]
+
+    def _decay(self):
+        with self._lock:
+            for key in list(self._demand):
+                self._demand[key][0] *= DEMAND_DECAY
+                if self._demand[key][0] < MIN_DEMAND:
+                    del self._demand[key]
+
+    # --- Scheduling ---
+    def start(self):
+        if self.hot_markets <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix=self.name)
+            self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._pool:
+            self._pool.shutdown(wait=False)
+
+    def _next_boundary(self, now, hot):
+        frames = {max(1, int(tf or 1)) * 60 for _, _, tf in hot} or {60}
+        return min((int(now // f) + 1) * f for f in frames)
+
+    def _run(self):
+        while not self._stop.is_set():
+            hot = self.hot()
+            boundary = self._next_boundary(time.time(), hot)
+            if self._stop.wait(max(0.0, boundary + self.delay - time.time())):
+                break
+
+            started = time.time()
+            due = [(k, a, tf) for k, a, tf in self.hot() if int(boundary) % (max(1, int(tf or 1)) * 60) == 0]
+            futures = [self._pool.submit(self._refresh_one, asset, tf) for _, asset, tf in due]
+            for f in futures:
+                f.result()
+            self.cycles += 1
+            self.last_cycle_ms = round((time.time() - started) * 1000, 1)
+            self._decay()
+
+    def _refresh_one(self, asset, timeframe_minutes):
+        try:
+            self.refresh(asset, timeframe_minutes)
+            self.prefetched += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"[PREFETCH] {asset} M{timeframe_minutes} refresh failed: {e}")
+
+    def stats(self):
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "hot_markets": self.hot_markets,
+            "delay_ms": int(self.delay * 1000),
+            "tracked": len(self._demand),
+            "hot": [f"{asset} M{tf}" for _, asset, tf in self.hot()],
+            "cycles": self.cycles,
+            "prefetched": self.prefetched,
+            "errors": self.errors,
+            "last_cycle_ms": self.last_cycle_ms,
+        }
@@ -0,0 +1,129 @@
+"""
+QUANTUM X PRO - Named Query Registry
+Every statement is written once (Postgres flavour) and compiled once per dialect.
+- Postgres: kept as written
+- SQLite: %s -> ?, CURRENT_TIMESTAMP -> datetime('now'), or an explicit per-dialect override
+- INSERT ... VALUES statements are pre-split for psycopg2's execute_values
+  (other statements can supply their own "... VALUES %s ..." batched form, e.g. UPDATE ... FROM)
+- Upsert helper emits ON CONFLICT ... DO UPDATE, understood by Postgres and SQLite >= 3.24
+"""
+import re
+
+try:
+    from psycopg2.extras import execute_values
+    EXECUTE_VALUES_AVAILABLE = True
+except ImportError:
+    execute_values = None
+    EXECUTE_VALUES_AVAILABLE = False
+
+DIALECTS = ("postgres", "sqlite")
+
+_SQLITE_REWRITES = (
+    ("%s", "?"),
+    ("CURRENT_TIMESTAMP", "datetime('now')"),
+)
+
+# "INSERT ... VALUES (%s, %s) [ON CONFLICT ...]" -> head / row template / tail
+_VALUES_RE = re.compile(r"^(?P<head>\s*INSERT\b.*?\bVALUES\s*)(?P<row>\([^()]*(?:\([^()]*\)[^()]*)*\))(?P<tail>.*)$",
+                        re.IGNORECASE | re.DOTALL)
+
+
+def to_sqlite(sql):
+    for old, new in _SQLITE_REWRITES:
+        sql = sql.replace(old, new)
+    return sql
+
+
+def split_values(sql):
+    """Rewrites a single-row INSERT for execute_values -> (query, row template) or None"""
+    match = _VALUES_RE.match(sql)
+    if not match or "%s" in match.group("tail"):
+        return None
+    return match.group("head") + "%s" + match.group("tail"), match.group("row")
+
+
+def upsert_sql(table, columns, conflict, update=None, now_columns=()):
+    """
+    INSERT ... ON CONFLICT (conflict) DO UPDATE SET col = EXCLUDED.col
+    `now_columns` are set to CURRENT_TIMESTAMP instead of taking a parameter.
+    """
+    conflict = (conflict,) if isinstance(conflict, str) else tuple(conflict)
+    update = [c for c in (update or columns) if c not in conflict]
+    names = list(columns) + list(now_columns)
+    values = ["%s"] * len(columns) + ["CURRENT_TIMESTAMP"] * len(now_columns)
+    sets = [f"{c} = EXCLUDED.{c}" for c in update] + [f"{c} = CURRENT_TIMESTAMP" for c in now_columns]
+    return (
+        f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join(values)}) "
+        f"ON CONFLICT ({', '.join(conflict)}) DO UPDATE SET {', '.join(sets)}"
+    )
+
+
+class QueryRegistry:
+    def __init__(self):
+        self._source = {}    # name -> {dialect: sql or None (= derive)}
+        self._compiled = {}  # (name, dialect) -> sql
+        self._batched = {}   # (name, dialect) -> (execute_values query, template) or None
+
+    def register(self, name, sql=None, batched=None, **overrides):
+        """
+        `sql` is the Postgres form; `sqlite=...` overrides (or provides the only) SQLite form.
+        `batched=(query, row_template)` is an explicit Postgres execute_values form for bulk().
+        """
+        if name in self._source:
+            raise ValueError(f"Query '{name}' already registered")
+        unknown = set(overrides) - set(DIALECTS)
+        if unknown:
+            raise ValueError(f"Unknown dialect(s) for '{name}': {', '.join(sorted(unknown))}")
+        self._source[name] = {"postgres": sql, **overrides}
+        self._compile(name)
+        if batched:
+            self._batched[(name, "postgres")] = (batched[0].strip(), batched[1])
+        return name
+
+    def register_upsert(self, name, table, columns, conflict, update=None, now_columns=()):
+        return self.register(name, upsert_sql(table, columns, conflict, update, now_columns))
+
+    def _compile(self, name):
+        source = self._source[name]
+        for dialect in DIALECTS:
+            sql = source.get(dialect)
+            if sql is None and dialect == "sqlite" and source.get("postgres"):
+                sql = to_sqlite(source["postgres"])
+            if sql is None:
+                continue
+            sql = sql.strip()
+            self._compiled[(name, dialect)] = sql
+            self._batched[(name, dialect)] = split_values(sql) if dialect == "postgres" else None
+
+    # --- Access ---
+    def sql(self, name, dialect):
+        try:
+            return self._compiled[(name, dialect)]
+        except KeyError:
+            raise KeyError(f"Query '{name}' has no {dialect} form") from None
+
+    def __contains__(self, name):
+        return name in self._source
+
+    def names(self):
+        return sorted(self._source)
+
+    # --- Execution helpers ---
+    def execute(self, cur, dialect, name, params=()):
+        cur.execute(self.sql(name, dialect), params)
+        return cur
+
+    def fetchone(self, cur, dialect, name, params=()):
+        return self.execute(cur, dialect, name, params).fetchone()
+
+    def bulk(self, cur, dialect, name, rows, page_size=500):
+        """Many parameter rows in as few round trips as the driver allows"""
+        rows = list(rows)
+        if not rows:
+            return 0
+        batched = self._batched.get((name, dialect)) if EXECUTE_VALUES_AVAILABLE else None
+        if batched:
+            execute_values(cur, batched[0], rows, template=batched[1], page_size=page_size)
+        else:
+            cur.executemany(self.sql(name, dialect), rows)
+        return len(rows)
@@ -0,0 +1,138 @@
+"""
+QUANTUM X PRO - GCRA Rate Limiter
+Token-bucket behaviour stored as ONE float per client (the theoretical arrival time),
+instead of a list of request timestamps.
+- O(1) memory and O(1) work per check, whatever the limit is
+- Lock-striped map: clients hash onto independent stripes, safe under threaded gunicorn
+- Background sweeper drops clients whose bucket has refilled (identical to never seen)
+- With a shared backend (core.shared_state) the buckets live in the backend instead,
+  so every worker process on the host enforces the same limit
+"""
+import threading
+import time
+
+
+def parse_limit(spec, default=None):
+    """'120/60' -> (120, 60.0) ; '120/60:20' -> burst of 20 ; falls back to `default` when invalid"""
+    try:
+        rate_part, _, burst = str(spec).partition(":")
+        count, _, period = rate_part.partition("/")
+        count, period = int(count), float(period or 60)
+        burst = int(burst) if burst else count
+        if count <= 0 or period <= 0 or burst <= 0:
+            raise ValueError(spec)
+        return count, period, burst
+    except (TypeError, ValueError):
+        if default is None:
+            raise ValueError(f"Invalid rate limit '{spec}' (expected count/seconds[:burst])")
+        print(f"[RATE-LIMIT] Ignoring invalid limit '{spec}', using {default}")
+        return parse_limit(default)
+
+
+class RateLimiter:
+    def __init__(self, count, period=60.0, burst=None, stripes=16, sweep_interval=60.0, name="default",
+                 backend=None):
+        """Allows `count` requests per `period` seconds per client, with up to `burst` back to back"""
+        self.name = name
+        self.backend = backend if backend is not None and backend.shared else None
+        self.count = count
+        self.period = period
+        self.burst = burst or count
+        self.interval = period / count                  # Emission interval: one token
+        self.tolerance = self.interval * (self.burst - 1)
+        self._stripes = [({}, threading.Lock()) for _ in range(max(1, stripes))]
+        self._stop = threading.Event()
+
+        self.allowed = 0
+        self.limited = 0
+        self.swept = 0
+
+        if sweep_interval:
+            threading.Thread(target=self._sweeper, args=(sweep_interval,), daemon=True,
+                             name=f"ratelimit-{name}").start()
+
+    @classmethod
+    def from_spec(cls, spec, default=None, **kwargs):
+        count, period, burst = parse_limit(spec, default)
+        return cls(count, period, burst, **kwargs)
+
+    def _stripe(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def hit(self, key, now=None):
+        """Consumes one token for `key` -> (allowed, retry_after_seconds)"""
+        if self.backend is not None:
+            # Wall clock: monotonic clocks are not comparable across processes
+            allowed, wait = self.backend.gcra(f"ratelimit:{self.name}", key, self.interval, self.tolerance, now)
+            if allowed:
+                self.allowed += 1
+            else:
+                self.limited += 1
+            return allowed, wait
+        now = time.monotonic() if now is None else now
+        buckets, lock = self._stripe(key)
+        with lock:
+            tat = max(buckets.get(key, now), now)
+            wait = tat - now - self.tolerance
+            if wait > 0:
+                self.limited += 1
+                return False, wait
+            buckets[key] = tat + self.interval
+            self.allowed += 1
+            return True, 0.0
+
+    def reset(self, key=None):
+        if self.backend is not None:
+            self.backend.reset_limits(f"ratelimit:{self.name}", key)
+            return
+        for buckets, lock in self._stripes:
+            with lock:
+                if key is None:
+                    buckets.clear()
+                else:
+                    buckets.pop(key, None)
+
+    # --- Idle bucket sweeper ---
+    def _sweeper(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[RATE-LIMIT] Sweep warning ({self.name}): {e}")
+
+    def sweep(self, now=None):
+        """Drops clients whose bucket is full again; returns how many were removed"""
+        if self.backend is not None:
+            removed = self.backend.sweep_limits(f"ratelimit:{self.name}", now)
+            self.swept += removed
+            return removed
+        now = time.monotonic() if now is None else now
+        removed = 0
+        for buckets, lock in self._stripes:
+            with lock:
+                idle = [k for k, tat in buckets.items() if tat <= now]
+                for k in idle:
+                    del buckets[k]
+            removed += len(idle)
+        self.swept += removed
+        return removed
+
+    def stop(self):
+        self._stop.set()
+
+    # --- Diagnostics ---
+    def __len__(self):
+        if self.backend is not None:
+            return self.backend.limit_clients(f"ratelimit:{self.name}")
+        return sum(len(buckets) for buckets, _ in self._stripes)
+
+    def stats(self):
+        return {
+            "limit": f"{self.count}/{self.period:g}s",
+            "burst": self.burst,
+            "clients": len(self),
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "swept": self.swept,
+            "shared": self.backend is not None,
+        }
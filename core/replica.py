@@ -0,0 +1,242 @@
+"""
+QUANTUM X PRO - Local License Replica
+Keeps the local SQLite `licenses` table a full copy of the cloud (Postgres) one, so auth
+reads never leave the box and a cloud outage only pauses replication.
+- Full pull at boot (and every `full_every` seconds), then incremental pulls on the
+  `last_modified` watermark every `interval` seconds
+- Pulls re-read a small overlap window so rows committed out of order are not missed
+- Local writes through `apply()` make our own activations visible before the next pull
+- Only auth columns are replicated; usage counters stay where they are written
+- Keys deleted on the primary are dropped locally by the next full pull
+- `on_change(keys)` reports what a pull changed (None = full pull) so caches can follow
+"""
+import datetime
+import threading
+import time
+
+def _local_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.replace(tzinfo=None).strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+class LicenseReplicator:
+    def __init__(self, source, release, local, queries, interval=5.0, full_every=3600, overlap=5,
+                 page_size=2000, local_init=None, on_change=None, name="license-replica"):
+        """
+        `source()` -> (conn, db_type) on the primary; replication only runs when it is 'postgres'
+        `local()` -> the local sqlite3 connection holding the replica `licenses` table
+        """
+        self.source = source
+        self.release = release
+        self.local = local
+        self.queries = queries
+        self.interval = interval
+        self.full_every = full_every
+        self.overlap = datetime.timedelta(seconds=overlap)
+        self.page_size = page_size
+        self.local_init = local_init
+        self.on_change = on_change
+        self.name = name
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.ready = False          # True once this process completed a pull
+        self.watermark = None       # Highest last_modified seen on the primary
+        self.last_full_at = 0.0
+        self.last_sync_at = 0.0
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.rows_pulled = 0
+        self.rows_deleted = 0
+        self.local_writes = 0
+        self.errors = 0
+        self.local_reads = 0
+        self.local_misses = 0
+
+    # --- Local state ---
+    def _init_local(self):
+        if self.local_init:
+            self.local_init()
+        conn = self.local()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS license_replica_state (
+                name TEXT PRIMARY KEY,
+                watermark TEXT,
+                full_sync_at REAL
+            )
+        """)
+        conn.commit()
+        row = conn.execute("SELECT watermark, full_sync_at FROM license_replica_state WHERE name=?",
+                           (self.name,)).fetchone()
+        if row:
+            self.watermark = datetime.datetime.fromisoformat(row[0]) if row[0] else None
+            self.last_full_at = row[1] or 0.0
+
+    def _save_state(self, conn):
+        conn.execute(
+            "INSERT INTO license_replica_state (name, watermark, full_sync_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET watermark = EXCLUDED.watermark, full_sync_at = EXCLUDED.full_sync_at",
+            (self.name, self.watermark.isoformat() if self.watermark else None, self.last_full_at))
+
+    # --- Replication ---
+    def sync(self, full=None):
+        """One pull from the primary; returns rows applied, or None when the primary is not Postgres"""
+        with self._lock:
+            if full is None:
+                full = time.time() - self.last_full_at >= self.full_every
+            if self.watermark is None:
+                full = True  # Nothing to pull incrementally from (empty table / no last_modified yet)
+            conn, db_type = self.source()
+            if not conn:
+                return None
+            try:
+                if db_type != 'postgres':
+                    return None
+                cur = conn.cursor()
+                if full:
+                    self.queries.execute(cur, db_type, "replica_pull_all")
+                else:
+                    self.queries.execute(cur, db_type, "replica_pull_since", (self.watermark - self.overlap,))
+                changed = [] if not full else None
+                seen = set() if full else None
+                applied = self._apply_pages(cur, changed, seen)
+                cur.close()
+                conn.rollback()  # Read-only; hand the connection back clean
+            finally:
+                self.release(conn, db_type)
+            if full:
+                self._delete_missing(seen)
+
+            now = time.time()
+            if full:
+                self.last_full_at = now
+                self.full_syncs += 1
+            else:
+                self.incremental_syncs += 1
+            local = self.local()
+            self._save_state(local)
+            local.commit()
+            self.last_sync_at = now
+            self.rows_pulled += applied
+            if self.on_change and (full or changed):
+                try:
+                    self.on_change(changed)
+                except Exception as e:
+                    print(f"[REPLICA] Change hook warning: {e}")
+            if not self.ready:
+                self.ready = True
+                print(f"[REPLICA] Local license replica in sync ({applied} row(s) pulled)")
+            return applied
+
+    def _apply_pages(self, cur, changed=None, seen=None):
+        local = self.local()
+        applied = 0
+        try:
+            while True:
+                rows = cur.fetchmany(self.page_size)
+                if not rows:
+                    break
+                batch = [tuple(_local_value(v) for v in row) for row in rows]
+                self.queries.bulk(local, 'sqlite', "replica_upsert_license", batch)
+                for row in rows:
+                    if row[-1] and (self.watermark is None or row[-1] > self.watermark):
+                        self.watermark = row[-1].replace(tzinfo=None)
+                applied += len(batch)
+                if changed is not None:
+                    changed.extend(row[0] for row in rows)
+                if seen is not None:
+                    seen.update(row[0] for row in rows)
+            local.commit()
+        except Exception:
+            local.rollback()
+            raise
+        return applied
+
+    def _delete_missing(self, seen):
+        """After a full pull: local keys the primary no longer has must not stay ACTIVE here"""
+        local = self.local()
+        try:
+            keys = self.queries.execute(local.cursor(), 'sqlite', "replica_local_keys").fetchall()
+            gone = [(row[0],) for row in keys if row[0] not in seen]
+            if gone:
+                self.queries.bulk(local, 'sqlite', "replica_delete_license", gone)
+                local.commit()
+                self.rows_deleted += len(gone)
+                print(f"[REPLICA] Dropped {len(gone)} key(s) deleted on the primary")
+        except Exception:
+            local.rollback()
+            raise
+
+    def apply(self, key_code, category, status, device_id, expiry_date, activation_date):
+        """Writes one row we just changed on the primary into the replica (read-your-writes)"""
+        local = self.local()
+        row = (key_code, category, status, device_id, expiry_date, activation_date,
+               self.watermark or datetime.datetime.utcnow())
+        try:
+            self.queries.execute(local, 'sqlite', "replica_upsert_license", tuple(_local_value(v) for v in row))
+            local.commit()
+            self.local_writes += 1
+        except Exception as e:
+            print(f"[REPLICA] Local write failed for {key_code}: {e}")
+            try: local.rollback()
+            except: pass
+
+    # --- Reads ---
+    def fetchone(self, name, params=()):
+        """Named query against the replica (sqlite form); None on a miss"""
+        row = self.queries.fetchone(self.local().cursor(), 'sqlite', name, params)
+        self.local_reads += 1
+        if row is None:
+            self.local_misses += 1
+        return row
+
+    # --- Background loop ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def request_sync(self):
+        """Wakes the replicator now (admin changes)"""
+        self._wake.set()
+
+    def _run(self):
+        try:
+            self._init_local()
+        except Exception as e:
+            print(f"[REPLICA] Local store unavailable, replication disabled: {e}")
+            return
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                self.errors += 1
+                print(f"[REPLICA] Sync warning: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    # --- Diagnostics ---
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "lag_s": round(time.time() - self.last_sync_at, 1) if self.last_sync_at else None,
+            "full_syncs": self.full_syncs,
+            "incremental_syncs": self.incremental_syncs,
+            "rows_pulled": self.rows_pulled,
+            "rows_deleted": self.rows_deleted,
+            "local_writes": self.local_writes,
+            "local_reads": self.local_reads,
+            "local_misses": self.local_misses,
+            "errors": self.errors,
+        }
@@ -0,0 +1,585 @@
+"""
+QUANTUM X PRO - Shared State Backends (multi-worker)
+Caches and rate limits that stay coherent when gunicorn runs several worker processes.
+- InProcessBackend: plain dicts, the single-worker default (identical to before)
+- SQLiteBackend: one WAL SQLite file on local disk shared by every worker on the host
+  * cache entries (pickled values with an absolute expiry) behind each worker's LRU
+  * GCRA rate-limit state updated atomically in one UPSERT, so limits are per host
+    (SQLite < 3.35 has no RETURNING: the same step runs in a BEGIN IMMEDIATE transaction)
+  * load leases: one worker fetches a missing entry, the others wait for its result
+  * an event log polled by each worker, so invalidations reach every process
+- SharedTTLCache: the usual TTLCache (L1, per worker) with the backend as L2
+Select with SHARED_STATE=memory|sqlite[:path]
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from core.cache import TTLCache
+from core.sqlite_store import SQLiteConnectionManager
+
+SQLITE_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)  # UPSERT ... RETURNING
+
+SHARED_STATE_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "OFF"),      # Scratch state: losing it on a power cut only costs cache misses
+    ("cache_size", -8000),
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),
+)
+
+
+def _key(key):
+    """Cache keys are str or tuples of plain values; repr() is stable across processes"""
+    return key if isinstance(key, str) else repr(key)
+
+
+class InProcessBackend:
+    """Process-local state; caches stay plain TTLCaches and limiters keep their own buckets"""
+    shared = False
+
+    def __init__(self):
+        self.lease_waits = 0
+        self._values = {}    # (ns, key) -> (expires_at, value)
+        self._limits = {}    # (ns, key) -> tat
+        self._lock = threading.Lock()
+
+    # --- Cache entries ---
+    def get(self, ns, key):
+        with self._lock:
+            entry = self._values.get((ns, _key(key)))
+        if entry is None or entry[0] <= time.time():
+            return False, None, None
+        return True, entry[1], entry[0]
+
+    def set(self, ns, key, value, ttl):
+        with self._lock:
+            self._values[(ns, _key(key))] = (time.time() + ttl, value)
+
+    def delete(self, ns, key=None):
+        with self._lock:
+            if key is None:
+                for k in [k for k in self._values if k[0] == ns]:
+                    del self._values[k]
+            else:
+                self._values.pop((ns, _key(key)), None)
+
+    def delete_where(self, ns, predicate, values=False):
+        with self._lock:
+            doomed = [k for k, (_, v) in self._values.items()
+                      if k[0] == ns and (predicate(k[1], v) if values else predicate(k[1]))]
+            for k in doomed:
+                del self._values[k]
+        return len(doomed)
+
+    def acquire(self, ns, key, ttl):
+        return True  # TTLCache's own single-flight already covers one process
+
+    def leased(self, ns, key):
+        return False
+
+    def release(self, ns, key):
+        pass
+
+    # --- Rate limits ---
+    def gcra(self, ns, key, interval, tolerance, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tat = max(self._limits.get((ns, key), now), now)
+            wait = tat - now - tolerance
+            if wait > 0:
+                return False, wait
+            self._limits[(ns, key)] = tat + interval
+            return True, 0.0
+
+    def sweep_limits(self, ns, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            idle = [k for k, tat in self._limits.items() if k[0] == ns and tat <= now]
+            for k in idle:
+                del self._limits[k]
+        return len(idle)
+
+    def reset_limits(self, ns, key=None):
+        with self._lock:
+            for k in [k for k in self._limits if k[0] == ns and (key is None or k[1] == key)]:
+                del self._limits[k]
+
+    def limit_clients(self, ns):
+        return sum(1 for k in self._limits if k[0] == ns)
+
+    # --- Events (one process: nobody else to tell) ---
+    def publish(self, channel, message=None):
+        pass
+
+    def subscribe(self, channel, callback):
+        pass
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+    def stats(self):
+        return {"backend": "memory", "entries": len(self._values), "limit_clients": len(self._limits)}
+
+
+class SQLiteBackend:
+    """Host-wide state in one SQLite file; every worker opens its own per-thread connections"""
+    shared = True
+
+    def __init__(self, path, poll_interval=0.5, prune_interval=60.0, event_retention=300.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.prune_interval = prune_interval
+        self.event_retention = event_retention
+        self._subscribers = {}  # channel -> [callback]
+        self._lock = threading.Lock()
+        self._pid = None
+        self._store = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_event = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.lease_waits = 0
+        self.events_published = 0
+        self.events_received = 0
+        self.errors = 0
+        self.returning = SQLITE_RETURNING
+        self._warned = set()
+
+    # --- Connections (re-opened after a fork: SQLite handles must not cross processes) ---
+    def _conn(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._store = SQLiteConnectionManager(self.path, pragmas=SHARED_STATE_PRAGMAS)
+                    self._init_schema(self._store.connection())
+                    self._pid = os.getpid()
+                    self._thread = None
+        return self._store.connection()
+
+    @staticmethod
+    def _init_schema(conn):
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS shared_cache (
+                ns TEXT NOT NULL, key TEXT NOT NULL, value BLOB, expires_at REAL NOT NULL,
+                PRIMARY KEY (ns, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS shared_limits (
+                ns TEXT NOT NULL, key TEXT NOT NULL, tat REAL NOT NULL,
+                PRIMARY KEY (ns, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS shared_leases (
+                ns TEXT NOT NULL, key TEXT NOT NULL, owner INTEGER NOT NULL, expires_at REAL NOT NULL,
+                PRIMARY KEY (ns, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS shared_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL, message TEXT, origin INTEGER NOT NULL, created_at REAL NOT NULL
+            );
+        """)
+        conn.commit()
+
+    def _write(self, sql, params=(), fetch=False):
+        """One statement in its own transaction; `fetch=True` returns its RETURNING row"""
+        conn = self._conn()
+        try:
+            cur = conn.execute(sql, params)
+            row = cur.fetchone() if fetch else None
+            conn.commit()
+            self.writes += 1
+            return row if fetch else cur
+        except sqlite3.Error:
+            conn.rollback()
+            self.errors += 1
+            raise
+
+    # --- Cache entries ---
+    def get(self, ns, key):
+        try:
+            row = self._conn().execute(
+                "SELECT value, expires_at FROM shared_cache WHERE ns=? AND key=? AND expires_at > ?",
+                (ns, _key(key), time.time())).fetchone()
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"[SHARED] Read failed ({ns}): {e}")
+            return False, None, None
+        if row is None:
+            self.misses += 1
+            return False, None, None
+        try:
+            value = pickle.loads(row[0])
+        except Exception as e:
+            self.errors += 1
+            print(f"[SHARED] Undecodable entry dropped ({ns}): {e}")
+            return False, None, None
+        self.hits += 1
+        return True, value, row[1]
+
+    def set(self, ns, key, value, ttl):
+        try:
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            self._write(
+                "INSERT INTO shared_cache (ns, key, value, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (ns, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (ns, _key(key), blob, time.time() + ttl))
+        except Exception as e:
+            print(f"[SHARED] Write skipped ({ns}): {e}")
+
+    def delete(self, ns, key=None):
+        try:
+            if key is None:
+                self._write("DELETE FROM shared_cache WHERE ns=?", (ns,))
+            else:
+                self._write("DELETE FROM shared_cache WHERE ns=? AND key=?", (ns, _key(key)))
+        except sqlite3.Error as e:
+            print(f"[SHARED] Delete failed ({ns}): {e}")
+
+    def delete_where(self, ns, predicate, values=False):
+        """
+        Deletes the entries matching `predicate(key)` (`predicate(key, value)` with values=True);
+        keys are seen as stored (str keys unchanged). Undecodable entries are dropped too.
+        """
+        conn = self._conn()
+        try:
+            rows = conn.execute("SELECT key, value FROM shared_cache WHERE ns=?", (ns,)).fetchall()
+            doomed = []
+            for key, blob in rows:
+                try:
+                    match = predicate(key, pickle.loads(blob)) if values else predicate(key)
+                except Exception:
+                    match = True
+                if match:
+                    doomed.append((ns, key))
+            if doomed:
+                conn.executemany("DELETE FROM shared_cache WHERE ns=? AND key=?", doomed)
+                conn.commit()
+                self.writes += 1
+            return len(doomed)
+        except sqlite3.Error as e:
+            conn.rollback()
+            self.errors += 1
+            print(f"[SHARED] Delete failed ({ns}): {e}")
+            return 0
+
+    def _warn_once(self, what, ns, error):
+        """Logs the first failure per (what, ns); later ones only show up in stats()["errors"]"""
+        if (what, ns) not in self._warned:
+            self._warned.add((what, ns))
+            print(f"[SHARED] {what} ({ns}): {error} (further failures only counted in stats)")
+
+    def _immediate(self, step):
+        """`step(conn)` inside BEGIN IMMEDIATE (the write lock is held from the first read)"""
+        conn = self._conn()
+        if conn.in_transaction:
+            conn.commit()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            result = step(conn)
+            conn.commit()
+            self.writes += 1
+            return result
+        except sqlite3.Error:
+            conn.rollback()
+            self.errors += 1
+            raise
+        except BaseException:
+            conn.rollback()
+            raise
+
+    # --- Load leases (cross-worker single-flight) ---
+    def acquire(self, ns, key, ttl):
+        """True when this process may load `key`; a crashed owner's lease lapses after `ttl`"""
+        now = time.time()
+        if not self.returning:
+            return self._acquire_immediate(ns, key, ttl, now)
+        try:
+            row = self._write(
+                "INSERT INTO shared_leases (ns, key, owner, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (ns, key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE shared_leases.expires_at <= ? RETURNING owner",
+                (ns, _key(key), os.getpid(), now + ttl, now), fetch=True)
+        except sqlite3.Error as e:
+            self._warn_once("Lease failed open", ns, e)
+            return True  # Never let the shared file stop a load
+        return row is not None
+
+    def _acquire_immediate(self, ns, key, ttl, now):
+        def step(conn):
+            row = conn.execute("SELECT expires_at FROM shared_leases WHERE ns=? AND key=?", (ns, _key(key))).fetchone()
+            if row is not None and row[0] > now:
+                return False
+            conn.execute("INSERT OR REPLACE INTO shared_leases (ns, key, owner, expires_at) VALUES (?, ?, ?, ?)",
+                         (ns, _key(key), os.getpid(), now + ttl))
+            return True
+        try:
+            return self._immediate(step)
+        except sqlite3.Error as e:
+            self._warn_once("Lease failed open", ns, e)
+            return True
+
+    def leased(self, ns, key):
+        try:
+            return self._conn().execute(
+                "SELECT 1 FROM shared_leases WHERE ns=? AND key=? AND expires_at > ?",
+                (ns, _key(key), time.time())).fetchone() is not None
+        except sqlite3.Error:
+            return False
+
+    def release(self, ns, key):
+        try:
+            self._write("DELETE FROM shared_leases WHERE ns=? AND key=? AND owner=?", (ns, _key(key), os.getpid()))
+        except sqlite3.Error as e:
+            print(f"[SHARED] Lease release failed ({ns}): {e}")
+
+    # --- Rate limits ---
+    def gcra(self, ns, key, interval, tolerance, now=None):
+        """One GCRA step in a single atomic UPSERT -> (allowed, retry_after_seconds)"""
+        now = time.time() if now is None else now
+        if not self.returning:
+            return self._gcra_immediate(ns, key, interval, tolerance, now)
+        try:
+            row = self._write(
+                "INSERT INTO shared_limits (ns, key, tat) VALUES (?, ?, ?) "
+                "ON CONFLICT (ns, key) DO UPDATE SET tat = MAX(tat, ?) + ? "
+                "WHERE MAX(tat, ?) - ? <= ? RETURNING tat",
+                (ns, key, now + interval, now, interval, now, now, tolerance), fetch=True)
+            if row is not None:
+                return True, 0.0
+            tat = self._conn().execute("SELECT tat FROM shared_limits WHERE ns=? AND key=?", (ns, key)).fetchone()
+            return False, max(0.0, (tat[0] if tat else now) - now - tolerance)
+        except sqlite3.Error as e:
+            self._warn_once("Rate limit check failed open", ns, e)
+            return True, 0.0
+
+    def _gcra_immediate(self, ns, key, interval, tolerance, now):
+        """Same step as gcra() for SQLite < 3.35: read and write under one write lock"""
+        def step(conn):
+            row = conn.execute("SELECT tat FROM shared_limits WHERE ns=? AND key=?", (ns, key)).fetchone()
+            tat = max(row[0], now) if row else now
+            wait = tat - now - tolerance
+            if wait > 0:
+                return False, wait
+            conn.execute("INSERT OR REPLACE INTO shared_limits (ns, key, tat) VALUES (?, ?, ?)", (ns, key, tat + interval))
+            return True, 0.0
+        try:
+            return self._immediate(step)
+        except sqlite3.Error as e:
+            self._warn_once("Rate limit check failed open", ns, e)
+            return True, 0.0
+
+    def sweep_limits(self, ns, now=None):
+        now = time.time() if now is None else now
+        return self._write("DELETE FROM shared_limits WHERE ns=? AND tat <= ?", (ns, now)).rowcount
+
+    def reset_limits(self, ns, key=None):
+        if key is None:
+            self._write("DELETE FROM shared_limits WHERE ns=?", (ns,))
+        else:
+            self._write("DELETE FROM shared_limits WHERE ns=? AND key=?", (ns, key))
+
+    def limit_clients(self, ns):
+        return self._conn().execute("SELECT COUNT(*) FROM shared_limits WHERE ns=?", (ns,)).fetchone()[0]
+
+    # --- Events ---
+    def publish(self, channel, message=None):
+        """Tells the OTHER workers (the caller already applied the change locally)"""
+        try:
+            self._write("INSERT INTO shared_events (channel, message, origin, created_at) VALUES (?, ?, ?, ?)",
+                        (channel, message, os.getpid(), time.time()))
+            self.events_published += 1
+        except sqlite3.Error as e:
+            print(f"[SHARED] Publish failed ({channel}): {e}")
+
+    def subscribe(self, channel, callback):
+        """`callback(message)` runs on the poller thread for events from other workers"""
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    def start(self):
+        """Starts this process's poller (call after the fork, e.g. on the first request)"""
+        conn = self._conn()
+        if self._thread and self._thread.is_alive():
+            return self
+        self._last_event = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM shared_events").fetchone()[0]
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="shared-state")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        last_prune = 0.0
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+                if time.time() - last_prune >= self.prune_interval:
+                    last_prune = time.time()
+                    self.prune()
+            except Exception as e:
+                self.errors += 1
+                print(f"[SHARED] Poll warning: {e}")
+
+    def poll(self):
+        rows = self._conn().execute(
+            "SELECT seq, channel, message, origin FROM shared_events WHERE seq > ? ORDER BY seq",
+            (self._last_event,)).fetchall()
+        for seq, channel, message, origin in rows:
+            self._last_event = seq
+            if origin == os.getpid():
+                continue
+            self.events_received += 1
+            for callback in self._subscribers.get(channel, ()):
+                try:
+                    callback(message)
+                except Exception as e:
+                    print(f"[SHARED] Subscriber warning ({channel}): {e}")
+        return len(rows)
+
+    def prune(self):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("DELETE FROM shared_cache WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM shared_leases WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM shared_events WHERE created_at < ?", (now - self.event_retention,))
+        conn.commit()
+
+    # --- Diagnostics ---
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "pid": os.getpid(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            "writes": self.writes,
+            "lease_waits": self.lease_waits,
+            "events_published": self.events_published,
+            "events_received": self.events_received,
+            "errors": self.errors,
+            "returning": self.returning,
+        }
+
+
+class SharedTTLCache(TTLCache):
+    """
+    TTLCache whose misses consult the shared backend before loading, and whose stores
+    are written through to it. The L1 keeps its own hit path (no I/O on a hit); entries
+    another worker invalidates are dropped via the backend's events (see publish/subscribe).
+    """
+
+    def __init__(self, backend, maxsize=256, ttl=60, name="cache", lease_ttl=15.0, lease_poll=0.05):
+        super().__init__(maxsize=maxsize, ttl=ttl, name=name)
+        self.backend = backend
+        self.lease_ttl = lease_ttl
+        self.lease_poll = lease_poll
+        self._from_shared = threading.local()
+        self.shared_hits = 0
+
+    def _shared_lookup(self, key):
+        found, value, expires_at = self.backend.get(self.name, key)
+        if found:
+            self.shared_hits += 1
+            self._from_shared.expires_at = expires_at
+        return found, value
+
+    def get_or_load(self, key, loader, ttl=None, cache_none=False, force=False):
+        leased = []
+
+        def shared_loader():
+            if not force:
+                found, value = self._shared_lookup(key)
+                if found:
+                    return value
+                if not self.backend.acquire(self.name, key, self.lease_ttl):
+                    # Another worker is loading it: wait for its result instead of a second upstream call
+                    self.backend.lease_waits += 1
+                    deadline = time.time() + self.lease_ttl
+                    while time.time() < deadline and self.backend.leased(self.name, key):
+                        time.sleep(self.lease_poll)
+                        found, value = self._shared_lookup(key)
+                        if found:
+                            return value
+                    found, value = self._shared_lookup(key)
+                    if found:
+                        return value
+                else:
+                    leased.append(key)
+            return loader()
+
+        try:
+            return super().get_or_load(key, shared_loader, ttl=ttl, cache_none=cache_none, force=force)
+        finally:
+            self._from_shared.expires_at = None
+            if leased:
+                self.backend.release(self.name, key)
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        shared_expiry = getattr(self._from_shared, "expires_at", None)
+        if shared_expiry is not None:
+            # Came from the backend: keep its deadline, no write back
+            self._from_shared.expires_at = None
+            return super().set(key, value, expires_at=shared_expiry)
+        super().set(key, value, ttl=ttl, expires_at=expires_at)
+        seconds = (expires_at - time.time()) if expires_at is not None else (self.ttl if ttl is None else ttl)
+        if seconds and seconds > 0:
+            self.backend.set(self.name, key, value, seconds)
+
+    def __contains__(self, key):
+        if super().__contains__(key):
+            return True
+        found, value = self._shared_lookup(key)
+        if found:
+            self.set(key, value)  # Promoted with the backend's deadline
+        return found
+
+    def invalidate(self, key):
+        self.backend.delete(self.name, key)
+        return super().invalidate(key)
+
+    def invalidate_where(self, predicate, values=False):
+        # Backend first: otherwise the next miss would promote the stale entry straight back
+        self.backend.delete_where(self.name, predicate, values=values)
+        return super().invalidate_where(predicate, values=values)
+
+    def clear(self):
+        self.backend.delete(self.name)
+        super().clear()
+
+    def stats(self):
+        stats = super().stats()
+        stats["shared_hits"] = self.shared_hits
+        return stats
+
+
+def open_backend(spec="memory", default_path="shared_state.db"):
+    """'memory' | 'sqlite' | 'sqlite:/path/to/file.db'"""
+    kind, _, path = (spec or "memory").partition(":")
+    kind = kind.strip().lower()
+    if kind == "sqlite":
+        backend = SQLiteBackend(path or default_path)
+        print(f"[SHARED] Multi-worker state in {backend.path}")
+        if not backend.returning:
+            print(f"[SHARED] SQLite {sqlite3.sqlite_version} < 3.35 (no RETURNING): rate limits and load "
+                  f"leases use BEGIN IMMEDIATE transactions")
+        return backend
+    if kind != "memory":
+        print(f"[SHARED] Unknown SHARED_STATE '{spec}', using in-process state")
+    return InProcessBackend()
+
+
+def shared_cache(backend, maxsize=256, ttl=60, name="cache"):
+    """TTLCache for a single worker, SharedTTLCache when the backend spans processes"""
+    if backend.shared:
+        return SharedTTLCache(backend, maxsize=maxsize, ttl=ttl, name=name)
+    return TTLCache(maxsize=maxsize, ttl=ttl, name=name)
@@ -0,0 +1,100 @@
+"""
+QUANTUM X PRO - Persistent SQLite Connections (Local Fallback Mode)
+One long-lived connection per thread instead of connect/close on every request.
+- WAL journaling: readers never block the writer, the writer never blocks readers
+- Tuned pragmas (synchronous=NORMAL, page cache, mmap, busy timeout)
+- sqlite3's per-connection statement cache turns repeated queries into prepared-statement reuse
+- close() on a managed connection only resets it; the manager owns the real lifetime
+"""
+import os
+import sqlite3
+import threading
+import weakref
+
+DEFAULT_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),   # Durable across app crashes; WAL makes FULL unnecessary
+    ("cache_size", -16000),      # ~16 MB page cache per connection
+    ("mmap_size", 268435456),    # 256 MB memory-mapped reads
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),      # ms to wait on a locked database before failing
+)
+
+
+class ManagedConnection(sqlite3.Connection):
+    """Connection whose close() rolls back and keeps it open for the next user on this thread"""
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def really_close(self):
+        super().close()
+
+
+class SQLiteConnectionManager:
+    def __init__(self, path, pragmas=DEFAULT_PRAGMAS, cached_statements=256, timeout=5.0):
+        self.path = path
+        self.pragmas = pragmas
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = weakref.WeakSet()  # Live connections (dropped with their thread)
+
+        self.opens = 0
+        self.reuses = 0
+
+    def connection(self):
+        """This thread's connection (opened and tuned on first use)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self.reuses += 1
+            return conn
+
+        db_dir = os.path.dirname(self.path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,  # Only close_all() crosses threads
+            factory=ManagedConnection,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas:
+            try:
+                conn.execute(f"PRAGMA {name}={value}")
+            except sqlite3.DatabaseError as e:
+                print(f"[SQLITE] PRAGMA {name} not applied: {e}")
+        self._local.conn = conn
+        with self._lock:
+            self.opens += 1
+            self._all.add(conn)
+        return conn
+
+    def release(self, conn):
+        """End of unit of work: discard uncommitted changes, keep the connection"""
+        try:
+            conn.close()
+        except sqlite3.ProgrammingError:
+            self._local.conn = None
+
+    def close_all(self):
+        with self._lock:
+            for conn in list(self._all):
+                try: conn.really_close()
+                except Exception: pass
+            self._all.clear()
+        self._local = threading.local()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "connections": len(self._all),
+                "opens": self.opens,
+                "reuses": self.reuses,
+                "cached_statements": self.cached_statements,
+            }
@@ -0,0 +1,130 @@
+"""
+QUANTUM X PRO - Coalesced License Usage Counters
+Auth hits no longer UPDATE the hot license row (plus commit) on every request.
+- record() only bumps an in-memory counter and remembers the latest access time / IP
+- A background thread writes everything accumulated as ONE batched UPDATE every `interval`
+  seconds (and once more on shutdown)
+- A failed flush is merged back and retried on the next cycle
+"""
+import datetime
+import threading
+import time
+
+
+class UsageAggregator:
+    def __init__(self, connect, release, queries, statement="add_license_usage", interval=5.0,
+                 name="license-usage"):
+        """
+        `statement` is a named query taking (hits, last_access, ip_address, key_code) per row.
+        `connect()` -> (conn, db_type); `release(conn, db_type)` returns it.
+        """
+        self.connect = connect
+        self.release = release
+        self.queries = queries
+        self.statement = statement
+        self.interval = interval
+        self.name = name
+        self._pending = {}  # key_code -> [hits, last_access, ip_address]
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.last_flush_rows = 0
+        self.last_flush_ms = 0.0
+
+    def record(self, key_code, ip_address=None, hits=1):
+        """Counts one auth hit for the exact stored `key_code` (never touches the database)"""
+        now = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            entry = self._pending.get(key_code)
+            if entry is None:
+                self._pending[key_code] = [hits, now, ip_address]
+            else:
+                entry[0] += hits
+                entry[1] = now
+                if ip_address:
+                    entry[2] = ip_address
+            self.recorded += hits
+
+    def _merge_back(self, batch):
+        with self._lock:
+            for key_code, (hits, last_access, ip_address) in batch.items():
+                entry = self._pending.get(key_code)
+                if entry is None:
+                    self._pending[key_code] = [hits, last_access, ip_address]
+                else:
+                    entry[0] += hits  # Newer access time / IP already in place
+
+    # --- Background flush ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self._thread.start()
+        return self
+
+    def close(self, timeout=5.0):
+        """Stops the worker and writes whatever is still pending (call on shutdown)"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """Writes all pending counters in one transaction; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            started = time.time()
+            rows = [(hits, last_access, ip_address, key_code)
+                    for key_code, (hits, last_access, ip_address) in batch.items()]
+            conn, db_type = self.connect()
+            if not conn:
+                self.failures += 1
+                self._merge_back(batch)
+                print(f"[USAGE] No database connection, {len(rows)} counter(s) kept for the next flush")
+                return 0
+            try:
+                cur = conn.cursor()
+                self.queries.bulk(cur, db_type, self.statement, rows)
+                conn.commit()
+                self.flushes += 1
+                self.rows_written += len(rows)
+                self.last_flush_rows = len(rows)
+                return len(rows)
+            except Exception as e:
+                self.failures += 1
+                print(f"[USAGE] Flush of {len(rows)} counter(s) failed, retrying next cycle: {e}")
+                try: conn.rollback()
+                except: pass
+                self._merge_back(batch)
+                return 0
+            finally:
+                self.release(conn, db_type)
+                self.last_flush_ms = round((time.time() - started) * 1000, 1)
+
+    # --- Diagnostics ---
+    def stats(self):
+        return {
+            "pending_keys": len(self._pending),
+            "interval_s": self.interval,
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+            "last_flush_rows": self.last_flush_rows,
+            "last_flush_ms": self.last_flush_ms,
+        }
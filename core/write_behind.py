@@ -0,0 +1,152 @@
+"""
+QUANTUM X PRO - Batched Write-Behind Queue
+Non-critical inserts (signal tracking, telemetry) leave the request path immediately
+and are flushed in batches by one background thread.
+- Drains up to `max_batch` tasks or `max_delay_ms`, whichever comes first
+- Groups by named statement and writes each group with QueryRegistry.bulk
+  (execute_values on Postgres, executemany on SQLite)
+- One connection checkout and ONE transaction per batch
+- Bounded queue: producers wait at most `put_timeout` then the task is dropped and counted
+"""
+import queue
+import threading
+import time
+
+
+class WriteBehindQueue:
+    def __init__(self, connect, release, queries, max_batch=200, max_delay_ms=250, maxsize=10000,
+                 put_timeout=0.05, name="write-behind"):
+        """`connect()` -> (conn, db_type); `release(conn, db_type)` returns it; `queries` is a QueryRegistry"""
+        self.connect = connect
+        self.release = release
+        self.queries = queries
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.put_timeout = put_timeout
+        self.name = name
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_flush_ms = 0.0
+
+    # --- Producer side ---
+    def submit(self, name, params=()):
+        """Non-blocking (bounded wait) enqueue of a named statement; returns False when the task was dropped"""
+        try:
+            self._queue.put((name, tuple(params)), timeout=self.put_timeout)
+            self.enqueued += 1
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                print(f"[ASYNC-LOG] Queue full ({self._queue.maxsize}), dropped {self.dropped} task(s) so far")
+            return False
+
+    # --- Consumer side ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self._thread.start()
+        return self
+
+    def close(self, timeout=5.0):
+        """Flushes what is queued and stops the worker (call on shutdown)"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _drain(self):
+        """Blocks for the first task, then collects until the batch is full or the window closes"""
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.time()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._drain()
+            if batch:
+                try:
+                    self._flush(batch)
+                except Exception as e:
+                    self.failed += len(batch)
+                    print(f"[ASYNC-LOG] Error: {e}")
+                for _ in batch:
+                    self._queue.task_done()
+            elif self._stop.is_set():
+                break
+
+    def _flush(self, batch):
+        started = time.time()
+        groups = {}
+        for name, params in batch:
+            groups.setdefault(name, []).append(params)
+
+        conn, db_type = self.connect()
+        if not conn:
+            self.failed += len(batch)
+            print(f"[ASYNC-LOG] No database connection, {len(batch)} task(s) lost")
+            return
+        try:
+            cur = conn.cursor()
+            for name, rows in groups.items():
+                self.queries.bulk(cur, db_type, name, rows, page_size=self.max_batch)
+            conn.commit()
+            self.written += len(batch)
+        except Exception as e:
+            print(f"[ASYNC-LOG] Batch of {len(batch)} failed ({e}), retrying row by row")
+            try: conn.rollback()
+            except: pass
+            self._flush_rows(conn, db_type, batch)
+        finally:
+            self.release(conn, db_type)
+            self.batches += 1
+            self.last_batch_size = len(batch)
+            self.last_flush_ms = round((time.time() - started) * 1000, 1)
+
+    def _flush_rows(self, conn, db_type, batch):
+        """Slow path after a failed batch: isolate the bad rows instead of losing all of them"""
+        for name, params in batch:
+            try:
+                self.queries.execute(conn.cursor(), db_type, name, params)
+                conn.commit()
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"[ASYNC-LOG] Error: {e}")
+                try: conn.rollback()
+                except: pass
+
+    # --- Diagnostics ---
+    def qsize(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "maxsize": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "last_flush_ms": self.last_flush_ms,
+        }
@@ -0,0 +1,18 @@
+-- QUANTUM X PRO - DEVICE AUTO-LOGIN INDEX
+-- check_device_sync resolves a device to its license with
+--   WHERE device_id = %s AND status = 'ACTIVE' ORDER BY last_access_date DESC LIMIT 1
+-- This composite index answers it with a single index probe (no sort).
+-- (init_db creates the same index on startup, for Postgres and local SQLite.)
+
+-- NOTE: CONCURRENTLY cannot run inside a transaction block; run this file with autocommit.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_licenses_device_status_access
+    ON licenses (device_id, status, last_access_date);
+
+ANALYZE licenses;
+
+-- Verify (should show "Index Scan Backward using idx_licenses_device_status_access")
+EXPLAIN SELECT key_code FROM licenses
+WHERE device_id = 'example-device' AND status = 'ACTIVE'
+ORDER BY last_access_date DESC LIMIT 1;
+
+SELECT '✅ Device auto-login index ready!' as status;
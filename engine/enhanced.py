@@ -10,68 +10,56 @@ import datetime
 import random
 import math
 import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from brokers.candles import column
+from core.cache import TTLCache
+from engine.indicator_state import IndicatorState, candle_ts
+
+# Indicator profiles per market class: (rsi, macd fast, macd slow, macd signal, volatility window)
+OTC_PROFILE = {"rsi_period": 7, "fast": 5, "slow": 13, "signal": 4, "window": 20}
+REAL_PROFILE = {"rsi_period": 14, "fast": 12, "slow": 26, "signal": 9, "window": 20}
+MAX_INDICATOR_STATES = 512  # Bounded: one state per (market, timeframe)
+MAX_MEMO_SIGNALS = 4096     # (market, timeframe, candle, entry minute) results kept until the next close
+
+def is_otc_market(market):
+    return "(OTC)" in market.upper() or "_otc" in market.lower()
 
 class EnhancedEngine:
-    def __init__(self):
+    def __init__(self, signal_memo=None):
         self.signal_history = []
         self.win_tracker = {}  # Track wins/losses per market 
-        
-    def calculate_rsi(self, prices, period=14):
-        """Enhanced RSI with Wilder's smoothing"""
-        if len(prices) < period + 1:
-            return 50
-            
-        gains = []
-        losses = []
-        
-        for i in range(1, len(prices)):
-            change = prices[i] - prices[i-1]
-            if change > 0:
-                gains.append(change)
-                losses.append(0)
+        self.indicator_states = OrderedDict()  # (market, timeframe) -> IndicatorState
+        self._state_lock = threading.Lock()
+        # Any TTLCache-compatible cache; app.py passes a shared one when workers share state
+        self.signal_memo = signal_memo if signal_memo is not None else TTLCache(maxsize=MAX_MEMO_SIGNALS, name="signals")
+
+    def get_indicators(self, candles, market, timeframe=None, profile=OTC_PROFILE):
+        """
+        Streaming indicators for (market, timeframe).
+        Only the newly closed candles are folded in; a gap in history forces a rebuild.
+        """
+        key = (market, timeframe)
+        with self._state_lock:
+            state = self.indicator_states.get(key)
+            if state is None or state.profile != profile:
+                state = IndicatorState(**profile)
+                self.indicator_states[key] = state
+                if len(self.indicator_states) > MAX_INDICATOR_STATES:
+                    self.indicator_states.popitem(last=False)
             else:
-                gains.append(0)
-                losses.append(abs(change))
-        
-        # Initial averages
-        avg_gain = sum(gains[:period]) / period
-        avg_loss = sum(losses[:period]) / period
-        
-        # Smoothed averages
-        for i in range(period, len(gains)):
-            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-            
-        if avg_loss == 0:
-            return 100
-            
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
-    
-    def calculate_macd(self, prices, fast=12, slow=26, signal=9):
-        """Calculate MACD (Moving Average Convergence Divergence)"""
-        if len(prices) < slow:
-            return None, None, None
-            
-        def ema(data, period):
-            multiplier = 2 / (period + 1)
-            ema_val = sum(data[:period]) / period
-            for price in data[period:]:
-                ema_val = (price * multiplier) + (ema_val * (1 - multiplier))
-            return ema_val
-        
-        # Calculate EMA series
-        fast_emas = []
-        slow_emas = []
-        
-        # Simplified for speed
-        fast_ema = ema(prices, fast)
-        slow_ema = ema(prices, slow)
-        macd_line = fast_ema - slow_ema
+                self.indicator_states.move_to_end(key)
+            return state.sync(candles).snapshot()
+
+    def warm(self, market, timeframe, candles):
+        """Folds freshly prefetched candles into the indicator state so the next analyze() is a pure read"""
+        otc = is_otc_market(market)
+        if not candles or len(candles) < (20 if otc else 30):
+            return None
+        return self.get_indicators(candles, market, timeframe, OTC_PROFILE if otc else REAL_PROFILE)
         
-        return macd_line, macd_line * 0.9, macd_line * 0.1 # Simplified histogram
-    
     def analyze_candle_patterns(self, candles):
         """Detects high-probability price action patterns"""
         if not candles or len(candles) < 3:
@@ -114,23 +102,22 @@ class EnhancedEngine:
             
         return "NEUTRAL", 0
 
-    def analyze_otc_pattern(self, candles, market, target_time_minute=None):
+    def analyze_otc_pattern(self, candles, market, target_time_minute=None, timeframe=None):
         """
         Specialized Pro-OTC analysis (Accuracy Optimized for 90%+)
         """
         if not candles or len(candles) < 20:
             return None, 0
             
-        closes = [c['close'] for c in candles]
+        ind = self.get_indicators(candles, market, timeframe, OTC_PROFILE)
         
         # 1. Faster High-Precision Indicators
-        rsi = self.calculate_rsi(closes, 7)
-        macd, signal, hist = self.calculate_macd(closes, 5, 13, 4)
+        rsi = ind["rsi"]
+        macd, signal = ind["macd"], ind["signal"]
         
-        # 2. Volatility Analysis
-        sma_20 = sum(closes[-20:]) / 20
-        variance = sum((p - sma_20)**2 for p in closes[-20:]) / 20
-        volatility = math.sqrt(variance)
+        # 2. Volatility Analysis (rolling 20-candle window)
+        sma_20 = ind["mean"]
+        volatility = math.sqrt(ind["variance"])
         
         # 3. Candle analysis
         pattern_dir, pattern_score = self.analyze_candle_patterns(candles)
@@ -145,7 +132,7 @@ class EnhancedEngine:
         elif rsi < 30: weights["CALL"] += 25
         
         # MACD Crossover Confluence
-        if macd is not None and signal is not None: # Check for None from calculate_macd
+        if macd is not None and signal is not None: # None during the MACD warm-up
             if macd > signal: weights["CALL"] += 20
             else: weights["PUT"] += 20
             
@@ -170,19 +157,20 @@ class EnhancedEngine:
             
         return direction, int(confidence)
 
-    def analyze_real_market(self, candles, market, target_time_minute=None):
+    def analyze_real_market(self, candles, market, target_time_minute=None, timeframe=None):
         """
         Advanced Multi-Indicator Strategy for Real Markets (Pro v10.0)
         """
         if not candles or len(candles) < 30:
             return None, 0
             
-        closes = [c['close'] for c in candles]
-        rsi = self.calculate_rsi(closes, 14)
+        ind = self.get_indicators(candles, market, timeframe, REAL_PROFILE)
+        closes = column(candles[-30:], 'close')
+        rsi = ind["rsi"]
         
         # Trend Confluence
         sma_10 = sum(closes[-10:]) / 10
-        sma_20 = sum(closes[-20:]) / 20
+        sma_20 = ind["mean"]
         sma_50 = sum(closes[-30:]) / 30 # Simplified
         
         pattern_dir, pattern_score = self.analyze_candle_patterns(candles)
@@ -205,8 +193,37 @@ class EnhancedEngine:
     def analyze(self, broker, market, timeframe, candles=None, entry_time=None):
         """
         Public Gateway for Enhanced Analysis v10.0 (Institutional Precision)
+        The decision is memoized per (market, timeframe, last candle, entry_time) until the next candle close,
+        so every user asking for the same signal in the same minute shares one computation.
         """
-        is_otc = "(OTC)" in market.upper() or "_otc" in market.lower()
+        last = candles[-1] if candles else None
+        memo_key = (market, timeframe, candle_ts(last) if last else None, last["close"] if last else None, entry_time)
+        tf_seconds = max(1, int(timeframe or 1)) * 60
+        direction, confidence, strategy = self.signal_memo.get_or_load(
+            memo_key,
+            lambda: self._decide(market, timeframe, candles, entry_time),
+            ttl=lambda _: (int(time.time() // tf_seconds) + 1) * tf_seconds - time.time(),
+        )
+            
+        # Target 90+ Confidence for Premium UX
+        confidence = max(91, min(99, confidence + random.randint(0, 1)))
+
+        # Tracking for logs (Capped to 100 items for memory safety)
+        self.signal_history.append({
+            "time": datetime.datetime.now(),
+            "market": market,
+            "direction": direction,
+            "confidence": confidence,
+            "strategy": strategy
+        })
+        if len(self.signal_history) > 100:
+            self.signal_history = self.signal_history[-100:]
+        
+        return direction, confidence, strategy
+
+    def _decide(self, market, timeframe, candles, entry_time):
+        """Deterministic part of analyze() -> (direction, base confidence, strategy)"""
+        is_otc = is_otc_market(market)
         
         # Extract minute for global sync
         target_min = None
@@ -217,9 +234,9 @@ class EnhancedEngine:
                 pass
 
         if is_otc:
-            direction, confidence = self.analyze_otc_pattern(candles, market, target_time_minute=target_min)
+            direction, confidence = self.analyze_otc_pattern(candles, market, target_time_minute=target_min, timeframe=timeframe)
         else:
-            direction, confidence = self.analyze_real_market(candles, market, target_time_minute=target_min)
+            direction, confidence = self.analyze_real_market(candles, market, target_time_minute=target_min, timeframe=timeframe)
             
         if direction is None:
             # Final Safety Fallback (Should rarely hit)
@@ -227,21 +244,6 @@ class EnhancedEngine:
             strategy = "INSTITUTIONAL_CORE"
         else:
             strategy = "ALPHA_PRO_V10_" + ("OTC" if is_otc else "REAL")
-            
-        # Target 90+ Confidence for Premium UX
-        confidence = max(91, min(99, confidence + random.randint(0, 1)))
-
-        # Tracking for logs (Capped to 100 items for memory safety)
-        self.signal_history.append({
-            "time": datetime.datetime.now(),
-            "market": market,
-            "direction": direction,
-            "confidence": confidence,
-            "strategy": strategy
-        })
-        if len(self.signal_history) > 100:
-            self.signal_history = self.signal_history[-100:]
-        
         return direction, confidence, strategy
 
     def _consensus_fallback(self, market, entry_time):
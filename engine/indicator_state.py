@@ -0,0 +1,225 @@
+"""
+Streaming Indicator State (Pro Edition)
+- Wilder RSI, MACD (fast/slow/signal EMA) and rolling mean/variance
+- O(1) update per newly closed candle
+- The last candle of a feed is usually still forming: it is overlaid on the readings, never folded
+- Full rebuild only when the incoming history no longer lines up (gap, reorder, repaint)
+"""
+import copy
+from collections import deque
+
+# How many fresh candles we are willing to step through before a rebuild is cheaper
+MAX_INCREMENTAL_STEP = 5
+# Re-center the rolling sums every N pushes so long-lived streams do not drift
+REANCHOR_EVERY = 1000
+
+
+def candle_ts(candle):
+    """Candle open-time regardless of adapter flavour ('ts' or MrBeast 'time')"""
+    ts = candle.get("ts")
+    if ts is None:
+        ts = candle.get("time")
+    return ts
+
+
+class IndicatorState:
+    """
+    Incremental indicator state for a single (market, timeframe) stream.
+    Feed it the same candle list the engine receives; it works out what is new.
+    """
+    def __init__(self, rsi_period=14, fast=12, slow=26, signal=9, window=20):
+        self.rsi_period = rsi_period
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.window = window
+        self.rebuilds = 0
+        self.increments = 0
+        self.forming_close = None  # Close of the last (possibly forming) candle, overlaid by snapshot()
+        self.reset()
+
+    @property
+    def profile(self):
+        return {"rsi_period": self.rsi_period, "fast": self.fast, "slow": self.slow,
+                "signal": self.signal, "window": self.window}
+
+    def reset(self):
+        self.count = 0
+        self.last_ts = None
+        self.last_close = None
+
+        # Wilder RSI
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+        self.avg_gain = None
+        self.avg_loss = None
+
+        # EMA fast / slow, seeded with the SMA of the first `period` closes
+        self._fast_sum = 0.0
+        self._slow_sum = 0.0
+        self.ema_fast = None
+        self.ema_slow = None
+
+        # MACD signal line (EMA of the MACD line)
+        self._macd_count = 0
+        self._macd_sum = 0.0
+        self.macd_signal = None
+
+        # Rolling window, sums kept relative to an anchor to avoid cancellation
+        self._closes = deque(maxlen=self.window)
+        self._anchor = None
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def push(self, close, ts=None):
+        """Consume one closed candle. O(1)."""
+        close = float(close)
+        prev = self.last_close
+        self.count += 1
+        n = self.count
+
+        # 1. RSI (needs `rsi_period` price changes before the first value)
+        if prev is not None:
+            change = close - prev
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            p = self.rsi_period
+            if self.avg_gain is None:
+                self._gain_sum += gain
+                self._loss_sum += loss
+                if n - 1 == p:
+                    self.avg_gain = self._gain_sum / p
+                    self.avg_loss = self._loss_sum / p
+            else:
+                self.avg_gain = (self.avg_gain * (p - 1) + gain) / p
+                self.avg_loss = (self.avg_loss * (p - 1) + loss) / p
+
+        # 2. EMAs
+        self.ema_fast, self._fast_sum = self._ema_step(self.ema_fast, self._fast_sum, close, self.fast, n)
+        self.ema_slow, self._slow_sum = self._ema_step(self.ema_slow, self._slow_sum, close, self.slow, n)
+
+        # 3. Signal line over the MACD series
+        if self.ema_fast is not None and self.ema_slow is not None:
+            self._macd_count += 1
+            self.macd_signal, self._macd_sum = self._ema_step(
+                self.macd_signal, self._macd_sum, self.ema_fast - self.ema_slow, self.signal, self._macd_count
+            )
+
+        # 4. Rolling mean / variance
+        if self._anchor is None:
+            self._anchor = close
+        if len(self._closes) == self.window:
+            old = self._closes[0] - self._anchor
+            self._sum -= old
+            self._sumsq -= old * old
+        self._closes.append(close)
+        dev = close - self._anchor
+        self._sum += dev
+        self._sumsq += dev * dev
+        if n % REANCHOR_EVERY == 0:
+            self._reanchor()
+
+        self.last_close = close
+        self.last_ts = ts
+
+    def _reanchor(self):
+        """Re-center the running sums on the current window (amortized, keeps precision on long streams)"""
+        self._anchor = self._closes[-1]
+        self._sum = sum(c - self._anchor for c in self._closes)
+        self._sumsq = sum((c - self._anchor) ** 2 for c in self._closes)
+
+    @staticmethod
+    def _ema_step(ema, seed_sum, value, period, n):
+        if ema is not None:
+            multiplier = 2 / (period + 1)
+            return (value * multiplier) + (ema * (1 - multiplier)), seed_sum
+        seed_sum += value
+        if n == period:
+            return seed_sum / period, seed_sum
+        return None, seed_sum
+
+    def rebuild(self, candles):
+        self.reset()
+        self.rebuilds += 1
+        for c in candles:
+            self.push(c["close"], candle_ts(c))
+
+    def sync(self, candles):
+        """
+        Align the state with `candles` (oldest -> newest).
+        Everything but the last candle is folded in: steps forward when the list simply grew
+        by a few candles, rebuilds when the history gapped or the candle we stopped on repainted.
+        The last candle (still forming on REST feeds, so its close moves on every call) is only
+        remembered for the snapshot() overlay.
+        """
+        n = len(candles)
+        self.forming_close = float(candles[n - 1]["close"]) if n else None
+        closed = n - 1
+        if closed <= 0:
+            self.reset()
+            return self
+
+        if self.last_ts is not None:
+            for back in range(min(closed, MAX_INCREMENTAL_STEP + 1)):
+                c = candles[closed - 1 - back]
+                if candle_ts(c) != self.last_ts:
+                    continue
+                if float(c["close"]) == self.last_close:
+                    for i in range(closed - back, closed):
+                        self.push(candles[i]["close"], candle_ts(candles[i]))
+                    if back:
+                        self.increments += 1
+                    return self
+                break
+
+        self.rebuild(candles[:closed])
+        return self
+
+    # --- Readers ---
+    def rsi(self):
+        if self.avg_gain is None:
+            return 50
+        if self.avg_loss == 0:
+            return 100
+        rs = self.avg_gain / self.avg_loss
+        return 100 - (100 / (1 + rs))
+
+    def macd(self):
+        if self.ema_fast is None or self.ema_slow is None:
+            return None, None, None
+        macd_line = self.ema_fast - self.ema_slow
+        if self.macd_signal is None:
+            return macd_line, None, None
+        return macd_line, self.macd_signal, macd_line - self.macd_signal
+
+    def mean(self):
+        if not self._closes:
+            return 0
+        return self._anchor + self._sum / len(self._closes)
+
+    def variance(self):
+        size = len(self._closes)
+        if not size:
+            return 0
+        m = self._sum / size
+        return max(0.0, self._sumsq / size - m * m)
+
+    def _with_forming(self):
+        """Copy with the forming candle pushed (O(window)); the folded state stays untouched"""
+        state = copy.copy(self)
+        state._closes = deque(self._closes, maxlen=self.window)
+        state.push(self.forming_close)
+        return state
+
+    def snapshot(self):
+        """Readings over the folded candles plus the forming one"""
+        state = self._with_forming() if self.forming_close is not None else self
+        macd, signal, hist = state.macd()
+        return {
+            "rsi": state.rsi(),
+            "macd": macd,
+            "signal": signal,
+            "hist": hist,
+            "mean": state.mean(),
+            "variance": state.variance(),
+        }
@@ -0,0 +1,295 @@
+"""
+Indicator Kernels v1.0 (Shared by all engines)
+- RSI (Wilder / simple / last up- and down-moves), EMA, MACD with a real signal line, SMA, ATR, rolling std, Bollinger Bands
+- Inputs are coerced to contiguous float64 arrays, time runs along the last axis
+- 2-D input (markets x candles) is processed in one vectorized pass
+- Warm-up positions are NaN; use last() to read the latest value with a default
+- Pure-Python fallback when NumPy is not installed
+"""
+import math
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+NAN = float("nan")
+
+
+# --- Array helpers ---
+def as_array(values):
+    """Contiguous float64 array (or list of floats / list of rows without NumPy)"""
+    if NUMPY_AVAILABLE:
+        return np.ascontiguousarray(values, dtype=np.float64)
+    if _is_2d(values):
+        return [[float(v) for v in row] for row in values]
+    return [float(v) for v in values]
+
+
+def _is_2d(x):
+    if NUMPY_AVAILABLE and isinstance(x, np.ndarray):
+        return x.ndim == 2
+    return len(x) > 0 and isinstance(x[0], (list, tuple))
+
+
+def _rowwise(x, fn, *args):
+    """Apply a 1-D list kernel to every row (fallback path)"""
+    if _is_2d(x):
+        return [fn(list(row), *args) for row in x]
+    return fn(list(x), *args)
+
+
+def last(values, default=None):
+    """Latest finite value of a 1-D series, or `default`"""
+    if values is None or len(values) == 0:
+        return default
+    val = float(values[-1])
+    return default if math.isnan(val) else val
+
+
+# --- Recursive smoothing (EMA / Wilder) ---
+def _smooth_list(xs, period, alpha):
+    """SMA-seeded exponential smoothing over a list; leading NaNs are skipped"""
+    n = len(xs)
+    out = [NAN] * n
+    start = 0
+    while start < n and math.isnan(xs[start]):
+        start += 1
+    if period <= 0 or n - start < period:
+        return out
+    val = sum(xs[start:start + period]) / period
+    out[start + period - 1] = val
+    keep = 1 - alpha
+    for i in range(start + period, n):
+        val = xs[i] * alpha + val * keep
+        out[i] = val
+    return out
+
+
+def _smooth_2d(x, period, alpha):
+    """Same recursion, vectorized across rows: one Python step per candle for ALL markets"""
+    rows, n = x.shape
+    out = np.full((rows, n), np.nan)
+    finite = np.isfinite(x).any(axis=0)
+    if not finite.any():
+        return out
+    start = int(np.argmax(finite))
+    if period <= 0 or n - start < period:
+        return out
+    val = x[:, start:start + period].mean(axis=1)
+    out[:, start + period - 1] = val
+    keep = 1 - alpha
+    for i in range(start + period, n):
+        val = x[:, i] * alpha + val * keep
+        out[:, i] = val
+    return out
+
+
+def _smooth(x, period, alpha):
+    if not NUMPY_AVAILABLE:
+        return _rowwise(x, _smooth_list, period, alpha)
+    if x.ndim == 2:
+        return _smooth_2d(x, period, alpha)
+    return np.asarray(_smooth_list(x.tolist(), period, alpha))
+
+
+def ema(values, period):
+    """Exponential moving average seeded with the SMA of the first `period` values"""
+    return _smooth(as_array(values), period, 2 / (period + 1))
+
+
+def wilder(values, period):
+    """Wilder's smoothing (RMA), used by RSI and ATR"""
+    return _smooth(as_array(values), period, 1 / period)
+
+
+# --- Rolling window kernels ---
+def _rolling_list(xs, period, fn):
+    n = len(xs)
+    out = [NAN] * n
+    for i in range(period - 1, n):
+        out[i] = fn(xs[i - period + 1:i + 1])
+    return out
+
+
+def _mean(w):
+    return sum(w) / len(w)
+
+
+def _pstd(w):
+    m = sum(w) / len(w)
+    return math.sqrt(sum((v - m) ** 2 for v in w) / len(w))
+
+
+def _rolling(x, period, kind="mean"):
+    if not NUMPY_AVAILABLE:
+        return _rowwise(x, _rolling_list, period, _pstd if kind == "std" else _mean)
+    out = np.full(x.shape, np.nan)
+    if period <= 0 or x.shape[-1] < period:
+        return out
+    windows = sliding_window_view(x, period, axis=-1)  # zero-copy view
+    out[..., period - 1:] = windows.std(axis=-1) if kind == "std" else windows.mean(axis=-1)
+    return out
+
+
+def sma(values, period):
+    """Simple moving average"""
+    return _rolling(as_array(values), period)
+
+
+def rolling_std(values, period):
+    """Population standard deviation over a rolling window"""
+    return _rolling(as_array(values), period, "std")
+
+
+def bollinger(values, period=20, k=2.0):
+    """Bollinger Bands -> (middle, upper, lower)"""
+    x = as_array(values)
+    mid = sma(x, period)
+    std = rolling_std(x, period)
+    if NUMPY_AVAILABLE:
+        return mid, mid + k * std, mid - k * std
+    return mid, _rowwise2(mid, std, lambda m, s: m + k * s), _rowwise2(mid, std, lambda m, s: m - k * s)
+
+
+def _rowwise2(a, b, op):
+    """Element-wise op on two same-shaped list series (fallback path)"""
+    if _is_2d(a):
+        return [[op(x, y) for x, y in zip(ra, rb)] for ra, rb in zip(a, b)]
+    return [op(x, y) for x, y in zip(a, b)]
+
+
+def _sub(a, b):
+    if NUMPY_AVAILABLE:
+        return a - b
+    return _rowwise2(a, b, lambda x, y: x - y)
+
+
+# --- Oscillators ---
+def _changes(x):
+    """Gains / losses aligned to the price index (position 0 is NaN)"""
+    if not NUMPY_AVAILABLE:
+        def split(row):
+            gains, losses = [NAN], [NAN]
+            for i in range(1, len(row)):
+                d = row[i] - row[i - 1]
+                gains.append(d if d > 0 else 0.0)
+                losses.append(-d if d < 0 else 0.0)
+            return gains, losses
+        if _is_2d(x):
+            pairs = [split(list(row)) for row in x]
+            return [p[0] for p in pairs], [p[1] for p in pairs]
+        return split(list(x))
+    delta = np.full(x.shape, np.nan)
+    delta[..., 1:] = np.diff(x, axis=-1)
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    gains[..., 0] = np.nan
+    losses[..., 0] = np.nan
+    return gains, losses
+
+
+def rsi(values, period=14, method="wilder"):
+    """
+    Relative Strength Index.
+    method='wilder' -> Wilder smoothing (classic)
+    method='sma'    -> simple mean of the last `period` gains/losses (Cutler)
+    """
+    x = as_array(values)
+    gains, losses = _changes(x)
+    if method == "sma":
+        avg_gain = _rolling(gains, period)
+        avg_loss = _rolling(losses, period)
+    else:
+        avg_gain = _smooth(gains, period, 1 / period)
+        avg_loss = _smooth(losses, period, 1 / period)
+
+    if NUMPY_AVAILABLE:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = 100 - (100 / (1 + avg_gain / avg_loss))
+        out = np.where((avg_loss == 0) & np.isfinite(avg_gain), 100.0, out)
+        return out
+
+    def _rsi(g, l):
+        if math.isnan(g) or math.isnan(l):
+            return NAN
+        if l == 0:
+            return 100.0
+        return 100 - (100 / (1 + g / l))
+    return _rowwise2(avg_gain, avg_loss, _rsi)
+
+
+def rsi_last_moves(values, period=14):
+    """
+    Latest RSI from the last `period` up-moves and the last `period` down-moves of the whole
+    series, each summed and divided by `period` (flat candles are skipped, the two windows
+    may end at different candles). Returns a float, or one value per row for 2-D input;
+    100 when there is no down-move, NaN for an empty series.
+    """
+    x = as_array(values)
+    if not NUMPY_AVAILABLE:
+        def _row(row):
+            if not row:
+                return NAN
+            deltas = [row[i] - row[i - 1] for i in range(1, len(row))]
+            avg_gain = sum([d for d in deltas if d > 0][-period:]) / period
+            avg_loss = sum([-d for d in deltas if d < 0][-period:]) / period
+            return 100.0 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss))
+        return _rowwise(x, _row)
+
+    if x.shape[-1] == 0:
+        return np.full(x.shape[:-1], np.nan) if x.ndim == 2 else NAN
+    delta = np.diff(x, axis=-1)
+
+    def _avg(mask, moves):
+        # Rank each move from the end of the series so only the last `period` are kept
+        rank = np.cumsum(mask[..., ::-1], axis=-1)[..., ::-1]
+        return np.where(mask & (rank <= period), moves, 0.0).sum(axis=-1) / period
+
+    avg_gain = _avg(delta > 0, delta)
+    avg_loss = _avg(delta < 0, -delta)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + avg_gain / avg_loss)))
+    return out if x.ndim == 2 else float(out)
+
+
+def macd(values, fast=12, slow=26, signal=9):
+    """MACD -> (macd_line, signal_line, histogram)"""
+    x = as_array(values)
+    line = _sub(ema(x, fast), ema(x, slow))
+    sig = _smooth(line, signal, 2 / (signal + 1))
+    return line, sig, _sub(line, sig)
+
+
+def true_range(high, low, close):
+    """True range; position 0 is NaN (no previous close)"""
+    h, l, c = as_array(high), as_array(low), as_array(close)
+    if not NUMPY_AVAILABLE:
+        def tr(hr, lr, cr):
+            out = [NAN]
+            for i in range(1, len(cr)):
+                out.append(max(hr[i] - lr[i], abs(hr[i] - cr[i - 1]), abs(lr[i] - cr[i - 1])))
+            return out
+        if _is_2d(c):
+            return [tr(*rows) for rows in zip(h, l, c)]
+        return tr(h, l, c)
+    out = np.full(c.shape, np.nan)
+    prev = c[..., :-1]
+    out[..., 1:] = np.maximum.reduce([
+        h[..., 1:] - l[..., 1:],
+        np.abs(h[..., 1:] - prev),
+        np.abs(l[..., 1:] - prev),
+    ])
+    return out
+
+
+def atr(high, low, close, period=14, method="wilder"):
+    """Average True Range (method='wilder' or 'sma')"""
+    tr = true_range(high, low, close)
+    if method == "sma":
+        return _rolling(tr, period)
+    return _smooth(tr, period, 1 / period)
+
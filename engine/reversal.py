@@ -1,6 +1,9 @@
 import datetime
 import random
 
+from brokers.candles import column
+from engine import indicators
+
 class ReversalEngine:
     """
     Advanced Reversal Detection Engine
@@ -10,31 +13,8 @@ class ReversalEngine:
         self.signal_history = []  # Track for accuracy calculation
         
     def calculate_rsi(self, prices, period=14):
-        """Calculate Relative Strength Index"""
-        if len(prices) < period:
-            return 50  # Neutral
-            
-        gains = []
-        losses = []
-        
-        for i in range(1, len(prices)):
-            change = prices[i] - prices[i-1]
-            if change > 0:
-                gains.append(change)
-                losses.append(0)
-            else:
-                gains.append(0)
-                losses.append(abs(change))
-        
-        avg_gain = sum(gains[-period:]) / period
-        avg_loss = sum(losses[-period:]) / period
-        
-        if avg_loss == 0:
-            return 100
-            
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+        """Calculate Relative Strength Index (simple average of the last `period` moves)"""
+        return indicators.last(indicators.rsi(prices, period, method="sma"), 50)
     
     def analyze(self, market, timeframe, real_data_signal=None, real_candles=None):
         """
@@ -43,7 +23,7 @@ class ReversalEngine:
         
         # 1. REAL DATA PATH (If connected to broker)
         if real_candles and len(real_candles) > 0:
-            prices = [c['close'] for c in real_candles]
+            prices = column(real_candles, 'close')
             rsi = self.calculate_rsi(prices)
             
             # RSI Strategy
@@ -0,0 +1,37 @@
+-- QUANTUM X PRO - EXPIRY DATE NORMALIZATION
+-- The API parses expiry_date once per license load into an epoch; it expects a real TIMESTAMP (UTC).
+-- Older installs created the column as TEXT (or TIMESTAMPTZ). This converts it in place.
+-- init_db performs the same check on startup; run this manually to migrate ahead of a deploy.
+
+-- Offset-less text values are UTC
+SET TIME ZONE 'UTC';
+
+DO $$
+DECLARE
+    current_type TEXT;
+BEGIN
+    SELECT data_type INTO current_type
+    FROM information_schema.columns
+    WHERE table_name='licenses' AND column_name='expiry_date';
+
+    IF current_type IS NULL THEN
+        ALTER TABLE licenses ADD COLUMN expiry_date TIMESTAMP;
+        RAISE NOTICE 'Added expiry_date column to licenses';
+    ELSIF current_type = 'timestamp with time zone' THEN
+        ALTER TABLE licenses ALTER COLUMN expiry_date TYPE TIMESTAMP
+            USING expiry_date AT TIME ZONE 'UTC';
+        RAISE NOTICE 'Converted expiry_date from TIMESTAMPTZ to TIMESTAMP (UTC)';
+    ELSIF current_type <> 'timestamp without time zone' THEN
+        ALTER TABLE licenses ALTER COLUMN expiry_date TYPE TIMESTAMP
+            USING NULLIF(NULLIF(TRIM(expiry_date::text), ''), 'None')::timestamptz AT TIME ZONE 'UTC';
+        RAISE NOTICE 'Converted expiry_date from % to TIMESTAMP', current_type;
+    ELSE
+        RAISE NOTICE 'expiry_date is already TIMESTAMP';
+    END IF;
+END $$;
+
+-- Verify: no expiry should be unreadable
+SELECT COUNT(*) AS licenses_with_expiry, MIN(expiry_date) AS earliest, MAX(expiry_date) AS latest
+FROM licenses WHERE expiry_date IS NOT NULL;
+
+SELECT '✅ expiry_date normalized!' as status;
@@ -0,0 +1,17 @@
+-- QUANTUM X PRO - LICENSE KEY LOOKUP INDEX
+-- validate_license / verify_access / admin tools look keys up with WHERE UPPER(key_code) = %s.
+-- The key_code primary key cannot serve that predicate, so every lookup was a sequential scan.
+-- This expression index matches the predicate exactly; no query or data changes are needed.
+-- (Local SQLite databases get the same index automatically from init_db.)
+
+-- Step 1: Build the index without blocking logins on a live database
+-- NOTE: CONCURRENTLY cannot run inside a transaction block; run this file with autocommit.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_licenses_key_upper ON licenses (UPPER(key_code));
+
+-- Step 2: Refresh planner statistics for the new expression
+ANALYZE licenses;
+
+-- Step 3: Verify (should show "Index Scan using idx_licenses_key_upper")
+EXPLAIN SELECT status, device_id, expiry_date, category FROM licenses WHERE UPPER(key_code) = 'QX-FREE-MODE-2026';
+
+SELECT '✅ License key lookup index ready!' as status;
@@ -0,0 +1,31 @@
+-- QUANTUM X PRO - LICENSE REPLICA WATERMARK
+-- Each API instance keeps a local copy of the licenses table and pulls changes with
+--   SELECT ... FROM licenses WHERE last_modified > <watermark>
+-- This adds the column, keeps it current with a trigger and indexes it.
+-- (init_db applies the same changes on startup.)
+
+-- Step 1: Watermark column (existing rows get the migration time, so the first pull is a full copy anyway)
+ALTER TABLE licenses ADD COLUMN IF NOT EXISTS last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+UPDATE licenses SET last_modified = CURRENT_TIMESTAMP WHERE last_modified IS NULL;
+
+-- Step 2: Bump it whenever an auth field changes (admin tools, activation, resets)
+-- Usage counters (usage_count, last_access_date, ip_address) do NOT bump it, so hot keys do not re-replicate
+CREATE OR REPLACE FUNCTION licenses_touch_last_modified() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR (NEW.key_code, NEW.category, NEW.status, NEW.device_id, NEW.expiry_date, NEW.activation_date)
+        IS DISTINCT FROM (OLD.key_code, OLD.category, OLD.status, OLD.device_id, OLD.expiry_date, OLD.activation_date) THEN
+        NEW.last_modified := clock_timestamp();
+    END IF;
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_licenses_last_modified ON licenses;
+CREATE TRIGGER trg_licenses_last_modified BEFORE INSERT OR UPDATE ON licenses
+FOR EACH ROW EXECUTE PROCEDURE licenses_touch_last_modified();
+
+-- Step 3: Index for the incremental pull
+CREATE INDEX IF NOT EXISTS idx_licenses_last_modified ON licenses (last_modified);
+
+-- NOTE: A deleted license row leaves the local replicas on their next full pull (LICENSE_REPLICA_FULL_SECS);
+--       block keys (status = 'BLOCKED') for an immediate effect.
+SELECT '✅ License replica watermark ready!' as status;
@@ -6,6 +6,9 @@ Strategy: Strict Trend + RSI Extremes + Momentum Confirmation
 import statistics
 from typing import Dict, List, Optional, Tuple
 
+from brokers.candles import column
+from engine import indicators
+
 class QuantumSignalEngine:
     def __init__(self):
         self.min_candles = 50
@@ -14,28 +17,11 @@ class QuantumSignalEngine:
     
     def calculate_ema(self, prices: List[float], period: int) -> float:
         if len(prices) < period: return statistics.mean(prices)
-        multiplier = 2 / (period + 1)
-        ema = statistics.mean(prices[:period])
-        for price in prices[period:]:
-            ema = (price - ema) * multiplier + ema
-        return ema
+        return indicators.last(indicators.ema(prices, period))
     
     def calculate_rsi(self, candles: List[Dict], period: int = 14) -> float:
-        if len(candles) < period + 1: return 50
-        closes = [c['close'] for c in candles]
-        gains, losses = [], []
-        for i in range(1, len(closes)):
-            change = closes[i] - closes[i-1]
-            if change > 0: gains.append(change); losses.append(0)
-            else: gains.append(0); losses.append(abs(change))
-            
-        # Use simple avg for speed/stability in this snippet or similar logic
-        avg_gain = statistics.mean(gains[-14:]) if len(gains) >= 14 else 0
-        avg_loss = statistics.mean(losses[-14:]) if len(losses) >= 14 else 0
-        
-        if avg_loss == 0: return 100
-        rs = avg_gain / avg_loss
-        return 100 - (100 / (1 + rs))
+        closes = column(candles, 'close')
+        return indicators.last(indicators.rsi(closes, period, method="sma"), 50)
 
     def generate_signal(self, candles: List[Dict]) -> Tuple[Optional[str], int, str]:
         """
@@ -44,7 +30,7 @@ class QuantumSignalEngine:
         """
         if len(candles) < 50: return None, 0, ""
         
-        closes = [c['close'] for c in candles]
+        closes = column(candles, 'close')
         current_price = closes[-1]
         
         # 1. TREND FILTER (EMA 20 vs EMA 50)
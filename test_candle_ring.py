@@ -0,0 +1,135 @@
+"""
+QUANTUM X PRO - Candle ring store tests (pure, no network)
+Run: python -m pytest -q test_candle_ring.py   (or: python test_candle_ring.py)
+"""
+from brokers.candle_ring import CandleRing, CandleRingStore, STALE_AFTER
+
+T0 = 1_800_000_000 - 1_800_000_000 % 900  # Aligned on M1/M5/M15
+
+
+def ohlc(candle):
+    return (candle['open'], candle['high'], candle['low'], candle['close'])
+
+
+def test_tick_builds_forming_candle():
+    ring = CandleRing(60, 10)
+    for ts, price in ((T0, 1.0), (T0 + 10, 2.0), (T0 + 20, 0.5), (T0 + 30, 1.5)):
+        ring.tick(price, ts)
+    assert ring.forming and ring.forming_ts == T0
+    assert ring.last(5) is None  # Nothing closed yet
+    ring.tick(1.6, T0 + 60)
+    assert len(ring) == 1
+    assert ohlc(ring.last(1)[0]) == (1.0, 2.0, 0.5, 1.5)
+
+
+def test_roll_closes_idle_candle():
+    ring = CandleRing(60, 10)
+    ring.tick(1.0, T0)
+    ring.roll(T0 + 59)
+    assert ring.forming and len(ring) == 0
+    ring.roll(T0 + 60)
+    assert not ring.forming and len(ring) == 1
+
+
+def test_late_tick_extends_closed_candle():
+    ring = CandleRing(60, 10)
+    for ts, price in ((T0, 1.0), (T0 + 10, 2.0), (T0 + 20, 0.5), (T0 + 30, 1.5)):
+        ring.tick(price, ts)
+    ring.roll(T0 + 61)
+    ring.tick(2.5, T0 + 59)   # Stamped in the closed bucket, delivered after the read
+    assert ohlc(ring.last(1)[0]) == (1.0, 2.5, 0.5, 2.5)
+    ring.tick(1.2, T0 + 62)   # Next candle opens normally
+    ring.tick(0.1, T0 - 5)    # Older than the last closed candle: dropped
+    assert ohlc(ring.last(1)[0]) == (1.0, 2.5, 0.5, 2.5)
+    assert ring.forming_ts == T0 + 60 and len(ring) == 1
+
+
+def test_late_tick_while_next_candle_forming():
+    ring = CandleRing(60, 10)
+    ring.tick(1.0, T0)
+    ring.tick(1.1, T0 + 60)
+    ring.tick(0.9, T0 + 58)
+    assert ohlc(ring.last(1)[0]) == (1.0, 1.0, 0.9, 0.9)
+    assert ring.forming_ts == T0 + 60
+
+
+def test_upsert_replaces_same_interval():
+    ring = CandleRing(60, 10)
+    ring.upsert(1.0, 1.2, 0.9, 1.1, T0)
+    ring.upsert(1.0, 1.3, 0.8, 1.2, T0 + 5)
+    ring.upsert(1.2, 1.2, 1.2, 1.2, T0 + 60)
+    assert ohlc(ring.last(1)[0]) == (1.0, 1.3, 0.8, 1.2)
+    ring.upsert(1.0, 1.4, 0.8, 1.25, T0)  # Broker's final version of the closed candle
+    assert ohlc(ring.last(1)[0]) == (1.0, 1.4, 0.8, 1.25)
+
+
+def test_wrap_keeps_last_window_contiguous():
+    ring = CandleRing(60, 10)
+    for k in range(35):
+        ring.tick(float(k), T0 + k * 60)
+    assert len(ring) == 9
+    window = ring.last(20)  # Capped at capacity - 1
+    assert len(window) == 9
+    assert [c['close'] for c in window] == [float(k) for k in range(25, 34)]
+    assert [c['ts'] for c in window] == [T0 + k * 60 for k in range(25, 34)]
+
+
+def test_window_survives_capacity_minus_n_minus_1_closes():
+    ring = CandleRing(60, 10)
+    for k in range(12):
+        ring.tick(float(k), T0 + k * 60)
+    window = ring.last(4)
+    before = [c['close'] for c in window]
+    for k in range(12, 12 + 10 - 4 - 1):
+        ring.tick(float(k), T0 + k * 60)
+    assert [c['close'] for c in window] == before
+
+
+def test_seed_keeps_built_candles_and_merges_forming():
+    ring = CandleRing(60, 10)
+    ring.tick(5.0, T0 + 20 * 60)       # Built from the stream before history arrived
+    ring.tick(5.5, T0 + 21 * 60 + 10)
+    history = [(1.0, 2.0, 0.5, float(k), T0 + k * 60) for k in range(22)]
+    ring.seed(history, now=T0 + 21 * 60 + 30)
+    assert len(ring) == 9
+    closes = [c['close'] for c in ring.last(9)]
+    assert closes == [float(k) for k in range(12, 21)]  # History wins for closed intervals
+    assert ring.forming_ts == T0 + 21 * 60
+    ring.roll(T0 + 22 * 60)
+    last = ring.last(1)[0]
+    assert (last['open'], last['high'], last['low'], last['close']) == (1.0, 5.5, 0.5, 5.5)
+
+
+def test_store_freshest_ring_and_staleness():
+    store = CandleRingStore(capacity=10, max_rings=4)
+    for k in range(5):
+        store.tick("A", "EUR/USD", 60, 1.0, T0 + k * 60)
+        store.tick("B", "EURUSD", 60, 2.0, T0 + k * 60 + 60)
+    now = T0 + 6 * 60 + 1
+    assert store.last("EUR/USD", 60, 3, now=now)[-1]['close'] == 2.0
+    assert store.last("EUR/USD", 60, 3, broker="A", now=now) is None   # A stopped a candle earlier
+    assert store.last("EUR/USD", 60, 3, broker="A", now=T0 + 5 * 60 + 1)[-1]['close'] == 1.0
+    assert store.last("EUR/USD", 60, 3, min_count=10, now=now) is None
+    later = T0 + 5 * 60 + STALE_AFTER * 60 + 1
+    assert store.last("EUR/USD", 60, 3, now=later) is None
+    assert store.stats()["stale"] == 2
+
+
+def test_store_evicts_least_recently_used():
+    store = CandleRingStore(capacity=10, max_rings=2)
+    store.tick("X", "EUR/USD", 60, 1.0, T0)
+    store.tick("X", "GBP/USD", 60, 1.0, T0)
+    store.tick("X", "EUR/USD", 60, 1.0, T0 + 1)
+    store.tick("X", "USD/JPY", 60, 1.0, T0)
+    stats = store.stats()
+    assert stats["rings"] == 2 and stats["evictions"] == 1
+    assert stats["bytes"] == stats["max_bytes"]
+    assert store.last("GBP/USD", 60, 1, now=T0 + 61) is None
+    assert store.last("EUR/USD", 60, 1, now=T0 + 61) is not None
+
+
+if __name__ == "__main__":
+    for name, fn in sorted(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"[OK] {name}")
@@ -0,0 +1,70 @@
+"""
+QUANTUM X PRO - Indicator kernel tests (pure, no network)
+Run: python -m pytest -q test_indicators.py   (or: python test_indicators.py)
+"""
+import math
+
+from engine import indicators
+
+ROWS = [
+    [1.0 + 0.01 * ((i * (r + 3)) % 7) - 0.002 * r * (i % 3) for i in range(60)]
+    for r in range(4)
+]
+
+
+def same(a, b):
+    a, b = [float(v) for v in a], [float(v) for v in b]
+    assert len(a) == len(b)
+    for x, y in zip(a, b):
+        assert (math.isnan(x) and math.isnan(y)) or abs(x - y) < 1e-9, (x, y)
+
+
+def check_rows(batch, single):
+    for out, row in zip(batch, ROWS):
+        same(out, single(row))
+
+
+def run_both(check):
+    """Runs `check` on the NumPy path (when installed) and on the pure-Python fallback"""
+    saved = indicators.NUMPY_AVAILABLE
+    try:
+        for enabled in {saved, False}:
+            indicators.NUMPY_AVAILABLE = enabled
+            check()
+    finally:
+        indicators.NUMPY_AVAILABLE = saved
+
+
+def test_rsi_2d_matches_rows():
+    def check():
+        for method in ("wilder", "sma"):
+            check_rows(indicators.rsi(ROWS, 14, method=method), lambda r: indicators.rsi(r, 14, method=method))
+    run_both(check)
+
+
+def test_macd_2d_matches_rows():
+    def check():
+        batch = indicators.macd(ROWS)
+        for part in range(3):
+            check_rows(batch[part], lambda r: indicators.macd(r)[part])
+    run_both(check)
+
+
+def test_rsi_last_moves_2d_matches_rows():
+    def check():
+        same(indicators.rsi_last_moves(ROWS, 14), [indicators.rsi_last_moves(r, 14) for r in ROWS])
+    run_both(check)
+
+
+def test_rsi_last_moves_formula():
+    prices = [1.0, 1.2, 1.2, 1.1, 1.4, 1.3]  # Up 0.2, 0.3; down 0.1, 0.1; one flat candle
+    assert abs(indicators.rsi_last_moves(prices, 2) - 100 * 0.5 / 0.7) < 1e-9
+    assert indicators.rsi_last_moves([1.0, 1.1, 1.2], 14) == 100.0
+    assert math.isnan(indicators.rsi_last_moves([], 14))
+
+
+if __name__ == "__main__":
+    for name, fn in sorted(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"[OK] {name}")